@@ -0,0 +1,223 @@
+"""Checks how many Firestore reads, writes and RPCs each UI action costs.
+
+Drives the main window and the details dialog offscreen against the
+in-memory fake Firestore, which counts every RPC by kind (get, query,
+aggregate, commit) and the documents read and written as Firestore bills
+them:
+
+    python benchmarks/action_budgets.py
+    python benchmarks/action_budgets.py --rows 3000 --json budgets.json
+
+Every action has a budget such as "open details: at most 1 + 2 * PREFETCH_NEIGHBOURS
+document gets, no queries" or "bulk edit of N rows: at most ceil(N / 500)
+commits, no reads". Background work the action starts (neighbour prefetch,
+the write queue flush) is waited for and counted. The run fails (exit
+status 1) when any action goes over its budget, so read amplification
+cannot come back unnoticed.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QMessageBox
+
+from src.fake_firestore import FakeFirestoreBackend, generate_dataset
+from src.firestore_service import FirestoreService
+from src.main_window import MainWindow
+from src.offline_queue import OfflineWriteQueue
+from src.schema import get_schema
+
+COLLECTION = "Company_Install"
+STAT_KINDS = ("connect", "get", "batch_get", "list_collections", "query", "aggregate", "commit", "reads", "writes")
+
+
+class BudgetRun:
+    def __init__(self, app, backend, timeout):
+        self.app = app
+        self.backend = backend
+        self.window = None
+        self.timeout = timeout
+        self.results = []
+
+    def settle(self):
+        """Run the event loop until the prefetcher and the write queue have nothing left to do."""
+        if self.window is None:
+            return
+        deadline = time.monotonic() + self.timeout
+        queue = self.window.write_queue
+        while time.monotonic() < deadline:
+            if queue.has_pending():
+                queue.flush()
+            elif self.window.prefetcher.is_idle():
+                break
+            self.app.processEvents()
+            time.sleep(0.005)
+        else:
+            raise RuntimeError(f"Background work did not finish in {self.timeout} s")
+        # Deliver the signals the workers emitted last
+        for _ in range(3):
+            self.app.processEvents()
+
+    def check(self, name, action, budget):
+        """Run action, wait for the work it started and compare what it cost with budget ({kind: max})."""
+        self.settle()
+        self.backend.reset_stats()
+        action()
+        self.settle()
+        used = Counter(self.backend.stats)
+        over = {kind: used[kind] for kind, limit in budget.items() if used[kind] > limit}
+        # Kinds left out of the budget are not allowed at all
+        over.update({kind: used[kind] for kind in STAT_KINDS if kind not in budget and used[kind]})
+        self.results.append({"action": name, "used": {kind: used[kind] for kind in STAT_KINDS if used[kind]},
+                             "budget": budget, "over": over})
+        usage = ", ".join(f"{kind} {used[kind]}/{budget.get(kind, 0)}" for kind in STAT_KINDS
+                          if used[kind] or kind in budget)
+        print(f"{'OVER' if over else 'ok':<5} {name:<36} {usage or 'nothing'}")
+
+
+def with_dialog(window, inside):
+    """Call inside() once the modal dialog opened by the next action is showing, then close it."""
+    def run():
+        try:
+            inside()
+        finally:
+            window.details_view.reject()
+    QTimer.singleShot(0, run)
+
+
+def edit_in_dialog(window, company_name):
+    dialog = window.details_view
+    dialog.edit_button.click()
+    dialog.name_edit.setText(company_name)
+    dialog.save_button.click()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1200, help="companies in the generated dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for background work")
+    parser.add_argument("--json", help="write what every action used to this file")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    # Result dialogs would wait for a click; errors end the run instead
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)
+
+    def fail(parent, title, text, *a, **k):
+        raise RuntimeError(f"{title}: {text}")
+
+    QMessageBox.critical = QMessageBox.warning = staticmethod(fail)
+
+    backend = FakeFirestoreBackend(seed=args.seed)
+    festivals = generate_dataset(backend, companies=args.rows, seed=args.seed, collections=(COLLECTION,))
+    service = FirestoreService(backend=backend)
+    schema = get_schema(COLLECTION)
+    status_field = schema.status_field
+    statuses = schema.choices(status_field)
+    neighbours = MainWindow.PREFETCH_NEIGHBOURS
+    batch = OfflineWriteQueue.MAX_BATCH_SIZE
+
+    run = BudgetRun(app, backend, args.timeout)
+    # The run's own write queue and delete snapshots, away from the user's
+    run_dir = tempfile.mkdtemp(prefix="action_budgets_")
+
+    def open_window():
+        write_queue = OfflineWriteQueue(service, os.path.join(run_dir, "write_queue.sqlite3"))
+        run.window = MainWindow(service, write_queue=write_queue, delete_snapshot_dir=os.path.join(run_dir, "deleted"))
+
+    # Connecting, the festival list and one query for the companies
+    run.check("open main window", open_window, {"connect": 1, "query": 2, "reads": args.rows + len(festivals)})
+    window = run.window
+
+    table = window.company_table
+    row_count = table.rowCount()
+    index = table.model().index(10, 1)
+
+    def open_details(inside=lambda: None):
+        with_dialog(window, inside)
+        window.open_company_details(index)
+
+    # The dialog opens from the loaded record, refreshes it once and prefetches its neighbours
+    run.check("open details", open_details, {"get": 1 + 2 * neighbours, "query": 0, "reads": 1 + 2 * neighbours})
+    run.check("reopen details within a minute", open_details, {})
+    # The next company was prefetched; moving on prefetches the one that comes into range
+    run.check("next company in details", lambda: open_details(lambda: window.navigate_company_details(1)),
+              {"get": 1, "reads": 1})
+    run.check("save a change in details", lambda: open_details(lambda: edit_in_dialog(window, "Budget Kft.")),
+              {"commit": 1, "writes": 1})
+    run.check("add a company", lambda: (with_dialog(window, lambda: edit_in_dialog(window, "New Budget Kft.")),
+                                        window.add_company()),
+              # Leasing the first block of IDs is a transaction: one get and one commit
+              {"get": 1, "commit": 2, "reads": 1, "writes": 2})
+
+    status_column = schema.column_fields.index(status_field)
+    current = schema.display_value(status_field, window.companies_by_id[table.item(3, 1).text()].get(status_field))
+    new_status = next(status for status in statuses if schema.display_value(status_field, status) != current)
+    run.check("change a status in the table",
+              lambda: window.on_cell_value_chosen(3, status_column, schema.display_value(status_field, new_status)),
+              {"commit": 1, "writes": 1})
+
+    run.check("sort and filter locally", lambda: (window.on_header_clicked(2), window.on_header_clicked(2),
+                                                  window.search_input.setText("kov"), window.filter_companies(),
+                                                  window.search_input.setText(""), window.filter_companies()), {})
+
+    rows = range(row_count)
+    run.check(f"bulk edit {row_count} rows", lambda: window.apply_bulk_edit({status_field: statuses[-1]}, rows),
+              {"commit": math.ceil(row_count / batch), "writes": row_count})
+
+    filters = {status_field: statuses[-1]}
+    matching = service.count_companies(COLLECTION, filters)
+    page_size = 1000
+    run.check(f"bulk edit by filter ({matching} matches)",
+              lambda: window.apply_bulk_edit_by_filter(COLLECTION, filters, {status_field: statuses[0]}, matching),
+              # Refs are paged without their fields, then the list is reloaded once
+              {"query": math.ceil((matching + 1) / page_size) + 1, "commit": math.ceil(matching / batch),
+               "reads": matching + 1 + row_count, "writes": matching})
+
+    def server_search():
+        window.server_search_checkbox.setChecked(True)
+        window.search_input.setText("kov")
+        window.load_companies()
+
+    delete_ids = [table.item(row, 1).text() for row in range(20)]
+    run.check("bulk delete 20 rows",
+              lambda: window.apply_bulk_delete(COLLECTION, lambda: service.iter_company_snapshots_by_id(
+                  COLLECTION, delete_ids), len(delete_ids)),
+              # One batched get for the undo copy, one subcollection listing per company, one commit
+              {"batch_get": 1, "list_collections": 20, "reads": 20, "commit": 1, "writes": 20})
+
+    run.check("server search", server_search, {"query": 1, "reads": service.SEARCH_LIMIT})
+    window.server_search_checkbox.setChecked(False)
+
+    run.check("update_company (service)", lambda: service.update_company(COLLECTION, table.item(5, 1).text(),
+                                                                        {"CompanyName": "Direct Kft."}),
+              {"commit": 1, "writes": 1})
+
+    window.prefetcher.close()
+    window.write_queue.close()
+    window.deleteLater()
+    app.processEvents()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rows": args.rows, "seed": args.seed, "results": run.results}, f, indent=2)
+
+    failures = [result for result in run.results if result["over"]]
+    for result in failures:
+        print(f"FAIL: {result['action']} over budget: "
+              + ", ".join(f"{kind} {count}" for kind, count in result["over"].items()))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Profiles the startup imports with `python -X importtime` and checks them against a budget.
+
+    python benchmarks/import_time.py                      # profile main.py's imports
+    python benchmarks/import_time.py --budget-ms 400      # fail above 400 ms
+    python benchmarks/import_time.py --json new.json --baseline old.json
+
+Every run imports the modules in a fresh interpreter, so nothing is cached
+between repeats; the median of the repeats is reported. The run fails
+(exit status 1) when the total exceeds --budget-ms, when it is more than
+--tolerance slower than the baseline, or when a module that must stay off
+the startup path (the Firestore SDK, openpyxl, NumPy) is imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What main.py imports before the window is shown
+STARTUP_MODULES = ["src.main_window", "src.firestore_service", "src.session_snapshot", "src.startup"]
+
+# Loaded on first use only; importing one of them at startup is a regression
+DEFERRED_MODULES = ["firebase_admin", "google.cloud.firestore", "google.cloud.firestore_v1", "openpyxl",
+                    "src.excel_exporter", "src.edit_field_dialog", "src.bulk_filter_dialog",
+                    "src.status_dashboard", "src.pivot_view", "src.company_details_view_install",
+                    "src.company_details_view_demolition", "src.fake_firestore", "src.delete_snapshot",
+                    "numpy", "src.analytics", "src.facet_index", "src.derived_columns"]
+
+
+def profile_once(modules):
+    """Return {module: (self_us, cumulative_us, depth)} of one fresh interpreter importing modules."""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {modules} failed:\n{result.stderr[-2000:]}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two more spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return timings
+
+
+def top_level_total_us(timings, modules):
+    # A module already imported by an earlier one is counted inside that one only
+    return sum(timings[module][1] for module in modules if module in timings and timings[module][2] == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=STARTUP_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="show the N slowest modules by cumulative time")
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--baseline", help="JSON written by an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--json", help="write the result to this file")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.modules) for _ in range(args.repeat)]
+    totals = [top_level_total_us(run, args.modules) / 1000 for run in runs]
+    total_ms = statistics.median(totals)
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"Importing {', '.join(args.modules)}: {total_ms:.0f} ms "
+          f"(median of {args.repeat}, min {min(totals):.0f}, max {max(totals):.0f})")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    slowest = sorted(median_run.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us, _) in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    failures = []
+    leaked = [module for module in DEFERRED_MODULES if module in median_run]
+    if leaked:
+        failures.append(f"imported at startup but meant to load on first use: {', '.join(leaked)}")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline_ms = json.load(f)["total_ms"]
+        if total_ms > baseline_ms * (1 + args.tolerance):
+            failures.append(f"{total_ms:.0f} ms is more than {args.tolerance:.0%} over the "
+                            f"{baseline_ms:.0f} ms baseline")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"modules": args.modules, "total_ms": total_ms, "runs_ms": totals,
+                       "slowest": {name: cumulative_us / 1000 for name, (_, cumulative_us, _) in slowest}},
+                      f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
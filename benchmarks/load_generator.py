@@ -0,0 +1,323 @@
+"""Simulates many field clients writing while the desk app runs, and reports what the desk sees.
+
+N field clients (threads, each with its own Firestore client) change the
+status of Company_Install companies of their festival and add comments at
+a steady rate, the way runners do on setup day. Meanwhile the desk window
+runs on this thread and is refreshed every --refresh seconds, as a user
+pressing Refresh would:
+
+    python benchmarks/load_generator.py --clients 30 --duration 600          # in-memory fake
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/load_generator.py --emulator --duration 14400
+
+Reported every --report-every seconds and at the end:
+  - change-to-visible latency: from a field write being committed to the
+    desk showing that version of the company (or a newer one);
+  - dropped updates: writes the desk still does not show after a final
+    refresh once the clients have stopped, and comments that were never
+    stored;
+  - memory growth: RSS now against RSS after the first load;
+  - UI stall time: total time the desk's UI thread stopped beating, from
+    the stall watchdog, and the longest single stall.
+
+On the emulator an empty Company_Install collection is first filled with
+--companies generated companies. The run fails (exit status 1) when more
+than --max-dropped updates are dropped or RSS grows by more than
+--max-growth-mb.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QMessageBox
+
+from src.fake_firestore import FakeFirestoreBackend, generate_dataset
+from src.firestore_backend import EmulatorFirestoreBackend
+from src.firestore_service import UPDATE_TIME_FIELD, FirestoreService
+from src.main_window import MainWindow
+from src.offline_queue import OfflineWriteQueue
+from src.schema import get_schema
+from src.stall_watchdog import StallWatchdog
+
+COLLECTION = "Company_Install"
+SEED_BATCH_SIZE = 500
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class Write:
+    __slots__ = ("client", "company_id", "update_time", "committed_at")
+
+    def __init__(self, client, company_id, update_time, committed_at):
+        self.client = client
+        self.company_id = company_id
+        self.update_time = update_time
+        self.committed_at = committed_at
+
+
+class FieldClient(threading.Thread):
+    """One runner's device: a status change or a comment every few seconds on their festival's companies."""
+
+    def __init__(self, number, service, company_ids, args, ledger):
+        super().__init__(name=f"field-client-{number}", daemon=True)
+        self.number = number
+        self.service = service
+        self.company_ids = company_ids
+        self.args = args
+        self.ledger = ledger
+        self.random = random.Random(args.seed * 1000 + number)
+        self.stop_event = threading.Event()
+        self.schema = get_schema(COLLECTION)
+        self.statuses = self.schema.choices(self.schema.status_field)
+        self.comments_sent = {}  # company_id -> comment IDs
+        self.errors = 0
+
+    def run(self):
+        interval = 60 / self.args.rate
+        collection_ref = self.service.db.collection(COLLECTION)
+        while not self.stop_event.wait(self.random.expovariate(1 / interval)):
+            company_id = self.random.choice(self.company_ids)
+            try:
+                if self.random.random() < self.args.comment_share:
+                    comment_id = self.service.add_comment(COLLECTION, company_id, {
+                        "Text": f"Field client {self.number} was here", "Author": f"runner{self.number}"})
+                    self.comments_sent.setdefault(company_id, []).append(comment_id)
+                    continue
+                status = self.random.choice(self.statuses)
+                data = self.service.prepare_data_for_save(
+                    {self.schema.status_field: status, "LastModified": datetime.now()}, COLLECTION)
+                result = collection_ref.document(company_id).update(data)
+                self.ledger.add(Write(self.number, company_id, self.service.format_update_time(result.update_time),
+                                      time.monotonic()))
+            except Exception as e:
+                self.errors += 1
+                if self.errors <= 5:
+                    print(f"field client {self.number}: write failed: {e}")
+
+
+class Ledger:
+    """Field writes waiting to show up on the desk, and the latencies of the ones that did."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # company_id -> [Write]
+        self.latencies = []
+        self.committed = 0
+
+    def add(self, write):
+        with self.lock:
+            self.pending.setdefault(write.company_id, []).append(write)
+            self.committed += 1
+
+    def mark_visible(self, companies_by_id, shown_at):
+        """Settle every write the desk now shows, itself or overtaken by a newer version of the company."""
+        with self.lock:
+            for company_id in list(self.pending):
+                shown = (companies_by_id.get(company_id) or {}).get(UPDATE_TIME_FIELD) or ""
+                writes = self.pending[company_id]
+                still_pending = [write for write in writes if write.update_time > shown]
+                for write in writes:
+                    if write.update_time <= shown:
+                        self.latencies.append(shown_at - write.committed_at)
+                if still_pending:
+                    self.pending[company_id] = still_pending
+                else:
+                    del self.pending[company_id]
+
+    def pending_count(self):
+        with self.lock:
+            return sum(len(writes) for writes in self.pending.values())
+
+    def latency_summary(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {"visible": 0}
+        return {"visible": len(latencies), "p50_s": round(statistics.median(latencies), 3),
+                "p95_s": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+                "max_s": round(latencies[-1], 3)}
+
+
+def seed_emulator(service, args):
+    """Copy a generated dataset into an empty emulator collection."""
+    if list(service.db.collection(COLLECTION).limit(1).stream()):
+        return
+    print(f"Seeding the emulator with {args.companies} companies")
+    generated = FakeFirestoreBackend(seed=args.seed)
+    generate_dataset(generated, companies=args.companies, festivals=args.festivals, seed=args.seed,
+                     collections=(COLLECTION,))
+    for path in ("Programs", COLLECTION):
+        documents = list(generated.store.documents(path).items())
+        for start in range(0, len(documents), SEED_BATCH_SIZE):
+            batch = service.db.batch()
+            for doc_id, document in documents[start:start + SEED_BATCH_SIZE]:
+                batch.set(service.db.collection(path).document(doc_id), document.data)
+            batch.commit()
+
+
+def stored_comments(service, comments_sent):
+    missing = 0
+    for company_id, comment_ids in comments_sent.items():
+        stored = {doc.id for doc in service.comments_ref(COLLECTION, company_id).stream()}
+        missing += len(set(comment_ids) - stored)
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=6.0, help="writes per minute per field client")
+    parser.add_argument("--comment-share", type=float, default=0.2, help="share of writes that are comments")
+    parser.add_argument("--duration", type=float, default=600.0, help="seconds to run")
+    parser.add_argument("--refresh", type=float, default=30.0, help="seconds between desk refreshes")
+    parser.add_argument("--report-every", type=float, default=60.0)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--festivals", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--emulator", action="store_true", help="use the emulator at FIRESTORE_EMULATOR_HOST")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Firestore latency per RPC, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--stall-ms", type=float, default=200.0, help="UI stalls shorter than this are ignored")
+    parser.add_argument("--max-dropped", type=int, default=0)
+    parser.add_argument("--max-growth-mb", type=float, default=None)
+    parser.add_argument("--json", help="write the final report to this file")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    def fail(parent, title, text, *a, **k):
+        # A dialog would stop the desk until someone clicks it; log and carry on
+        print(f"desk dialog: {title}: {text}")
+        return QMessageBox.StandardButton.Ok
+
+    QMessageBox.critical = QMessageBox.warning = QMessageBox.information = staticmethod(fail)
+
+    if args.emulator:
+        backend = EmulatorFirestoreBackend()
+    else:
+        backend = FakeFirestoreBackend(latency=args.latency, jitter=args.jitter, seed=args.seed)
+        generate_dataset(backend, companies=args.companies, festivals=args.festivals, seed=args.seed,
+                         collections=(COLLECTION,))
+    desk_service = FirestoreService(backend=backend)
+    if args.emulator:
+        seed_emulator(desk_service, args)
+
+    # The write queue and stall report of the run, away from the user's
+    run_dir = tempfile.mkdtemp(prefix="load_generator_")
+    watchdog = StallWatchdog(args.stall_ms, report_dir=os.path.join(run_dir, "stalls"))
+    watchdog.instrument(MainWindow)
+    watchdog.start()
+    write_queue = OfflineWriteQueue(desk_service, os.path.join(run_dir, "write_queue.sqlite3"))
+    window = MainWindow(desk_service, write_queue=write_queue)
+    window.show()
+    app.processEvents()
+    base_rss = rss_mb()
+    print(f"Desk loaded {len(window.companies)} companies, RSS {base_rss:.1f} MB; "
+          f"stall report in {watchdog.report_path}")
+
+    # Each runner works on the companies of one festival
+    by_festival = {}
+    for company in window.companies:
+        by_festival.setdefault(company.get("ProgramName"), []).append(company["Id"])
+    festivals = sorted(by_festival, key=lambda name: -len(by_festival[name]))
+    ledger = Ledger()
+    clients = [FieldClient(number, FirestoreService(backend=backend),
+                           by_festival[festivals[number % len(festivals)]], args, ledger)
+               for number in range(args.clients)]
+
+    def refresh():
+        window.load_companies()
+        ledger.mark_visible(window.companies_by_id, time.monotonic())
+
+    refresh_timer = QTimer()
+    refresh_timer.timeout.connect(refresh)
+    refresh_timer.start(int(args.refresh * 1000))
+
+    started = time.monotonic()
+    samples = []
+
+    def report():
+        elapsed = time.monotonic() - started
+        latency = ledger.latency_summary()
+        sample = {"elapsed_s": round(elapsed), "committed": ledger.committed, "pending": ledger.pending_count(),
+                  "comments": sum(len(ids) for client in clients for ids in client.comments_sent.values()),
+                  "errors": sum(client.errors for client in clients), "rss_mb": round(rss_mb(), 1),
+                  "stalls": watchdog.stall_count, "stalled_s": round(watchdog.stalled_seconds, 2), **latency}
+        samples.append(sample)
+        print(f"{elapsed:>7.0f} s  writes {sample['committed']:>7}  waiting {sample['pending']:>5}  "
+              f"comments {sample['comments']:>6}  errors {sample['errors']:>4}  "
+              f"p50 {latency.get('p50_s', 0):>6.2f} s  p95 {latency.get('p95_s', 0):>6.2f} s  "
+              f"RSS {sample['rss_mb']:>7.1f} MB  stalls {sample['stalls']:>4} ({sample['stalled_s']:.1f} s)")
+
+    report_timer = QTimer()
+    report_timer.timeout.connect(report)
+    report_timer.start(int(args.report_every * 1000))
+
+    for client in clients:
+        client.start()
+    deadline = started + args.duration
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+    for client in clients:
+        client.stop_event.set()
+    # Keep the desk's event loop running while the clients finish their last write
+    while any(client.is_alive() for client in clients):
+        app.processEvents()
+        time.sleep(0.01)
+    refresh_timer.stop()
+    report_timer.stop()
+    # Everything committed so far must show up on one more refresh
+    refresh()
+    app.processEvents()
+    report()
+    # The checks below block the UI thread, they are not the desk's stalls
+    watchdog.stop()
+    growth = rss_mb() - base_rss
+
+    dropped = ledger.pending_count()
+    missing_comments = stored_comments(desk_service, {company_id: ids for client in clients
+                                                      for company_id, ids in client.comments_sent.items()})
+    max_stall = max((stats.max_blocked for stats in watchdog.slot_stats.values()), default=0.0)
+    final = {**samples[-1], "dropped_updates": dropped, "missing_comments": missing_comments,
+             "rss_growth_mb": round(growth, 1), "longest_slot_ms": round(max_stall * 1000),
+             "slot_summary": watchdog.summary()}
+    print(f"Dropped updates: {dropped}, missing comments: {missing_comments}, RSS growth: {growth:.1f} MB, "
+          f"UI stalled {watchdog.stall_count} time(s) for {watchdog.stalled_seconds:.1f} s in total, "
+          f"longest watched slot {max_stall * 1000:.0f} ms")
+    print(watchdog.summary())
+
+    window.close()
+    window.write_queue.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "samples": samples, "final": final}, f, indent=2)
+
+    failures = []
+    if dropped + missing_comments > args.max_dropped:
+        failures.append(f"{dropped + missing_comments} dropped updates, at most {args.max_dropped} allowed")
+    if args.max_growth_mb is not None and growth > args.max_growth_mb:
+        failures.append(f"RSS grew by {growth:.1f} MB, at most {args.max_growth_mb} MB allowed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
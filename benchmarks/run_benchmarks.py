@@ -0,0 +1,277 @@
+"""Times loading, sorting, filtering, searching, bulk editing and exporting on generated datasets.
+
+Runs offscreen against the in-memory fake Firestore, so every run sees the
+same data for the same seed:
+
+    python benchmarks/run_benchmarks.py                              # 1k, 10k, 100k and 500k companies
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 --json new.json
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 --baseline old.json --tolerance 0.2
+    python benchmarks/run_benchmarks.py --no-baseline                # just print the timings
+
+Each benchmark reports the median time of --repeat runs and the peak RSS
+growth while it ran. The main window keeps a QTableWidget item per cell, so
+the benchmarks that need it (load, search, bulk edit) and the Excel export
+skip sizes above --max-widget-rows unless --no-limits is given. The run
+fails (exit status 1) when a result is more than --tolerance slower, or
+more than --memory-tolerance bigger, than the same benchmark and size in
+the baseline; differences below --min-delta-ms and --min-delta-mb are
+treated as noise.
+
+The baseline defaults to benchmarks/baseline.json, the committed reference
+results for 1k and 10k companies; sizes and benchmarks it has no entry for
+are not compared. Timings depend on the machine, so after changing the
+reference machine, or after a deliberate slowdown, regenerate it there from
+a clean checkout and commit it along with the change:
+
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 --no-baseline --json benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import Qt, QT_VERSION_STR
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+from src.company_table_model import CompanyTableModel
+from src.excel_exporter import ExcelExporter
+from src.fake_firestore import FakeFirestoreBackend, generate_dataset
+from src.firestore_service import FirestoreService
+from src.main_window import MainWindow
+from src.offline_queue import OfflineWriteQueue
+from src.schema import get_schema
+from src.table_filter import TableFilterProxyModel
+
+COLLECTION = "Company_Install"
+DEFAULT_SIZES = "1000,10000,100000,500000"
+SEARCH_TEXT = "kov"
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class PeakRss:
+    """Highest RSS seen while the block runs, sampled from /proc/self/statm on a thread."""
+
+    INTERVAL = 0.005
+
+    def __enter__(self):
+        self.start = self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.INTERVAL):
+            self.peak = max(self.peak, rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+    @property
+    def growth_mb(self):
+        return self.peak - self.start
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class Bench:
+    def __init__(self, app, repeat):
+        self.app = app
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, size, function, setup=None, repeat=None):
+        """Time function(state) after setup() on fresh state, --repeat times; keep the median."""
+        times = []
+        peak_growth = 0.0
+        for _ in range(repeat or self.repeat):
+            state = setup() if setup else None
+            gc.collect()
+            with PeakRss() as rss:
+                started = time.perf_counter()
+                function(state)
+                self.app.processEvents()
+                times.append(time.perf_counter() - started)
+            peak_growth = max(peak_growth, rss.growth_mb)
+            del state
+        result = {"seconds": statistics.median(times), "runs": times, "peak_rss_growth_mb": round(peak_growth, 1)}
+        self.results.setdefault(name, {})[str(size)] = result
+        print(f"{name:<22} {size:>8} rows {result['seconds'] * 1000:>10.1f} ms {peak_growth:>8.1f} MB")
+
+    def skip(self, name, size, reason):
+        self.results.setdefault(name, {})[str(size)] = {"skipped": reason}
+        print(f"{name:<22} {size:>8} rows    skipped ({reason})")
+
+
+def make_service(size, seed, latency):
+    backend = FakeFirestoreBackend(latency=latency, seed=seed)
+    generate_dataset(backend, companies=size, seed=seed, collections=(COLLECTION,))
+    return FirestoreService(backend=backend)
+
+
+def benchmark_size(bench, size, args, run_dir):
+    started = time.perf_counter()
+    service = make_service(size, args.seed, args.latency)
+    records = service.fetch_companies(COLLECTION)
+    print(f"-- {size} companies generated in {time.perf_counter() - started:.1f} s")
+    schema = get_schema(COLLECTION)
+    name_column = schema.column_fields.index("CompanyName")
+    status_column = schema.column_fields.index(schema.status_field)
+
+    # Models behind the table views
+    bench.run("model_sort", size, lambda model: (model.sort(name_column, Qt.SortOrder.AscendingOrder),
+                                                 model.sort(status_column, Qt.SortOrder.DescendingOrder)),
+              setup=lambda: CompanyTableModel(list(records), COLLECTION))
+
+    def filter_setup():
+        proxy = TableFilterProxyModel()
+        proxy.setSourceModel(CompanyTableModel(records, COLLECTION))
+        proxy.rowCount()
+        return proxy
+
+    bench.run("proxy_filter", size, lambda proxy: (proxy.setFilter(name_column, SEARCH_TEXT), proxy.rowCount()),
+              setup=filter_setup)
+
+    widget_limited = not args.no_limits and size > args.max_widget_rows
+    if widget_limited:
+        for name in ("load_companies", "global_search", "bulk_edit", "bulk_edit_sync", "excel_export"):
+            bench.skip(name, size, f"over --max-widget-rows {args.max_widget_rows}")
+        return
+
+    # The main window, end to end from the service to the filled table
+    # The run's own write queue: the user's pending writes must never be flushed to the fake
+    write_queue = OfflineWriteQueue(service, os.path.join(run_dir, f"write_queue_{size}.sqlite3"))
+    window = MainWindow(service, write_queue=write_queue)
+    bench.run("load_companies", size, lambda _: window.load_companies())
+
+    def search(_):
+        window.search_input.setText(SEARCH_TEXT)
+        window.filter_companies()
+        window.search_input.setText("")
+        window.filter_companies()
+
+    bench.run("global_search", size, search)
+
+    # Every row gets a new status: queued and shown at once, then committed to the fake in batches
+    statuses = schema.choices(schema.status_field)
+    rows = range(window.company_table.rowCount())
+    edits = iter(range(1, 1000))
+
+    def bulk_edit(index):
+        window.apply_bulk_edit({schema.status_field: statuses[index % len(statuses)]}, rows)
+
+    bench.run("bulk_edit", size, bulk_edit, setup=lambda: next(edits), repeat=1)
+
+    def sync(_):
+        window.write_queue.flush()
+        while window.write_queue.pending_count():
+            bench.app.processEvents()
+            time.sleep(0.001)
+
+    bench.run("bulk_edit_sync", size, sync, repeat=1)
+
+    bench.run("excel_export", size, lambda _: ExcelExporter.export_to_excel(None, records, COLLECTION))
+
+    window.prefetcher.close()
+    window.write_queue.close()
+    window.deleteLater()
+    bench.app.processEvents()
+
+
+def compare(results, baseline, args):
+    failures = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            before = baseline.get("results", {}).get(name, {}).get(size)
+            if not before or "seconds" not in before or "seconds" not in result:
+                continue
+            slower_ms = (result["seconds"] - before["seconds"]) * 1000
+            if result["seconds"] > before["seconds"] * (1 + args.tolerance) and slower_ms > args.min_delta_ms:
+                failures.append(f"{name} at {size} rows: {result['seconds'] * 1000:.1f} ms, "
+                                f"baseline {before['seconds'] * 1000:.1f} ms")
+            grown_mb = result["peak_rss_growth_mb"] - before["peak_rss_growth_mb"]
+            if result["peak_rss_growth_mb"] > before["peak_rss_growth_mb"] * (1 + args.memory_tolerance) and \
+                    grown_mb > args.min_delta_mb:
+                failures.append(f"{name} at {size} rows: peak RSS growth {result['peak_rss_growth_mb']:.1f} MB, "
+                                f"baseline {before['peak_rss_growth_mb']:.1f} MB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated dataset sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Firestore latency per RPC, in seconds")
+    parser.add_argument("--max-widget-rows", type=int, default=100000)
+    parser.add_argument("--no-limits", action="store_true", help="run every benchmark at every size")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="JSON written by an earlier --json run (default: the committed baseline.json)")
+    parser.add_argument("--no-baseline", action="store_true", help="do not compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--min-delta-mb", type=float, default=5.0)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    # Files of the run (write queues, the export) are kept out of the user's folders
+    run_dir = tempfile.mkdtemp(prefix="benchmarks_")
+    # The exporter and the bulk edit ask and report through dialogs; answer them without showing any
+    export_path = os.path.join(run_dir, "export.xlsx")
+    QFileDialog.getSaveFileName = staticmethod(lambda *a, **k: (export_path, ""))
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)
+
+    def fail(parent, title, text, *args, **kwargs):
+        # An error dialog would wait for a click forever; end the run instead
+        raise RuntimeError(f"{title}: {text}")
+
+    QMessageBox.critical = QMessageBox.warning = staticmethod(fail)
+
+    bench = Bench(app, args.repeat)
+    print(f"{'benchmark':<22} {'size':>8}      {'median':>10}    {'peak RSS growth':>8}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        benchmark_size(bench, size, args, run_dir)
+        gc.collect()
+
+    report = {
+        "meta": {"python": platform.python_version(), "qt": QT_VERSION_STR, "platform": platform.platform(),
+                 "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed, "latency": args.latency,
+                 "repeat": args.repeat,
+                 "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+        "results": bench.results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if not args.no_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.baseline} ({baseline.get('meta', {}).get('platform', 'unknown platform')})")
+        failures = compare(bench.results, baseline, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Opens and closes the company details dialog many times and reports memory growth.
+
+Runs offscreen against an in-process service, so no Firestore access is needed:
+
+    python benchmarks/soak_details_dialogs.py --opens 5000 --max-growth-mb 5
+
+Exits with status 1 when RSS grows by more than --max-growth-mb between the
+warm-up sample and the last one.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from src.instrumentation import FirestoreMetrics
+from src.main_window import MainWindow
+from src.offline_queue import OfflineWriteQueue
+
+FESTIVALS = ["Sziget", "Balaton Sound", "VOLT"]
+
+
+class SoakService:
+    """Just enough of FirestoreService for the main window and the details dialogs."""
+
+    def __init__(self, count):
+        self.companies = [{
+            "Id": str(i),
+            "CompanyName": f"Company {i}",
+            "ProgramName": FESTIVALS[i % len(FESTIVALS)],
+            "1": "TELEPÍTHETŐ",
+            "2": "KIADVA",
+            "3": i % 2 == 0,
+            "4": i % 3 == 0,
+            "_updateTime": "2026-01-01T00:00:00.000000000Z",
+        } for i in range(count)]
+        self.next_id = count
+        self.metrics = FirestoreMetrics()
+
+    def get_festivals(self, *args, **kwargs):
+        return list(FESTIVALS)
+
+    def get_companies(self, *args, **kwargs):
+        return [dict(company) for company in self.companies]
+
+    def get_company(self, collection, company_id):
+        return dict(self.companies[int(company_id) % len(self.companies)])
+
+    def generate_id(self):
+        self.next_id += 1
+        return str(self.next_id)
+
+    def server_timestamp(self):
+        return None
+
+    def __getattr__(self, name):
+        # Anything else the window touches during the run is a no-op
+        return lambda *args, **kwargs: None
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def sample(app, window):
+    app.processEvents()
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return rss_mb(), traced / (1024 * 1024), len(window.findChildren(QObject))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--opens", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--every", type=int, default=500, help="print a sample every N opens")
+    parser.add_argument("--max-growth-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    service = SoakService(args.rows)
+    # An in-memory write queue: the soak run must not open the user's
+    window = MainWindow(service, write_queue=OfflineWriteQueue(service, ":memory:"))
+    table = window.company_table
+
+    def open_once(i):
+        if i % 10 == 9:
+            QTimer.singleShot(0, lambda: window.details_view.reject())
+            window.add_company()
+            return
+        QTimer.singleShot(0, lambda: window.details_view.reject())
+        window.open_company_details(table.model().index(i % table.rowCount(), 1))
+
+    for i in range(args.warmup):
+        open_once(i)
+    tracemalloc.start()
+    base_rss, base_traced, base_children = sample(app, window)
+    print(f"{'opens':>8} {'rss MB':>10} {'traced MB':>10} {'children':>9}")
+    print(f"{0:>8} {base_rss:>10.1f} {base_traced:>10.2f} {base_children:>9}")
+
+    rss, traced, children = base_rss, base_traced, base_children
+    for i in range(1, args.opens + 1):
+        open_once(i)
+        if i % args.every == 0 or i == args.opens:
+            rss, traced, children = sample(app, window)
+            print(f"{i:>8} {rss:>10.1f} {traced:>10.2f} {children:>9}")
+
+    growth = rss - base_rss
+    print(f"RSS growth: {growth:.1f} MB, Python heap growth: {traced - base_traced:.2f} MB, "
+          f"child objects: {children - base_children:+d}, dialogs created: {window.details_pool.created_count}")
+    window.close()
+    if args.max_growth_mb is not None and growth > args.max_growth_mb:
+        print(f"FAIL: RSS grew by more than {args.max_growth_mb} MB")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,18 @@
+import time
+
+STARTED_AT = time.perf_counter()  # Time-to-first-usable-window is measured from here
+
 import sys
 import logging
 import os
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
 from src.main_window import MainWindow
-from src.company_details_view_install import CompanyDetailsViewInstall
-from src.company_details_view_demolition import CompanyDetailsViewDemolition
-from src.edit_field_dialog import EditFieldDialog
+from src.firestore_backend import EMULATOR_HOST_ENV
 from src.firestore_service import FirestoreService
+from src.session_snapshot import SessionSnapshot
+from src.startup import StartupTimer
+from src.stall_watchdog import StallWatchdog
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -14,18 +20,40 @@ def main():
     try:
         # Create QApplication instance first
         app = QApplication(sys.argv)
+        startup_timer = StartupTimer(STARTED_AT)
+
+        # Opt-in: RUNNERAPP_STALL_MS=200 reports every UI freeze over 200 ms with its stack
+        watchdog = StallWatchdog.from_environment()
+        if watchdog is not None:
+            watchdog.instrument(MainWindow)
+            watchdog.start()
+            app.aboutToQuit.connect(watchdog.stop)
 
-        # Initialize FirestoreService
+        # Initialize FirestoreService; it connects in the background once the window is up
         credentials_path = r"C:\Users\Balogh Csaba\IdeaProjects\pythonrunnerapp\resources\runnerapp-232cc-firebase-adminsdk-2csiq-331f965683.json"
 
-        if not os.path.exists(credentials_path):
-            raise FileNotFoundError(f"Firebase credentials file not found at: {credentials_path}")
+        fake_companies = os.environ.get("RUNNERAPP_FAKE_FIRESTORE")
+        if fake_companies:
+            # RUNNERAPP_FAKE_FIRESTORE=5000 runs on an in-memory project with 5000 generated companies
+            from src.fake_firestore import FakeFirestoreBackend, generate_dataset
+            backend = FakeFirestoreBackend(latency=float(os.environ.get("RUNNERAPP_FAKE_LATENCY", "0.05")), seed=0)
+            generate_dataset(backend, companies=int(fake_companies))
+            firestore_service = FirestoreService(backend=backend)
+        elif os.environ.get(EMULATOR_HOST_ENV):
+            # FIRESTORE_EMULATOR_HOST=localhost:8080 runs on a local emulator, e.g. next to benchmarks/load_generator.py
+            from src.firestore_backend import EmulatorFirestoreBackend
+            firestore_service = FirestoreService(backend=EmulatorFirestoreBackend())
+        else:
+            if not os.path.exists(credentials_path):
+                raise FileNotFoundError(f"Firebase credentials file not found at: {credentials_path}")
 
-        firestore_service = FirestoreService(credentials_path)
+            firestore_service = FirestoreService(credentials_path)
 
-        # Create MainWindow with FirestoreService
-        main_window = MainWindow(firestore_service)
+        # Create MainWindow with FirestoreService, showing the last session's list until live data arrives
+        main_window = MainWindow(firestore_service, SessionSnapshot(), startup_timer)
         main_window.show()
+        # Runs once the event loop has painted the window
+        QTimer.singleShot(0, lambda: startup_timer.mark("window usable"))
 
         # Start the event loop
         sys.exit(app.exec())
@@ -37,4 +65,4 @@ def main():
         print(f"Error: An unexpected error occurred: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,220 @@
+import numpy as np
+
+from src.schema import get_schema
+
+try:
+    import pandas as pd
+except ImportError:  # pandas is optional, everything below works on plain NumPy
+    pd = None
+
+
+class CompanyFrame:
+    """Dictionary-encoded column store over loaded company records.
+
+    Every field becomes an int32 code array plus a list of distinct values,
+    so group-by counts and pivots are single np.bincount calls instead of
+    loops over dicts. Computed counts are cached and adjusted in place when a
+    single record is added, changed or removed, so views can re-read them
+    after every edit without a rescan. Every change stamps the record with a
+    new version, which lets derived values be recomputed only where stale.
+    """
+
+    MISSING = ""
+
+    def __init__(self, collection, fields, records=()):
+        self.schema = get_schema(collection)
+        self.fields = list(fields)
+        self.size = 0
+        self.capacity = 0
+        self.ids = []
+        self.row_by_id = {}
+        self.categories = {field: [] for field in self.fields}
+        self.code_by_value = {field: {} for field in self.fields}
+        self.codes = {field: np.zeros(0, dtype=np.int32) for field in self.fields}
+        self.versions = np.zeros(0, dtype=np.int64)
+        self.version = 0  # Last version stamp handed out
+        self._group_cache = {}
+        self._pivot_cache = {}
+        self.load(records)
+
+    # Encoding
+
+    def normalize(self, field, value):
+        # Only fields the schema declares boolean turn "Van"/"Nincs" into flags, names stay text
+        value = self.schema.encode_value(field, value)
+        if value is None:
+            return self.MISSING
+        if isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    def _code(self, field, value):
+        value = self.normalize(field, value)
+        codes = self.code_by_value[field]
+        code = codes.get(value)
+        if code is None:
+            code = len(self.categories[field])
+            codes[value] = code
+            self.categories[field].append(value)
+        return code
+
+    def _ensure_capacity(self, size):
+        if size <= self.capacity:
+            return
+        self.capacity = max(size, self.capacity * 2, 64)
+        for field, column in self.codes.items():
+            grown = np.zeros(self.capacity, dtype=np.int32)
+            grown[:self.size] = column[:self.size]
+            self.codes[field] = grown
+        versions = np.zeros(self.capacity, dtype=np.int64)
+        versions[:self.size] = self.versions[:self.size]
+        self.versions = versions
+
+    def _stamp(self, row):
+        self.version += 1
+        self.versions[row] = self.version
+
+    def load(self, records):
+        records = list(records)
+        self.size = 0
+        self.ids = []
+        self.row_by_id = {}
+        self._group_cache.clear()
+        self._pivot_cache.clear()
+        self._ensure_capacity(len(records))
+        for field in self.fields:
+            column = self.codes[field]
+            for row, record in enumerate(records):
+                column[row] = self._code(field, record.get(field))
+        for row, record in enumerate(records):
+            company_id = str(record.get("Id", ""))
+            self.ids.append(company_id)
+            self.row_by_id[company_id] = row
+        self.size = len(records)
+        self.versions[:self.size] = np.arange(self.version + 1, self.version + 1 + self.size)
+        self.version += self.size
+
+    # Incremental maintenance
+
+    def _adjust_caches(self, row, delta):
+        for field, counts in self._group_cache.items():
+            code = self.codes[field][row]
+            if code >= len(counts):
+                counts = self._group_cache[field] = np.pad(counts, (0, len(self.categories[field]) - len(counts)))
+            counts[code] += delta
+        for (row_field, col_field), matrix in self._pivot_cache.items():
+            r = self.codes[row_field][row]
+            c = self.codes[col_field][row]
+            if r >= matrix.shape[0] or c >= matrix.shape[1]:
+                matrix = np.pad(matrix, ((0, len(self.categories[row_field]) - matrix.shape[0]),
+                                         (0, len(self.categories[col_field]) - matrix.shape[1])))
+                self._pivot_cache[(row_field, col_field)] = matrix
+            matrix[r, c] += delta
+
+    def upsert(self, record):
+        """Add a record, or apply the values of an existing one; only the given fields change."""
+        company_id = str(record.get("Id", ""))
+        row = self.row_by_id.get(company_id)
+        if row is None:
+            row = self.size
+            self._ensure_capacity(row + 1)
+            for field in self.fields:
+                self.codes[field][row] = self._code(field, record.get(field))
+            self.ids.append(company_id)
+            self.row_by_id[company_id] = row
+            self.size += 1
+            self._stamp(row)
+            self._adjust_caches(row, 1)
+            return
+        self._adjust_caches(row, -1)
+        for field in self.fields:
+            if field in record:
+                self.codes[field][row] = self._code(field, record[field])
+        self._stamp(row)
+        self._adjust_caches(row, 1)
+
+    def update(self, company_id, changes):
+        if str(company_id) in self.row_by_id:
+            self.upsert({**changes, "Id": company_id})
+
+    def remove(self, company_id):
+        company_id = str(company_id)
+        row = self.row_by_id.pop(company_id, None)
+        if row is None:
+            return
+        self._adjust_caches(row, -1)
+        last = self.size - 1
+        if row != last:
+            # Move the last record into the hole so the columns stay dense
+            for column in self.codes.values():
+                column[row] = column[last]
+            self.versions[row] = self.versions[last]
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.row_by_id[moved_id] = row
+        self.ids.pop()
+        self.size -= 1
+        self.version += 1  # Row positions moved
+
+    # Queries
+
+    def column(self, field):
+        return self.codes[field][:self.size]
+
+    def decoded(self, field):
+        return np.asarray(self.categories[field], dtype=object)[self.column(field)]
+
+    def group_counts(self, field):
+        """Return {value: count} for a field."""
+        counts = self._group_cache.get(field)
+        if counts is None:
+            counts = np.bincount(self.column(field), minlength=len(self.categories[field]))
+            self._group_cache[field] = counts
+        return {value: int(count) for value, count in zip(self.categories[field], counts) if count}
+
+    def pivot(self, row_field, col_field):
+        """Return (row_values, col_values, counts matrix) of a two-field cross tabulation."""
+        key = (row_field, col_field)
+        matrix = self._pivot_cache.get(key)
+        if matrix is None:
+            n_cols = max(len(self.categories[col_field]), 1)
+            flat = self.column(row_field).astype(np.int64) * n_cols + self.column(col_field)
+            matrix = np.bincount(flat, minlength=max(len(self.categories[row_field]), 1) * n_cols)
+            matrix = matrix.reshape(-1, n_cols)
+            self._pivot_cache[key] = matrix
+        rows = np.flatnonzero(matrix.sum(axis=1))
+        cols = np.flatnonzero(matrix.sum(axis=0))
+        return ([self.categories[row_field][r] for r in rows],
+                [self.categories[col_field][c] for c in cols],
+                matrix[np.ix_(rows, cols)].copy())
+
+    def completion(self, flag_fields, by=None):
+        """Share of records with each flag set, overall or per value of the `by` field.
+
+        Returns (group_values, flag_fields, fraction matrix).
+        """
+        if by is None:
+            group_codes = np.zeros(self.size, dtype=np.int64)
+            groups = ["All"]
+        else:
+            group_codes = self.column(by).astype(np.int64)
+            groups = list(self.categories[by])
+        totals = np.bincount(group_codes, minlength=len(groups)).astype(float)
+        fractions = np.zeros((len(groups), len(flag_fields)))
+        for index, field in enumerate(flag_fields):
+            true_code = self.code_by_value[field].get(True)
+            if true_code is None:
+                continue
+            is_set = (self.column(field) == true_code).astype(float)
+            fractions[:, index] = np.bincount(group_codes, weights=is_set, minlength=len(groups))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fractions = np.where(totals[:, None] > 0, fractions / totals[:, None], 0.0)
+        present = np.flatnonzero(totals)
+        return [groups[g] for g in present], list(flag_fields), fractions[present]
+
+    def to_dataframe(self):
+        """Return the records as a pandas DataFrame with categorical columns (requires pandas)."""
+        if pd is None:
+            raise ImportError("pandas is not installed")
+        data = {field: pd.Categorical(self.decoded(field)) for field in self.fields}
+        return pd.DataFrame(data, index=pd.Index(self.ids, name="Id"))
@@ -0,0 +1,85 @@
+from PyQt6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QPushButton
+
+from src.edit_field_dialog import EditFieldDialog
+
+
+class BulkFilterDialog(EditFieldDialog):
+    """Selects the companies a bulk edit or bulk delete applies to by a server-side query."""
+
+    NO_CONDITION = "(no condition)"
+
+    def __init__(self, collection, firestore_service, festivals, current_festival=None, parent=None,
+                 title="Bulk Edit by Filter"):
+        self.firestore_service = firestore_service
+        self.festivals = festivals
+        self.current_festival = current_festival
+        self.matching_count = None
+        super().__init__(collection, parent, allow_multiple=False)
+        self.setWindowTitle(title)
+
+    def setup_ui(self):
+        super().setup_ui()
+
+        self.festival_combo = QComboBox()
+        self.festival_combo.addItems(["All Festivals"] + self.festivals)
+        if self.current_festival:
+            self.festival_combo.setCurrentText(self.current_festival)
+        self.form.insertRow(0, "Festival:", self.festival_combo)
+        self.form.labelForField(self.field_combo).setText("Where field:")
+        self.form.labelForField(self.value_stack).setText("Equals:")
+
+        preview_layout = QHBoxLayout()
+        self.preview_label = QLabel("Matching companies: ?")
+        preview_layout.addWidget(self.preview_label)
+        self.preview_button = QPushButton("Preview")
+        self.preview_button.clicked.connect(self.update_preview)
+        preview_layout.addWidget(self.preview_button)
+        self.form.addRow(preview_layout)
+
+        self.apply_button.setText("Next")
+
+        # Any change to the query makes the previous count stale
+        self.festival_combo.currentTextChanged.connect(self.clear_preview)
+        self.field_combo.currentTextChanged.connect(self.clear_preview)
+        self.text_input.textChanged.connect(self.clear_preview)
+        self.boolean_combo.currentTextChanged.connect(self.clear_preview)
+        self.option_combo.currentTextChanged.connect(self.clear_preview)
+
+    def populate_field_combo(self, field_combo=None):
+        (self.field_combo if field_combo is None else field_combo).addItem(self.NO_CONDITION)
+        super().populate_field_combo(field_combo)
+
+    def get_field_mapping(self):
+        # The festival is chosen above, a condition on it could silently replace that choice
+        return {header: field for header, field in super().get_field_mapping().items() if field != "ProgramName"}
+
+    def update_value_widget(self, field, row=None):
+        super().update_value_widget(field, row)
+        self.value_stack.setEnabled(field != self.NO_CONDITION)
+
+    def get_filters(self):
+        filters = {}
+        festival = self.festival_combo.currentText()
+        if festival != "All Festivals":
+            filters["ProgramName"] = festival
+
+        if self.field_combo.currentText() != self.NO_CONDITION:
+            field, value = self.get_field_and_value()
+            filters[self.get_field_mapping()[field]] = value
+        return filters
+
+    def get_filter_description(self):
+        return ", ".join(f"{self.schema.header_by_field.get(field, field)} = {self.schema.display_value(field, value)}"
+                         for field, value in self.get_filters().items()) or "all companies"
+
+    def clear_preview(self):
+        self.matching_count = None
+        self.preview_label.setText("Matching companies: ?")
+
+    def update_preview(self):
+        self.matching_count = self.firestore_service.count_companies(self.collection, self.get_filters())
+        if self.matching_count is None:
+            self.preview_label.setText("Matching companies: unknown")
+        else:
+            self.preview_label.setText(f"Matching companies: {self.matching_count}")
+        return self.matching_count
@@ -0,0 +1,21 @@
+from src.schema import FLAG_TRUE, FLAG_FALSE
+
+
+def normalize_field_value(value):
+    # Records fetched through get_company carry booleans as "Van"/"Nincs"
+    if value == FLAG_TRUE:
+        return True
+    if value == FLAG_FALSE:
+        return False
+    return value
+
+
+def diff_fields(original, current, ignored_fields=("Id", "LastModified", "CreatedAt")):
+    """Return the fields of current whose value differs from original."""
+    changes = {}
+    for field, value in current.items():
+        if field in ignored_fields:
+            continue
+        if normalize_field_value(original.get(field)) != normalize_field_value(value):
+            changes[field] = value
+    return changes
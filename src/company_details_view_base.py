@@ -2,22 +2,27 @@ from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QCom
 from PyQt6.QtCore import Qt, pyqtSignal
 from datetime import datetime
 import logging
+from src.change_tracking import diff_fields
+from src.firestore_service import UPDATE_TIME_FIELD
+from src.offline_queue import OfflineWriteQueue
+from src.schema import get_schema
 
 class CompanyDetailsViewBase(QDialog):
     companyUpdated = pyqtSignal(str)
+    navigateRequested = pyqtSignal(int)  # -1 previous, +1 next company in the list
 
-    def __init__(self, firestore_service, collection, company_id, parent=None, company_data=None):
+    def __init__(self, firestore_service, collection, company_id, parent=None, company_data=None,
+                 write_queue=None, is_new=False):
         super().__init__(parent)
         self.firestore_service = firestore_service
         self.collection = collection
-        self.company_id = company_id
-        self.company_data = company_data or {}
+        self.schema = get_schema(collection)
+        # Without a shared queue the dialog gets a private, non-durable one
+        self.write_queue = write_queue or OfflineWriteQueue(firestore_service, ":memory:", self)
+        self.write_queue.writeSucceeded.connect(self.on_write_succeeded)
+        self.write_queue.writeFailed.connect(self.on_write_failed)
         self.setup_ui()
-        self.populate_festivals()
-        if company_id and not company_data:
-            self.load_company_data()
-        self.update_ui_with_data()
-        self.set_edit_mode(True if not company_id else False)
+        self.bind_company(company_id, company_data, is_new)
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -55,9 +60,18 @@ class CompanyDetailsViewBase(QDialog):
         self.delete_button = QPushButton("Delete Company")
         self.delete_button.clicked.connect(self.delete_company)
         button_layout.addWidget(self.delete_button)
+        self.add_navigation_buttons(button_layout)
 
         main_layout.addLayout(button_layout)
 
+    def add_navigation_buttons(self, button_layout):
+        self.previous_button = QPushButton("< Previous")
+        self.previous_button.clicked.connect(lambda: self.navigateRequested.emit(-1))
+        button_layout.insertWidget(0, self.previous_button)
+        self.next_button = QPushButton("Next >")
+        self.next_button.clicked.connect(lambda: self.navigateRequested.emit(1))
+        button_layout.addWidget(self.next_button)
+
     def setup_specific_fields(self):
         if self.collection == "Company_Install":
             self.setup_install_fields()
@@ -73,10 +87,51 @@ class CompanyDetailsViewBase(QDialog):
             print(f"Error populating festivals: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load festivals: {str(e)}")
 
+    def has_unsaved_changes(self):
+        return bool(diff_fields(self.original_data, self.get_form_data()))
+
+    def set_company(self, company_id, company_data):
+        """Show another company in this dialog; unsaved edits of the current one are saved first."""
+        if not self.is_new and self.has_unsaved_changes():
+            self.save_company()
+        self.bind_company(company_id, company_data)
+
+    def bind_company(self, company_id, company_data, is_new=False):
+        """Point the existing widgets at another company, dropping unsaved edits of the current one."""
+        self.company_id = company_id
+        self.company_data = company_data or {}
+        self.is_new = is_new or not company_id
+        self.populate_festivals()
+        if not company_data:
+            if self.is_new:
+                self.company_data = self.new_company_data()
+            else:
+                self.load_company_data()
+        self.update_ui_with_data()
+        self.set_edit_mode(self.starts_in_edit_mode())
+        self.original_data = self.get_form_data()
+
+    def new_company_data(self):
+        """The record a new company starts from; views fill in their field defaults."""
+        return {}
+
+    def starts_in_edit_mode(self):
+        return self.is_new
+
+    def refresh_company(self, company_data):
+        """Take a newer version of the shown company, unless the user is editing it."""
+        if self.has_unsaved_changes():
+            return
+        self.company_data = company_data
+        self.update_ui_with_data()
+        self.original_data = self.get_form_data()
+
     def load_company_data(self):
         try:
-            self.company_data = self.firestore_service.get_company(self.collection, self.company_id)
-            self.update_ui_with_data()
+            company_data = self.firestore_service.get_company(self.collection, self.company_id)
+            if company_data is None:
+                raise ValueError(f"No data found for company ID: {self.company_id}")
+            self.company_data = company_data
         except Exception as e:
             print(f"Error loading company data: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load company data: {str(e)}")
@@ -109,29 +164,70 @@ class CompanyDetailsViewBase(QDialog):
         self.edit_button.setEnabled(not editable)
         self.delete_button.setEnabled(not editable)
 
+    def get_form_data(self):
+        data = {
+            "CompanyName": self.name_edit.text(),
+            "ProgramName": self.program_combo.currentText()
+        }
+        data.update(self.get_specific_fields_data())
+        return data
+
     def save_company(self):
         try:
-            data = {
-                "Id": self.company_id,
-                "CompanyName": self.name_edit.text(),
-                "ProgramName": self.program_combo.currentText(),
-                "LastModified": datetime.now()
-            }
-            data.update(self.get_specific_fields_data())
+            data = self.get_form_data()
 
-            if self.company_id:
-                self.firestore_service.update_company(self.collection, self.company_id, data)
-            else:
-                self.company_id = self.firestore_service.add_company(self.collection, data)
+            if self.is_new:
+                if not self.company_id:
+                    self.company_id = self.firestore_service.generate_id()
+                now = datetime.now()
+                data.update({"Id": self.company_id, "LastModified": now, "CreatedAt": now})
+                self.company_id = self.write_queue.add_company(self.collection, data)
+                self.is_new = False
+                self.company_data.update(data)
+                self.original_data = self.get_form_data()
+                self.set_edit_mode(False)
+                self.update_ui_with_data()
+                self.companyUpdated.emit(self.company_id)
+                QMessageBox.information(self, "Success", "Company data saved successfully!")
+                return
+
+            changes = diff_fields(self.original_data, data)
+            if not changes:
+                logging.info(f"No changes to save for company with ID: {self.company_id}")
+                self.set_edit_mode(False)
+                return
+
+            changes["LastModified"] = datetime.now()
+            # Only the changed fields are queued; saves in quick succession are merged into one update
+            self.write_queue.submit(self.collection, self.company_id, changes,
+                                    self.company_data.get(UPDATE_TIME_FIELD))
 
+            self.company_data.update(changes)
+            self.original_data = data
             self.set_edit_mode(False)
-            self.load_company_data()
-            self.companyUpdated.emit(self.company_id)
-            QMessageBox.information(self, "Success", "Company data saved successfully!")
+            self.update_ui_with_data()
         except Exception as e:
             print(f"Error saving company data: {e}")
             QMessageBox.critical(self, "Error", f"Failed to save company data: {str(e)}")
 
+    def on_write_succeeded(self, collection, company_id, changes):
+        if collection == self.collection and company_id == self.company_id:
+            self.companyUpdated.emit(self.company_id)
+
+    def on_write_failed(self, collection, company_id, changes, error):
+        if collection != self.collection or company_id != self.company_id:
+            return
+        # Mark the fields dirty again so the next save resends them
+        for field in changes:
+            self.original_data.pop(field, None)
+        if self.isVisible():
+            QMessageBox.critical(self, "Error", f"Failed to save company data: {error}")
+
+    def done(self, result):
+        # Send anything still waiting in the queue before the dialog goes away
+        self.write_queue.flush(self.collection, self.company_id)
+        super().done(result)
+
     def get_specific_fields_data(self):
         if self.collection == "Company_Install":
             return {
@@ -153,7 +249,8 @@ class CompanyDetailsViewBase(QDialog):
             }
     def cancel_edit(self):
         if self.company_id:
-            self.load_company_data()
+            # Restore from the local record, which already includes changes not yet flushed
+            self.update_ui_with_data()
         else:
             self.close()
         self.set_edit_mode(False)
@@ -166,7 +263,8 @@ class CompanyDetailsViewBase(QDialog):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                self.firestore_service.delete_company(self.collection, self.company_id)
+                self.write_queue.delete_company(self.collection, self.company_id,
+                                                self.company_data.get(UPDATE_TIME_FIELD))
                 QMessageBox.information(self, "Success", "Company deleted successfully!")
                 self.companyUpdated.emit(self.company_id)
                 self.accept()
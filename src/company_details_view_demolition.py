@@ -6,10 +6,11 @@ import logging
 class CompanyDetailsViewDemolition(CompanyDetailsViewBase):
     companyUpdated = pyqtSignal(str)
 
-    def __init__(self, firestore_service, company_id, parent=None, company_data=None):
-        super().__init__(firestore_service, "Company_Demolition", company_id, parent, company_data)
+    def __init__(self, firestore_service, company_id, parent=None, company_data=None, write_queue=None,
+                 is_new=False):
+        super().__init__(firestore_service, "Company_Demolition", company_id, parent, company_data,
+                         write_queue, is_new)
         self.setWindowTitle("Company Details - Demolition")
-        self.setup_ui()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -26,11 +27,11 @@ class CompanyDetailsViewDemolition(CompanyDetailsViewBase):
         self.form_layout.addRow("Program:", self.program_combo)
 
         self.bontas_combo = QComboBox()
-        self.bontas_combo.addItems(["BONTHATO", "MEG_NYITVA", "NEM_HOZZAFERHETO"])
+        self.bontas_combo.addItems(self.schema.option_fields["1"])
         self.form_layout.addRow("Bontás (1):", self.bontas_combo)
 
         self.felszereles_combo = QComboBox()
-        self.felszereles_combo.addItems(["CSOMAGOLVA", "SZALLITASRA_VAR", "ELSZALLITVA", "NINCS_STATUSZ"])
+        self.felszereles_combo.addItems(self.schema.option_fields["2"])
         self.form_layout.addRow("Felszerelés (2):", self.felszereles_combo)
 
         self.bazis_leszereles_check = QCheckBox()
@@ -58,13 +59,10 @@ class CompanyDetailsViewDemolition(CompanyDetailsViewBase):
         self.delete_button = QPushButton("Delete Company")
         self.delete_button.clicked.connect(self.delete_company)
         button_layout.addWidget(self.delete_button)
+        self.add_navigation_buttons(button_layout)
 
         layout.addLayout(button_layout)
 
-        self.populate_festivals()
-        self.update_ui_with_data()
-        self.set_edit_mode(False)
-
     def set_edit_mode(self, editable):
         logging.info(f"Setting edit mode to: {editable}")
         self.name_edit.setReadOnly(not editable)
@@ -102,7 +100,7 @@ class CompanyDetailsViewDemolition(CompanyDetailsViewBase):
 
         self.bontas_combo.setCurrentText(self.company_data.get("1", "BONTHATO"))
         self.felszereles_combo.setCurrentText(self.company_data.get("2", "NINCS_STATUSZ"))
-        self.bazis_leszereles_check.setChecked(self.company_data.get("3", "Nincs") == "Van")
+        self.bazis_leszereles_check.setChecked(self.schema.is_set(self.company_data, "3"))
 
         last_modified = self.company_data.get("LastModified", "")
         self.last_modified_label.setText(str(last_modified) if last_modified else "")
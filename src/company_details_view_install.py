@@ -1,26 +1,15 @@
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit,
-                             QPushButton, QComboBox, QCheckBox, QMessageBox)
-from PyQt6.QtCore import pyqtSignal, QDateTime
+from PyQt6.QtWidgets import QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit, QPushButton, QComboBox, QCheckBox
+from datetime import datetime
 import logging
-
-class CompanyDetailsViewInstall(QDialog):
-    companyUpdated = pyqtSignal(str)
-
-    def __init__(self, firestore_service, company_id, parent=None, company_data=None):
-        super().__init__(parent)
-        self.firestore_service = firestore_service
-        self.company_id = company_id
-        self.company_data = company_data or {}
-        logging.debug(f"Initializing CompanyDetailsViewInstall with company_id: {company_id}, company_data: {self.company_data}")
+from src.company_details_view_base import CompanyDetailsViewBase
+
+class CompanyDetailsViewInstall(CompanyDetailsViewBase):
+    def __init__(self, firestore_service, company_id, parent=None, company_data=None, write_queue=None,
+                 is_new=False):
+        logging.debug(f"Initializing CompanyDetailsViewInstall with company_id: {company_id}, company_data: {company_data}")
+        super().__init__(firestore_service, "Company_Install", company_id, parent, company_data,
+                         write_queue, is_new)
         self.setWindowTitle("Company Details - Install")
-        self.setup_ui()
-        self.populate_festivals()
-        if company_data:
-            self.update_ui_with_data()
-            self.set_edit_mode(True)  # Always start in edit mode for existing companies
-        else:
-            self.initialize_new_company()
-            self.set_edit_mode(True)  # New companies start in edit mode
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -37,11 +26,11 @@ class CompanyDetailsViewInstall(QDialog):
         form.addRow("Program:", self.program_combo)
 
         self.felderites_combo = QComboBox()
-        self.felderites_combo.addItems(["TELEPÍTHETŐ", "KIRAKHATÓ", "NEM KIRAKHATÓ"])
+        self.felderites_combo.addItems(self.schema.option_fields["1"])
         form.addRow("Felderítés:", self.felderites_combo)
 
         self.telepites_combo = QComboBox()
-        self.telepites_combo.addItems(["KIADVA", "KIHELYEZESRE_VAR", "KIRAKVA", "HELYSZINEN_TESZTELVE", "STATUSZ_NELKUL"])
+        self.telepites_combo.addItems(self.schema.option_fields["2"])
         form.addRow("Telepítés:", self.telepites_combo)
 
         self.eloszto_check = QCheckBox()
@@ -72,6 +61,10 @@ class CompanyDetailsViewInstall(QDialog):
         layout.addLayout(form)
 
         button_layout = QHBoxLayout()
+        self.previous_button = QPushButton("< Previous")
+        self.previous_button.clicked.connect(lambda: self.navigateRequested.emit(-1))
+        button_layout.addWidget(self.previous_button)
+
         self.edit_button = QPushButton("Edit")
         self.edit_button.clicked.connect(self.enable_editing)
         button_layout.addWidget(self.edit_button)
@@ -84,21 +77,14 @@ class CompanyDetailsViewInstall(QDialog):
         self.cancel_button.clicked.connect(self.cancel_edit)
         button_layout.addWidget(self.cancel_button)
 
+        self.next_button = QPushButton("Next >")
+        self.next_button.clicked.connect(lambda: self.navigateRequested.emit(1))
+        button_layout.addWidget(self.next_button)
+
         layout.addLayout(button_layout)
 
-    def populate_festivals(self):
-        try:
-            festivals = self.firestore_service.get_festivals()
-            self.program_combo.clear()
-            self.program_combo.addItems(festivals)
-            logging.info(f"Populated {len(festivals)} festivals in the combo box")
-        except Exception as e:
-            logging.error(f"Error populating festivals: {e}")
-            QMessageBox.critical(self, "Error", f"Failed to load festivals: {str(e)}")
-
-    def initialize_new_company(self):
-        current_time = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-        self.company_data = {
+    def new_company_data(self):
+        return {
             "Id": self.company_id,
             "CompanyName": "",
             "ProgramName": "",
@@ -111,10 +97,11 @@ class CompanyDetailsViewInstall(QDialog):
             "7": False,
             "8": False,
             "9": False,
-            "LastModified": current_time,
-            "CreatedAt": current_time
         }
-        self.update_ui_with_data()
+
+    def starts_in_edit_mode(self):
+        # Install dialogs always open ready for editing
+        return True
 
     def update_ui_with_data(self):
         self.id_label.setText(str(self.company_data.get("Id", "")))
@@ -131,17 +118,17 @@ class CompanyDetailsViewInstall(QDialog):
 
         self.felderites_combo.setCurrentText(self.company_data.get("1", "TELEPÍTHETŐ"))
         self.telepites_combo.setCurrentText(self.company_data.get("2", "KIADVA"))
-        self.eloszto_check.setChecked(self.company_data.get("3", False))
-        self.aram_check.setChecked(self.company_data.get("4", False))
-        self.halozat_check.setChecked(self.company_data.get("5", False))
-        self.ptg_check.setChecked(self.company_data.get("6", False))
-        self.szoftver_check.setChecked(self.company_data.get("7", False))
-        self.param_check.setChecked(self.company_data.get("8", False))
-        self.helyszin_check.setChecked(self.company_data.get("9", False))
+        self.eloszto_check.setChecked(self.schema.is_set(self.company_data, "3"))
+        self.aram_check.setChecked(self.schema.is_set(self.company_data, "4"))
+        self.halozat_check.setChecked(self.schema.is_set(self.company_data, "5"))
+        self.ptg_check.setChecked(self.schema.is_set(self.company_data, "6"))
+        self.szoftver_check.setChecked(self.schema.is_set(self.company_data, "7"))
+        self.param_check.setChecked(self.schema.is_set(self.company_data, "8"))
+        self.helyszin_check.setChecked(self.schema.is_set(self.company_data, "9"))
 
         last_modified = self.company_data.get("LastModified", "")
-        if isinstance(last_modified, QDateTime):
-            last_modified = last_modified.toString("yyyy-MM-dd HH:mm:ss")
+        if isinstance(last_modified, datetime):
+            last_modified = last_modified.strftime("%Y-%m-%d %H:%M:%S")
         self.last_modified_label.setText(str(last_modified))
 
         logging.debug(f"Updated UI with company data: {self.company_data}")
@@ -168,55 +155,17 @@ class CompanyDetailsViewInstall(QDialog):
         self.set_edit_mode(True)
         logging.info("Edit mode enabled")
 
-    def cancel_edit(self):
-        if self.company_id:
-            self.load_company_data()
-        else:
-            self.close()
-        self.set_edit_mode(False)
-        logging.info("Edit cancelled, view mode restored")
-
-    def load_company_data(self):
-        try:
-            self.company_data = self.firestore_service.get_company("Company_Install", self.company_id)
-            if self.company_data is None:
-                raise ValueError(f"No data found for company ID: {self.company_id}")
-            self.update_ui_with_data()
-        except Exception as e:
-            logging.error(f"Error loading company data: {e}")
-            QMessageBox.critical(self, "Error", f"Failed to load company data: {str(e)}")
-            self.close()
-
-    def save_company(self):
-        try:
-            current_time = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-            data = {
-                "Id": self.company_id,
-                "CompanyName": self.name_edit.text(),
-                "ProgramName": self.program_combo.currentText(),
-                "1": self.felderites_combo.currentText(),
-                "2": self.telepites_combo.currentText(),
-                "3": self.eloszto_check.isChecked(),
-                "4": self.aram_check.isChecked(),
-                "5": self.halozat_check.isChecked(),
-                "6": self.ptg_check.isChecked(),
-                "7": self.szoftver_check.isChecked(),
-                "8": self.param_check.isChecked(),
-                "9": self.helyszin_check.isChecked(),
-                "LastModified": current_time
-            }
-
-            if "CreatedAt" not in self.company_data:
-                data["CreatedAt"] = current_time
-
-            self.firestore_service.update_company("Company_Install", self.company_id, data)
-            logging.info(f"{'Updated' if 'CreatedAt' in self.company_data else 'Added new'} company with ID: {self.company_id}")
-
-            self.company_data.update(data)  # Update local data
-            self.set_edit_mode(False)
-            self.update_ui_with_data()  # Refresh UI with updated data
-            self.companyUpdated.emit(self.company_id)
-            QMessageBox.information(self, "Success", "Company data saved successfully!")
-        except Exception as e:
-            logging.error(f"Error saving company data: {e}")
-            QMessageBox.critical(self, "Error", f"Failed to save company data: {str(e)}")
\ No newline at end of file
+    def get_form_data(self):
+        return {
+            "CompanyName": self.name_edit.text(),
+            "ProgramName": self.program_combo.currentText(),
+            "1": self.felderites_combo.currentText(),
+            "2": self.telepites_combo.currentText(),
+            "3": self.eloszto_check.isChecked(),
+            "4": self.aram_check.isChecked(),
+            "5": self.halozat_check.isChecked(),
+            "6": self.ptg_check.isChecked(),
+            "7": self.szoftver_check.isChecked(),
+            "8": self.param_check.isChecked(),
+            "9": self.helyszin_check.isChecked()
+        }
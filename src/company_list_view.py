@@ -3,6 +3,8 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QT
                              QPushButton, QLineEdit, QComboBox, QRadioButton, QMessageBox)
 from PyQt6.QtCore import pyqtSignal, Qt
 
+from src.schema import get_schema
+
 class CompanyListView(QWidget):
     company_selected = pyqtSignal(str, str)  # Emits company_id and collection
 
@@ -80,44 +82,14 @@ class CompanyListView(QWidget):
             self.company_table.setRowCount(0)  # Clear the table
             self.company_table.setRowCount(len(companies))
 
-            column_headers = {
-                "Company_Install": [
-                    "ID", "CompanyName", "ProgramName", "eloszto", "aram", "halozat",
-                    "PTG", "szoftver", "param", "helyszin", "telepites", "felderites", "LastModified"
-                ],
-                "Company_Demolition": [
-                    "ID", "CompanyName", "ProgramName", "1", "2", "3", "LastModified"
-                ]
-            }
-
-            header_display_names = {
-                "Company_Install": [
-                    "ID", "Company Name", "Program Name", "Elosztó", "Áram", "Hálózat",
-                    "PTG", "Szoftver", "Param", "Helyszín", "Telepítés", "Felderítés", "Last Modified"
-                ],
-                "Company_Demolition": [
-                    "ID", "Company Name", "Program Name", "Bontás", "Felszerelés", "Bázis Leszerelés", "Last Modified"
-                ]
-            }
-
-            # Set table headers based on selected collection
-            self.company_table.setColumnCount(len(header_display_names[collection]))
-            self.company_table.setHorizontalHeaderLabels(header_display_names[collection])
+            # Same columns and conversions as the main window, without the Select column
+            schema = get_schema(collection)
+            self.company_table.setColumnCount(len(schema.headers) - 1)
+            self.company_table.setHorizontalHeaderLabels(schema.headers[1:])
 
             for i, company in enumerate(companies):
-                data = company.to_dict()
-                data['ID'] = company.id  # Add the document ID to the data dictionary
-
-                for j, header in enumerate(column_headers[collection]):
-                    value = data.get(header, "")
-                    if header == "LastModified":
-                        value = value.strftime("%Y-%m-%d %H:%M:%S") if value else ""
-                    elif header in ["eloszto", "aram", "halozat", "PTG", "szoftver", "param", "helyszin", "3"]:
-                        value = "Yes" if value else "No"
-                    elif header in ["telepites", "felderites", "1", "2"]:
-                        # These fields are likely to be string values, so we don't need to modify them
-                        pass
-                    self.company_table.setItem(i, j, QTableWidgetItem(str(value)))
+                for j, value in enumerate(schema.display_row(company)[1:]):
+                    self.company_table.setItem(i, j, QTableWidgetItem(value))
 
             self.company_table.resizeColumnsToContents()
 
@@ -1,10 +1,16 @@
 from PyQt6.QtCore import Qt, QAbstractTableModel
 
+from src.schema import get_schema
+
 class CompanyTableModel(QAbstractTableModel):
-    def __init__(self, data, headers, parent=None):
+    def __init__(self, data, collection, parent=None, derived_columns=None):
         super().__init__(parent)
         self._data = data
-        self._headers = headers
+        self.derived_columns = derived_columns  # DerivedColumns over the same records, if any
+        self.schema = get_schema(collection)
+        self._headers = self.schema.headers
+        self._fields = self.schema.column_fields
+        self._decoders = [self.schema.decoders.get(field) for field in self._fields]
 
     def rowCount(self, parent=None):
         return len(self._data)
@@ -14,25 +20,20 @@ class CompanyTableModel(QAbstractTableModel):
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole:
-            row = index.row()
-            col = index.column()
-            company = self._data[row]
-            header = self._headers[col]
-
-            # Handle specific fields that need to be converted to "Van" or "Nincs"
-            if header in ["Elosztó", "Áram", "Hálózat", "PTG", "Szoftver", "Param", "Helyszín", "Bázis Leszerelés"]:
-                return "Van" if company.get(header, False) else "Nincs"
-
-            # Handle the "Last Modified" field
-            if header == "Last Modified":
-                value = company.get(header, "")
-                return str(value) if value else ""
-
-            # For other fields, just return the value as a string
-            return str(company.get(header, ""))
+            field = self._fields[index.column()]
+            if field is None:
+                return ""
+            return self._decoders[index.column()](self.value(self._data[index.row()], field))
 
         return None
 
+    def value(self, company, field):
+        if field in self.schema.derived_fields:
+            if self.derived_columns is None:
+                return None
+            return self.derived_columns.row_values(company.get("Id", "")).get(field)
+        return company.get(field)
+
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
             return self._headers[section]
@@ -40,6 +41,14 @@ class CompanyTableModel(QAbstractTableModel):
 
     def sort(self, column, order):
         """Sort table by given column number."""
+        field = self._fields[column]
+        if field is None:
+            return
+        if column in self.schema.numeric_columns:
+            key = lambda x: self.value(x, field) or 0
+        else:
+            decode = self._decoders[column]
+            key = lambda x: decode(self.value(x, field))
         self.layoutAboutToBeChanged.emit()
-        self._data = sorted(self._data, key=lambda x: x.get(self._headers[column], ""), reverse=(order == Qt.SortOrder.DescendingOrder))
-        self.layoutChanged.emit()
\ No newline at end of file
+        self._data = sorted(self._data, key=key, reverse=(order == Qt.SortOrder.DescendingOrder))
+        self.layoutChanged.emit()
@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+
+def default_snapshot_dir():
+    return os.path.join(os.path.expanduser("~"), ".pythonrunnerapp", "deleted")
+
+
+class DeleteSnapshot:
+    """Local copy of documents about to be deleted, to undo a bulk delete.
+
+    One JSON line per document with its full path and data. Documents are
+    appended and synced to disk before their deletes are sent, so the file
+    holds at least everything that was actually deleted, even after a crash
+    halfway through.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    @classmethod
+    def create(cls, label, directory=None):
+        directory = directory or default_snapshot_dir()
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}")
+        path = f"{stem}.jsonl"
+        number = 1
+        # Two deletes within a second must not share a file
+        while os.path.exists(path):
+            number += 1
+            path = f"{stem}-{number}.jsonl"
+        # Created empty right away, so the next snapshot sees the name as taken
+        open(path, "x", encoding="utf-8").close()
+        return cls(path)
+
+    def write(self, documents):
+        """Append (path, data) pairs and sync them to disk."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            for path, data in documents:
+                f.write(json.dumps({"path": path, "data": data}, ensure_ascii=False, default=self._encode) + "\n")
+                self.count += 1
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        """Yield the saved (path, data) pairs in the order they were written."""
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line, object_hook=self._decode)
+                except ValueError as e:
+                    # A line cut short by a crash belongs to a delete that was never sent
+                    logging.warning(f"Skipping unreadable line {number} of {self.path}: {e}")
+                    continue
+                yield entry["path"], entry["data"]
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        # Anything else Firestore hands back (references, geo points) is kept as text
+        return str(value)
+
+    @staticmethod
+    def _decode(value):
+        if len(value) == 1 and "$datetime" in value:
+            return datetime.fromisoformat(value["$datetime"])
+        return value
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Install checklist flags, in table order, and the ones a stand cannot be finished without
+INSTALL_CHECKS = [("3", "Elosztó"), ("4", "Áram"), ("5", "Hálózat"), ("6", "PTG"), ("7", "Szoftver"),
+                  ("8", "Param"), ("9", "Helyszín")]
+INSTALL_PREREQUISITES = [("3", "Elosztó"), ("4", "Áram"), ("5", "Hálózat")]
+
+READY = "ready"
+BLOCKED = "blocked"
+DONE = "done"
+
+
+def has_value(frame, field, value, rows):
+    """Boolean mask of the given rows whose field holds value."""
+    if field not in frame.code_by_value:
+        return np.zeros(len(rows), dtype=bool)
+    code = frame.code_by_value[field].get(frame.normalize(field, value))
+    if code is None:
+        return np.zeros(len(rows), dtype=bool)
+    return frame.codes[field][rows] == code
+
+
+def install_readiness(frame, rows):
+    """Share of the checklist done, in percent."""
+    done = np.zeros(len(rows), dtype=np.int64)
+    for field, _ in INSTALL_CHECKS:
+        done += has_value(frame, field, True, rows)
+    return done * 100 // len(INSTALL_CHECKS)
+
+
+def _blocked_reason_text(key):
+    parts = ["Nem kirakható"] if key & 1 else []
+    missing = [name for bit, (_, name) in enumerate(INSTALL_PREREQUISITES, start=1) if key >> bit & 1]
+    if missing:
+        parts.append("Hiányzik: " + ", ".join(missing))
+    return "; ".join(parts)
+
+
+# Every combination of blocking conditions has its text prepared once, rows just index into it
+BLOCKED_REASONS = np.array([_blocked_reason_text(key) for key in range(2 ** (1 + len(INSTALL_PREREQUISITES)))],
+                           dtype=object)
+
+
+def install_blocked_reason(frame, rows):
+    key = has_value(frame, "1", "NEM KIRAKHATÓ", rows).astype(np.int64)
+    for bit, (field, _) in enumerate(INSTALL_PREREQUISITES, start=1):
+        key |= (~has_value(frame, field, True, rows)).astype(np.int64) << bit
+    return BLOCKED_REASONS[key]
+
+
+def install_state(frame, rows):
+    all_checks = install_readiness(frame, rows) == 100
+    finished = all_checks & has_value(frame, "2", "HELYSZINEN_TESZTELVE", rows)
+    blocked = install_blocked_reason(frame, rows) != ""
+    return np.where(finished, DONE, np.where(blocked, BLOCKED, READY)).astype(object)
+
+
+# Derived field -> function(frame, rows) returning one value per row, per collection
+DERIVED_COLUMNS = {
+    "Company_Install": {
+        "_readiness": install_readiness,
+        "_state": install_state,
+        "_blockedReason": install_blocked_reason,
+    }
+}
+
+
+class DerivedColumns:
+    """Computed columns over a CompanyFrame, memoized per record version.
+
+    Values are computed for all stale rows at once with NumPy and kept until
+    the record's version in the frame changes, so reading them for painting,
+    sorting, filtering or export costs a lookup.
+    """
+
+    def __init__(self, company_frame, columns):
+        self.company_frame = company_frame
+        self.columns = dict(columns)
+        self.values = {name: np.empty(0, dtype=object) for name in self.columns}
+        self.computed_versions = np.zeros(0, dtype=np.int64)
+        self.seen_version = -1
+
+    def refresh(self):
+        frame = self.company_frame
+        if frame.version == self.seen_version:
+            return
+        if len(self.computed_versions) < frame.capacity:
+            grown = np.zeros(frame.capacity, dtype=np.int64)
+            grown[:len(self.computed_versions)] = self.computed_versions
+            self.computed_versions = grown
+            for name, values in self.values.items():
+                grown_values = np.empty(frame.capacity, dtype=object)
+                grown_values[:len(values)] = values
+                self.values[name] = grown_values
+        stale = np.flatnonzero(self.computed_versions[:frame.size] != frame.versions[:frame.size])
+        if len(stale):
+            for name, compute in self.columns.items():
+                self.values[name][stale] = compute(frame, stale)
+            self.computed_versions[stale] = frame.versions[stale]
+        self.seen_version = frame.version
+
+    def column(self, name):
+        self.refresh()
+        return self.values[name][:self.company_frame.size]
+
+    def row_values(self, company_id):
+        """Return {derived field: value} for one record, or {} if it is not in the frame."""
+        row = self.company_frame.row_by_id.get(str(company_id))
+        if row is None or not self.columns:
+            return {}
+        self.refresh()
+        return {name: values[row] for name, values in self.values.items()}
@@ -0,0 +1,58 @@
+import importlib
+import logging
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Collection -> (module, class) of its details dialog, imported when the first one is opened
+DIALOG_CLASSES = {
+    "Company_Install": ("src.company_details_view_install", "CompanyDetailsViewInstall"),
+    "Company_Demolition": ("src.company_details_view_demolition", "CompanyDetailsViewDemolition"),
+}
+
+
+class DetailsDialogPool(QObject):
+    """Keeps one details dialog per collection and rebinds it to the company being opened.
+
+    Building a dialog creates its whole widget tree and connects it to the
+    shared write queue; doing that on every open left the old dialogs and
+    their connections alive for as long as the main window. The pooled
+    dialog's signals are forwarded once, so callers connect to the pool.
+    """
+
+    companyUpdated = pyqtSignal(str)
+    navigateRequested = pyqtSignal(int)
+
+    def __init__(self, firestore_service, write_queue, parent_widget):
+        super().__init__(parent_widget)
+        self.firestore_service = firestore_service
+        self.write_queue = write_queue
+        self.parent_widget = parent_widget
+        self.dialogs = {}
+        self.created_count = 0
+
+    def acquire(self, collection, company_id, company_data, is_new=False):
+        """Return the collection's dialog showing company_data, creating it on first use."""
+        dialog = self.dialogs.get(collection)
+        if dialog is None:
+            dialog = self.create_dialog(collection, company_id, company_data, is_new)
+            self.dialogs[collection] = dialog
+        else:
+            dialog.bind_company(company_id, company_data, is_new)
+        return dialog
+
+    def create_dialog(self, collection, company_id, company_data, is_new):
+        module_name, class_name = DIALOG_CLASSES.get(collection, DIALOG_CLASSES["Company_Demolition"])
+        dialog_class = getattr(importlib.import_module(module_name), class_name)
+        dialog = dialog_class(self.firestore_service, company_id, self.parent_widget, company_data,
+                              self.write_queue, is_new=is_new)
+        dialog.companyUpdated.connect(self.companyUpdated)
+        dialog.navigateRequested.connect(self.navigateRequested)
+        self.created_count += 1
+        logging.info(f"Created details dialog for {collection}")
+        return dialog
+
+    def clear(self):
+        for dialog in self.dialogs.values():
+            dialog.hide()
+            dialog.deleteLater()
+        self.dialogs.clear()
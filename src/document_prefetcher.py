@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class DocumentPrefetcher(QObject):
+    """Fetches full company documents in the background and keeps the recent ones.
+
+    Dialogs open from the record already in memory and ask for a refresh
+    here; the neighbours of the selected row are fetched ahead of time so
+    paging through them never waits for Firestore.
+    """
+
+    # collection, company_id, document; emitted from a worker thread, delivered on the owner's thread
+    documentLoaded = pyqtSignal(str, str, object)
+
+    MAX_WORKERS = 2
+    MAX_ENTRIES = 200
+    MAX_AGE = 60  # seconds a fetched document counts as fresh
+
+    def __init__(self, firestore_service, parent=None):
+        super().__init__(parent)
+        self.firestore_service = firestore_service
+        self._cache = OrderedDict()  # (collection, company_id) -> (fetched_at, document)
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="prefetch")
+
+    def get(self, collection, company_id, max_age=MAX_AGE):
+        """Return a fetched document that is at most max_age seconds old, or None."""
+        with self._lock:
+            cached = self._cache.get((collection, company_id))
+            if cached is None or time.monotonic() - cached[0] > max_age:
+                return None
+            self._cache.move_to_end((collection, company_id))
+            return dict(cached[1])
+
+    def fetch(self, collection, company_id, max_age=MAX_AGE):
+        """Start a background fetch unless a fresh copy is cached or one is already running."""
+        key = (collection, company_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if self._closed or key in self._in_flight or (
+                    cached is not None and time.monotonic() - cached[0] <= max_age):
+                return False
+            self._in_flight.add(key)
+        self._executor.submit(self._load, collection, company_id)
+        return True
+
+    def is_idle(self):
+        """True when no fetch is running or waiting for a worker."""
+        with self._lock:
+            return not self._in_flight
+
+    def prefetch(self, collection, company_ids):
+        for company_id in company_ids:
+            self.fetch(collection, company_id)
+
+    def invalidate(self, collection, company_id):
+        with self._lock:
+            self._cache.pop((collection, company_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _load(self, collection, company_id):
+        key = (collection, company_id)
+        try:
+            document = self.firestore_service.get_company(collection, company_id)
+        except Exception as e:
+            logging.error(f"Error prefetching company {company_id}: {e}")
+            document = None
+        with self._lock:
+            self._in_flight.discard(key)
+            if document is None:
+                # get_company reports failures and missing documents alike, keep whatever is shown
+                return
+            self._cache[key] = (time.monotonic(), document)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        self.documentLoaded.emit(collection, company_id, document)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            # Cancelled fetches never reach _load, so their keys would keep is_idle() False for good
+            self._in_flight.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
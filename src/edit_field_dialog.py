@@ -1,96 +1,114 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QLineEdit, QPushButton, QStackedWidget
 from PyQt6.QtCore import Qt
 
+from src.schema import get_schema, BOOLEAN_HEADERS, OPTION_HEADERS
+
 class EditFieldDialog(QDialog):
-    def __init__(self, collection, parent=None):
+    BOOLEAN_FIELDS = BOOLEAN_HEADERS
+    OPTION_FIELDS = OPTION_HEADERS
+
+    def __init__(self, collection, parent=None, allow_multiple=True):
         super().__init__(parent)
         self.collection = collection
+        self.schema = get_schema(collection)
+        self.allow_multiple = allow_multiple
+        self.field_rows = []
         self.setup_ui()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
-        form = QFormLayout()
-
-        self.field_combo = QComboBox()
-        self.populate_field_combo()
-        form.addRow("Field:", self.field_combo)
-
-        self.value_stack = QStackedWidget()
-        self.text_input = QLineEdit()
-        self.boolean_combo = QComboBox()
-        self.boolean_combo.addItems(["Van", "Nincs"])
-        self.option_combo = QComboBox()
+        self.form = QFormLayout()
+        layout.addLayout(self.form)
 
-        self.value_stack.addWidget(self.text_input)
-        self.value_stack.addWidget(self.boolean_combo)
-        self.value_stack.addWidget(self.option_combo)
-        form.addRow("New value:", self.value_stack)
+        self.add_field_row()
 
-        layout.addLayout(form)
+        if self.allow_multiple:
+            self.add_field_button = QPushButton("Add Field")
+            self.add_field_button.clicked.connect(self.add_field_row)
+            layout.addWidget(self.add_field_button)
 
         self.apply_button = QPushButton("Apply")
         self.apply_button.clicked.connect(self.accept)
         layout.addWidget(self.apply_button)
 
-        self.field_combo.currentTextChanged.connect(self.update_value_widget)
-        self.update_value_widget(self.field_combo.currentText())
+    def add_field_row(self):
+        row = {
+            "field_combo": QComboBox(),
+            "value_stack": QStackedWidget(),
+            "text_input": QLineEdit(),
+            "boolean_combo": QComboBox(),
+            "option_combo": QComboBox()
+        }
+        row["boolean_combo"].addItems(["Van", "Nincs"])
+        row["value_stack"].addWidget(row["text_input"])
+        row["value_stack"].addWidget(row["boolean_combo"])
+        row["value_stack"].addWidget(row["option_combo"])
+        self.field_rows.append(row)
+
+        # The first row stays reachable through the original single-field attributes
+        if len(self.field_rows) == 1:
+            self.field_combo = row["field_combo"]
+            self.value_stack = row["value_stack"]
+            self.text_input = row["text_input"]
+            self.boolean_combo = row["boolean_combo"]
+            self.option_combo = row["option_combo"]
+
+        self.populate_field_combo(row["field_combo"])
+        if len(self.field_rows) > 1:
+            # Suggest the next field that is not part of the patch yet
+            used = {r["field_combo"].currentText() for r in self.field_rows[:-1]}
+            unused = [row["field_combo"].itemText(i) for i in range(row["field_combo"].count())
+                      if row["field_combo"].itemText(i) not in used]
+            if unused:
+                row["field_combo"].setCurrentText(unused[0])
 
-    def populate_field_combo(self):
+        self.form.addRow("Field:", row["field_combo"])
+        self.form.addRow("New value:", row["value_stack"])
+
+        row["field_combo"].currentTextChanged.connect(lambda field, row=row: self.update_value_widget(field, row))
+        self.update_value_widget(row["field_combo"].currentText(), row)
+        return row
+
+    def populate_field_combo(self, field_combo=None):
         fields = self.get_field_mapping().keys()
-        self.field_combo.addItems(fields)
-
-    def update_value_widget(self, field):
-        boolean_fields = ["Elosztó", "Áram", "Hálózat", "PTG", "Szoftver", "Param", "Helyszín", "Bázis Leszerelés"]
-        option_fields = {
-            "Felderítés": ["TELEPÍTHETŐ", "KIRAKHATÓ", "NEM KIRAKHATÓ"],
-            "Telepítés": ["KIADVA", "KIHELYEZESRE_VAR", "KIRAKVA", "HELYSZINEN_TESZTELVE", "STATUSZ_NELKUL"],
-            "Bontás": ["BONTHATO", "MEG_NYITVA", "NEM_HOZZAFERHETO"],
-            "Felszerelés": ["CSOMAGOLVA", "SZALLITASRA_VAR", "ELSZALLITVA", "NINCS_STATUSZ"]
-        }
+        (self.field_combo if field_combo is None else field_combo).addItems(fields)
 
-        if field in boolean_fields:
-            self.value_stack.setCurrentWidget(self.boolean_combo)
-        elif field in option_fields:
-            self.option_combo.clear()
-            self.option_combo.addItems(option_fields[field])
-            self.value_stack.setCurrentWidget(self.option_combo)
+    def update_value_widget(self, field, row=None):
+        row = self.field_rows[0] if row is None else row
+        if field in self.BOOLEAN_FIELDS:
+            row["value_stack"].setCurrentWidget(row["boolean_combo"])
+        elif field in self.OPTION_FIELDS:
+            row["option_combo"].clear()
+            row["option_combo"].addItems(self.OPTION_FIELDS[field])
+            row["value_stack"].setCurrentWidget(row["option_combo"])
         else:
-            self.value_stack.setCurrentWidget(self.text_input)
+            row["value_stack"].setCurrentWidget(row["text_input"])
 
-    def get_field_and_value(self):
-        field = self.field_combo.currentText()
-        field_mapping = self.get_field_mapping()
-        db_field = field_mapping[field]
+    def get_field_and_value(self, row=None):
+        row = self.field_rows[0] if row is None else row
+        field = row["field_combo"].currentText()
 
-        if self.value_stack.currentWidget() == self.boolean_combo:
-            value = self.boolean_combo.currentText() == "Van"
-        elif self.value_stack.currentWidget() == self.option_combo:
-            value = self.option_combo.currentText()
+        if row["value_stack"].currentWidget() == row["boolean_combo"]:
+            value = row["boolean_combo"].currentText() == "Van"
+        elif row["value_stack"].currentWidget() == row["option_combo"]:
+            value = row["option_combo"].currentText()
         else:
-            value = self.text_input.text()
+            value = row["text_input"].text()
 
         return field, value  # Return the display field name, not the db_field
 
+    def get_patch(self):
+        """Return {display field: value} for every field row; later rows win on duplicates."""
+        patch = {}
+        for row in self.field_rows:
+            field, value = self.get_field_and_value(row)
+            patch[field] = value
+        return patch
+
+    def get_db_patch(self):
+        field_mapping = self.get_field_mapping()
+        return {field_mapping[field]: value for field, value in self.get_patch().items()}
+
     def get_field_mapping(self):
-        if self.collection == "Company_Install":
-            return {
-                "CompanyName": "CompanyName",
-                "ProgramName": "ProgramName",
-                "Felderítés": "1",
-                "Telepítés": "2",
-                "Elosztó": "3",
-                "Áram": "4",
-                "Hálózat": "5",
-                "PTG": "6",
-                "Szoftver": "7",
-                "Param": "8",
-                "Helyszín": "9"
-            }
-        else:  # Company_Demolition
-            return {
-                "CompanyName": "CompanyName",
-                "ProgramName": "ProgramName",
-                "Bontás": "1",
-                "Felszerelés": "2",
-                "Bázis Leszerelés": "3"
-            }
\ No newline at end of file
+        """Return {display name: db field} of the fields a patch may set."""
+        return {self.schema.header_by_field[field]: field for field in self.schema.editable_fields}
@@ -3,9 +3,11 @@ from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
+from src.schema import get_schema, NUMBER
+
 class ExcelExporter:
     @staticmethod
-    def export_to_excel(parent, company_table):
+    def export_to_excel(parent, companies, collection):
         try:
             filename, _ = QFileDialog.getSaveFileName(parent, "Export Excel", "", "Excel Files (*.xlsx)")
             if not filename:
@@ -19,6 +21,10 @@ class ExcelExporter:
                 "Áram", "Elosztó", "Szoftver", "Teszt", "Véglegesítve", "Megjegyzés",
                 "Megjegyzés ideje", "Véglegesités ideje"
             ]
+            schema = get_schema(collection)
+            # Derived columns (readiness etc.) follow the fixed report columns
+            derived_headers = [schema.header_by_field[field] for field in schema.derived_fields]
+            headers += derived_headers
 
             wb = Workbook()
             ws = wb.active
@@ -30,38 +36,72 @@ class ExcelExporter:
                 cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
                 cell.alignment = Alignment(horizontal="center", vertical="center")
 
+            def column(record, header):
+                # Columns the collection does not have stay empty
+                field = schema.field_by_header.get(header)
+                if field and schema.by_name[field].kind == NUMBER and record.get(field) is not None:
+                    return int(record[field])
+                return schema.display_value(field, record.get(field)) if field else ""
+
+            def status_flag(record, status):
+                return "Van" if record.get(schema.status_field) == status else "Nincs"
+
             # Add data
-            for row in range(company_table.rowCount()):
-                row_data = []
-                for col in range(1, company_table.columnCount()):  # Start from 1 to skip 'Select' column
-                    item = company_table.item(row, col)
-                    value = item.text() if item else ""
-                    if value.lower() in ['true', 'false', 'van', 'nincs']:
-                        value = "Van" if value.lower() in ['true', 'van'] else "Nincs"
-                    row_data.append(value)
-
-                # Map the data to the correct columns
-                mapped_data = [
-                    row_data[1] if len(row_data) > 1 else "",  # Telephely név (CompanyName)
-                    row_data[0] if len(row_data) > 0 else "",  # Telephely kód (ID)
+            for company in companies:
+                ws.append([
+                    column(company, "Name"),  # Telephely név
+                    column(company, "ID"),  # Telephely kód
                     "",  # Összes terminál igény (not available)
-                    "Van" if row_data[4] == "KIADVA" else "Nincs" if len(row_data) > 4 else "",  # Kiadva
-                    row_data[4] if len(row_data) > 4 else "",  # Kihelyezés (Telepítés)
-                    row_data[5] if len(row_data) > 5 else "",  # Áram
-                    row_data[6] if len(row_data) > 6 else "",  # Elosztó
-                    row_data[8] if len(row_data) > 8 else "",  # Szoftver
-                    "Van" if row_data[4] == "HELYSZINEN_TESZTELVE" else "Nincs" if len(row_data) > 4 else "",  # Teszt
-                    "Van" if row_data[4] == "KIRAKVA" else "Nincs" if len(row_data) > 4 else "",  # Véglegesítve
+                    status_flag(company, "KIADVA"),  # Kiadva
+                    schema.display_value(schema.status_field, company.get(schema.status_field)),  # Kihelyezés
+                    column(company, "Áram"),
+                    column(company, "Elosztó"),
+                    column(company, "Szoftver"),
+                    status_flag(company, "HELYSZINEN_TESZTELVE"),  # Teszt
+                    status_flag(company, "KIRAKVA"),  # Véglegesítve
                     "",  # Megjegyzés (not available)
                     "",  # Megjegyzés ideje (not available)
-                    row_data[-1] if row_data else ""  # Véglegesités ideje (LastModified)
-                ]
-
-                ws.append(mapped_data)
+                    column(company, "Last Modified")  # Véglegesités ideje
+                ] + [column(company, header) for header in derived_headers])
 
             wb.save(filename)
 
             QMessageBox.information(parent, "Export Complete", f"Data exported to {filename}")
         except Exception as e:
             logging.error(f"Error exporting to Excel: {e}")
-            QMessageBox.critical(parent, "Error", f"Failed to export to Excel: {str(e)}")
\ No newline at end of file
+            QMessageBox.critical(parent, "Error", f"Failed to export to Excel: {str(e)}")
+
+    @staticmethod
+    def export_pivot_to_excel(parent, title, row_header, row_labels, col_labels, values, percent=False):
+        try:
+            filename, _ = QFileDialog.getSaveFileName(parent, "Export Pivot", "", "Excel Files (*.xlsx)")
+            if not filename:
+                return
+
+            if not filename.endswith('.xlsx'):
+                filename += '.xlsx'
+
+            wb = Workbook()
+            ws = wb.active
+            ws.title = title[:31]  # Excel limits sheet names to 31 characters
+
+            headers = [row_header] + [str(label) for label in col_labels]
+            for col, header in enumerate(headers, start=1):
+                cell = ws.cell(row=1, column=col, value=header)
+                cell.font = Font(bold=True, color="FFFFFF")
+                cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+
+            for row, label in enumerate(row_labels, start=2):
+                ws.cell(row=row, column=1, value=str(label))
+                for col, value in enumerate(values[row - 2], start=2):
+                    cell = ws.cell(row=row, column=col, value=float(value) if percent else int(value))
+                    if percent:
+                        cell.number_format = "0%"
+
+            wb.save(filename)
+
+            QMessageBox.information(parent, "Export Complete", f"Data exported to {filename}")
+        except Exception as e:
+            logging.error(f"Error exporting pivot to Excel: {e}")
+            QMessageBox.critical(parent, "Error", f"Failed to export to Excel: {str(e)}")
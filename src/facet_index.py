@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class FacetIndex:
+    """Per-column value index over the rows of a table.
+
+    Every record gets a stable slot. Facet columns (few distinct values) keep
+    one Python int per value whose bit `slot` is set when the record has that
+    value, so filtering is a handful of bitwise AND/OR operations and facet
+    counts are popcounts. Changing one record only flips the bits of the
+    values it moved between. Other columns just keep their values by slot;
+    a per-value bitmap would cost O(rows) memory for each unique value.
+    """
+
+    def __init__(self, facet_columns=(), text_columns=()):
+        self.facet_columns = list(facet_columns)
+        self.columns = self.facet_columns + [column for column in text_columns if column not in facet_columns]
+        self.clear()
+
+    def clear(self):
+        self.bitmaps = {column: {} for column in self.facet_columns}
+        self.values_by_slot = {column: [] for column in self.columns}
+        self.slot_by_key = {}
+        self.key_by_slot = []
+        self.free_slots = []
+        self.all_mask = 0
+
+    def __len__(self):
+        return len(self.slot_by_key)
+
+    def set_row(self, key, values):
+        """Index (or re-index) a record; values maps column -> value. Returns the record's slot."""
+        slot = self.slot_by_key.get(key)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.key_by_slot[slot] = key
+            else:
+                slot = len(self.key_by_slot)
+                self.key_by_slot.append(key)
+                for column_values in self.values_by_slot.values():
+                    column_values.append(None)
+            self.slot_by_key[key] = slot
+            self.all_mask |= 1 << slot
+        bit = 1 << slot
+        for column in self.columns:
+            if column not in values:
+                continue
+            value = values[column]
+            old_value = self.values_by_slot[column][slot]
+            if old_value == value:
+                continue
+            self.values_by_slot[column][slot] = value
+            if column in self.bitmaps:
+                if old_value is not None:
+                    self._clear_bit(column, old_value, bit)
+                bitmaps = self.bitmaps[column]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        return slot
+
+    def _clear_bit(self, column, value, bit):
+        bitmaps = self.bitmaps[column]
+        remaining = bitmaps.get(value, 0) & ~bit
+        if remaining:
+            bitmaps[value] = remaining
+        else:
+            bitmaps.pop(value, None)
+
+    def remove_row(self, key):
+        slot = self.slot_by_key.pop(key, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        for column in self.columns:
+            value = self.values_by_slot[column][slot]
+            if value is not None and column in self.bitmaps:
+                self._clear_bit(column, value, bit)
+            self.values_by_slot[column][slot] = None
+        self.all_mask &= ~bit
+        self.key_by_slot[slot] = None
+        self.free_slots.append(slot)
+
+    def slot(self, key):
+        return self.slot_by_key.get(key)
+
+    def key_for_slot(self, slot):
+        return self.key_by_slot[slot]
+
+    def value(self, column, key):
+        slot = self.slot_by_key.get(key)
+        return None if slot is None else self.values_by_slot[column][slot]
+
+    def value_mask(self, column, values):
+        """Records whose value in a facet column is any of values."""
+        mask = 0
+        bitmaps = self.bitmaps[column]
+        for value in values:
+            mask |= bitmaps.get(value, 0)
+        return mask
+
+    def matching_mask(self, column, predicate):
+        """Records whose value in column satisfies predicate.
+
+        Facet columns only test their distinct values; other columns test
+        every record once and assemble the mask as bytes.
+        """
+        if column in self.bitmaps:
+            return self.value_mask(column, [value for value in self.bitmaps[column] if predicate(value)])
+        bits = bytearray((len(self.key_by_slot) + 7) // 8)
+        for slot, value in enumerate(self.values_by_slot[column]):
+            if value is not None and predicate(value):
+                bits[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(bits, "little")
+
+    def counts(self, column, mask=None):
+        """{value: number of records with that value} within mask (all records by default)."""
+        if mask is None:
+            return {value: bitmap.bit_count() for value, bitmap in self.bitmaps[column].items()}
+        return {value: (bitmap & mask).bit_count() for value, bitmap in self.bitmaps[column].items()}
+
+    @staticmethod
+    def iter_slots(mask):
+        """Yield the slots set in mask, in ascending order."""
+        if mask.bit_count() <= 64:
+            while mask:
+                low = mask & -mask
+                yield low.bit_length() - 1
+                mask ^= low
+            return
+        # Peeling bits off a large int copies it every time, unpack it once instead
+        data = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        yield from np.flatnonzero(np.unpackbits(data, bitorder="little")).tolist()
@@ -0,0 +1,796 @@
+import enum
+import functools
+import logging
+import queue
+import random
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from src.firestore_backend import FirestoreBackend
+from src.schema import BOOLEAN, OPTION, SEARCH_FIELD, get_schema, normalize_search_text
+
+DOCUMENT_ID = "__name__"
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+MAX_BATCH_WRITES = 500
+
+
+class FakeFirestoreError(Exception):
+    pass
+
+
+class AlreadyExists(FakeFirestoreError):
+    pass
+
+
+class NotFound(FakeFirestoreError):
+    pass
+
+
+class FailedPrecondition(FakeFirestoreError):
+    pass
+
+
+class InvalidArgument(FakeFirestoreError):
+    pass
+
+
+class ServiceUnavailable(FakeFirestoreError):
+    """Raised by an RPC chosen by the failure injection."""
+
+
+class Sentinel:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+DELETE_FIELD = Sentinel("DELETE_FIELD")
+SERVER_TIMESTAMP = Sentinel("SERVER_TIMESTAMP")
+
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class FakeFirestoreBackend(FirestoreBackend):
+    """In-memory stand-in for a Firestore project, for benchmarks and runs without credentials.
+
+    Implements the part of the client API FirestoreService uses:
+    collections and subcollections (and listing them), where/order_by/limit/
+    select, start_after cursors, count() aggregations, get_all, batches,
+    transactions, update-time preconditions, on_snapshot listeners, and the
+    DELETE_FIELD, SERVER_TIMESTAMP and ArrayUnion values.
+
+    Every RPC (a get, a query, an aggregation, a commit) waits latency
+    seconds plus up to jitter either way, and fails with ServiceUnavailable
+    with probability failure_rate. Timings and failures come from one
+    generator seeded with seed, so a run can be repeated. stats counts the
+    RPCs by kind and the documents read and written, as Firestore would
+    bill them.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, failing_rpcs=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        # Kinds of RPC the failure injection applies to, all when None
+        self.failing_rpcs = set(failing_rpcs) if failing_rpcs is not None else None
+        self.stats = Counter()
+        self.store = FakeStore()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._client = FakeClient(self)
+
+    def rpc(self, kind):
+        """Count an RPC and apply the injected latency and failures to it."""
+        with self._lock:
+            self.stats[kind] += 1
+            delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            fail = self.failure_rate and (self.failing_rpcs is None or kind in self.failing_rpcs) \
+                and self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ServiceUnavailable(f"Injected failure of {kind}")
+
+    def record(self, reads=0, writes=0):
+        with self._lock:
+            self.stats["reads"] += reads
+            self.stats["writes"] += writes
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = Counter()
+
+    def random_id(self, length=20):
+        with self._lock:
+            return "".join(self._random.choice(string.ascii_letters + string.digits) for _ in range(length))
+
+    # FirestoreBackend
+
+    def connect(self):
+        self.rpc("connect")
+        return self._client
+
+    def delete_field(self):
+        return DELETE_FIELD
+
+    def server_timestamp(self):
+        return SERVER_TIMESTAMP
+
+    def array_union(self, values):
+        return ArrayUnion(values)
+
+    def document_id(self):
+        return DOCUMENT_ID
+
+    def transactional(self, function):
+        @functools.wraps(function)
+        def run(transaction, *args, **kwargs):
+            # Transactions are serialized instead of retried on contention
+            with self.store.lock:
+                result = function(transaction, *args, **kwargs)
+                transaction.commit()
+            return result
+        return run
+
+    def parse_update_time(self, value):
+        # FirestoreService.format_update_time strings: 2024-05-01T10:00:00.123456789Z
+        seconds, fraction = value.rstrip("Z").split(".")
+        parsed = datetime.strptime(seconds, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+        return parsed + timedelta(microseconds=int(fraction.ljust(9, "0")[:6]))
+
+    def conflict_errors(self):
+        return AlreadyExists, FailedPrecondition, NotFound
+
+    def already_exists_error(self):
+        return AlreadyExists
+
+    def retryable_errors(self):
+        return ServiceUnavailable,
+
+
+class FakeDocument:
+    __slots__ = ("data", "create_time", "update_time")
+
+    def __init__(self, data, create_time, update_time):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+class FakeStore:
+    """Documents by collection path and ID, with commit times and snapshot listeners."""
+
+    def __init__(self):
+        self.collections = {}  # "Company_Install" or "Company_Install/123/comments" -> {doc_id: FakeDocument}
+        self.lock = threading.RLock()
+        self._last_time = datetime.fromtimestamp(0, timezone.utc)
+        self._watches = []
+        self._events = None
+
+    def documents(self, path):
+        return self.collections.setdefault(path, {})
+
+    def next_time(self):
+        # Commit times are unique and increasing, so they work as preconditions
+        now = datetime.now(timezone.utc)
+        self._last_time = max(now, self._last_time + timedelta(microseconds=1))
+        return self._last_time
+
+    def put(self, path, doc_id, data):
+        """Store a document directly, without latency, stats or listeners (for seeding)."""
+        with self.lock:
+            now = self.next_time()
+            self.documents(path)[doc_id] = FakeDocument(_copy_data(data), now, now)
+
+    def commit(self, writes):
+        """Apply (op, path, doc_id, data, merge, option) writes atomically; returns their update times."""
+        if len(writes) > MAX_BATCH_WRITES:
+            raise InvalidArgument(f"A batch can contain at most {MAX_BATCH_WRITES} writes, got {len(writes)}")
+        with self.lock:
+            now = self.next_time()
+            # Each write sees the ones before it, nothing is stored unless all of them succeed
+            staged = {}
+            for op, path, doc_id, data, merge, option in writes:
+                key = (path, doc_id)
+                existing = staged[key] if key in staged else self.documents(path).get(doc_id)
+                if option is not None and (existing is None or existing.update_time != option.last_update_time):
+                    raise FailedPrecondition(f"{path}/{doc_id} changed since {option.last_update_time}")
+                if op == "create" and existing is not None:
+                    raise AlreadyExists(f"Document already exists: {path}/{doc_id}")
+                if op == "update" and existing is None:
+                    raise NotFound(f"No document to update: {path}/{doc_id}")
+                if op == "delete":
+                    staged[key] = None
+                    continue
+                if op == "update":
+                    new_data = _copy_data(existing.data)
+                    for field_path, value in data.items():
+                        _apply_value(new_data, field_path.split("."), value, now)
+                elif op == "set" and merge and existing is not None:
+                    new_data = _copy_data(existing.data)
+                    _merge(new_data, data, now)
+                else:
+                    new_data = {}
+                    _merge(new_data, data, now)
+                created = existing.create_time if existing is not None else now
+                staged[key] = FakeDocument(new_data, created, now)
+            for (path, doc_id), document in staged.items():
+                if document is None:
+                    self.documents(path).pop(doc_id, None)
+                else:
+                    self.documents(path)[doc_id] = document
+        self.notify({path for _, path, _, _, _, _ in writes})
+        return [now] * len(writes)
+
+    def watch(self, watch):
+        with self.lock:
+            self._watches.append(watch)
+            if self._events is None:
+                self._events = queue.Queue()
+                threading.Thread(target=self._dispatch, name="fake-firestore-listen", daemon=True).start()
+        self._events.put(watch)
+
+    def unwatch(self, watch):
+        with self.lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def notify(self, paths):
+        if self._events is None:
+            return
+        with self.lock:
+            watches = [watch for watch in self._watches if watch.path in paths]
+        for watch in watches:
+            self._events.put(watch)
+
+    def _dispatch(self):
+        # Like the SDK, listeners are called on a background thread
+        while True:
+            watch = self._events.get()
+            try:
+                watch.deliver()
+            except Exception as e:
+                logging.error(f"Snapshot listener failed: {e}", exc_info=True)
+
+
+class FakeClient:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def collection(self, path):
+        return FakeCollectionReference(self._backend, path)
+
+    def document(self, path):
+        collection_path, doc_id = path.rsplit("/", 1)
+        return FakeDocumentReference(self._backend, collection_path, doc_id)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        references = list(references)
+        self._backend.rpc("batch_get")
+        self._backend.record(reads=len(references))
+        for reference in references:
+            yield FakeSnapshot(reference, reference._document(), field_paths)
+
+    def batch(self):
+        return FakeWriteBatch(self._backend)
+
+    def transaction(self):
+        return FakeTransaction(self._backend)
+
+    def write_option(self, last_update_time=None):
+        return FakeWriteOption(last_update_time)
+
+
+class FakeWriteOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class FakeWriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class FakeSnapshot:
+    def __init__(self, reference, document, fields=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = document is not None
+        self.create_time = document.create_time if document is not None else None
+        self.update_time = document.update_time if document is not None else None
+        self._data = document.data if document is not None else None
+        self._fields = fields
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        if self._fields is None:
+            return _copy_data(self._data)
+        return {field: _copy_value(self._data[field]) for field in self._fields if field in self._data}
+
+    def get(self, field_path):
+        value = _get_field(self._data or {}, field_path.split("."))
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return value
+
+
+class FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias or "field_1"
+
+    def get(self):
+        backend = self._query._backend
+        backend.rpc("aggregate")
+        count = len(self._query.execute())
+        backend.record(reads=count // 1000 + 1)
+        return [[FakeAggregationResult(self._alias, count)]]
+
+
+class FakeQuery:
+    ASCENDING = ASCENDING
+    DESCENDING = DESCENDING
+
+    def __init__(self, backend, path, filters=(), orders=(), limit_count=None, cursor=None, fields=None):
+        self._backend = backend
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+        self._cursor = cursor
+        self._fields = fields
+
+    def _copy(self, **changes):
+        values = dict(filters=self._filters, orders=self._orders, limit_count=self._limit, cursor=self._cursor,
+                      fields=self._fields)
+        values.update(changes)
+        return FakeQuery(self._backend, self._path, **values)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise InvalidArgument(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + ((_field_name(field_path), op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((_field_name(field_path), str(direction).upper()),))
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=[_field_name(field) for field in field_paths])
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self, alias=None):
+        return FakeAggregationQuery(self, alias)
+
+    def execute(self):
+        """Matching (doc_id, FakeDocument) pairs in query order, without latency or stats."""
+        with self._backend.store.lock:
+            documents = list(self._backend.store.documents(self._path).items())
+        matches = [(doc_id, document) for doc_id, document in documents
+                   if all(_matches(_value_of(doc_id, document.data, field), op, value)
+                          for field, op, value in self._filters)]
+        orders = list(self._orders)
+        if not orders or orders[-1][0] != DOCUMENT_ID:
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else ASCENDING))
+        # Documents without an ordered field are left out, as in Firestore
+        matches = [(doc_id, document) for doc_id, document in matches
+                   if all(_has_field(doc_id, document.data, field) for field, _ in orders)]
+        directions = [direction for _, direction in orders]
+        keyed = [([_value_of(doc_id, document.data, field) for field, _ in orders], (doc_id, document))
+                 for doc_id, document in matches]
+        if len(orders) == 1:
+            # Only the document ID, the common case of full loads and paging
+            keyed.sort(key=lambda item: item[1][0], reverse=directions[0] == DESCENDING)
+        else:
+            keyed.sort(key=functools.cmp_to_key(lambda a, b: _compare(a[0], b[0], directions)))
+        if self._cursor is not None:
+            cursor_values = self._cursor_values(orders)
+            keyed = [item for item in keyed if _compare(item[0], cursor_values, directions) > 0]
+        results = [item[1] for item in keyed]
+        return results[:self._limit] if self._limit is not None else results
+
+    def _cursor_values(self, orders):
+        cursor = self._cursor
+        if isinstance(cursor, FakeSnapshot):
+            return [_value_of(cursor.id, cursor._data or {}, field) for field, _ in orders]
+        return [_value_of(cursor.get(DOCUMENT_ID), cursor, field) for field, _ in orders]
+
+    def _snapshots(self, matches):
+        return [FakeSnapshot(FakeDocumentReference(self._backend, self._path, doc_id), document, self._fields)
+                for doc_id, document in matches]
+
+    def stream(self, transaction=None):
+        self._backend.rpc("query")
+        snapshots = self._snapshots(self.execute())
+        # An empty result is still billed one read
+        self._backend.record(reads=max(len(snapshots), 1))
+        return iter(snapshots)
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction))
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self._backend, self._path, lambda: self._snapshots(self.execute()), callback)
+        self._backend.store.watch(watch)
+        return watch
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, backend, path):
+        super().__init__(backend, path)
+
+    @property
+    def id(self):
+        return self._path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._backend, self._path, document_id or self._backend.random_id())
+
+    def add(self, document_data, document_id=None):
+        doc_ref = self.document(document_id)
+        return doc_ref.create(document_data).update_time, doc_ref
+
+
+class FakeDocumentReference:
+    def __init__(self, backend, collection_path, doc_id):
+        self._backend = backend
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._backend, self._collection_path)
+
+    def collection(self, collection_id):
+        return FakeCollectionReference(self._backend, f"{self.path}/{collection_id}")
+
+    def collections(self):
+        """The subcollections that hold documents, like listCollectionIds."""
+        self._backend.rpc("list_collections")
+        prefix = f"{self.path}/"
+        with self._backend.store.lock:
+            paths = [path for path, documents in self._backend.store.collections.items()
+                     if documents and path.startswith(prefix) and "/" not in path[len(prefix):]]
+        return iter([FakeCollectionReference(self._backend, path) for path in sorted(paths)])
+
+    def _document(self):
+        with self._backend.store.lock:
+            return self._backend.store.documents(self._collection_path).get(self.id)
+
+    def get(self, field_paths=None, transaction=None):
+        self._backend.rpc("get")
+        self._backend.record(reads=1)
+        return FakeSnapshot(self, self._document(), field_paths)
+
+    def _commit(self, op, data=None, merge=False, option=None):
+        batch = FakeWriteBatch(self._backend)
+        batch._add(op, self, data, merge, option)
+        return batch.commit()[0]
+
+    def create(self, document_data):
+        return self._commit("create", document_data)
+
+    def set(self, document_data, merge=False):
+        return self._commit("set", document_data, merge)
+
+    def update(self, field_updates, option=None):
+        return self._commit("update", field_updates, option=option)
+
+    def delete(self, option=None):
+        return self._commit("delete", option=option).update_time
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self._backend, self._collection_path, lambda: [FakeSnapshot(self, self._document())],
+                          callback, self.id)
+        self._backend.store.watch(watch)
+        return watch
+
+
+class FakeWriteBatch:
+    def __init__(self, backend):
+        self._backend = backend
+        self._writes = []
+
+    def _add(self, op, reference, data, merge, option):
+        self._writes.append((op, reference._collection_path, reference.id, data, merge, option))
+
+    def create(self, reference, document_data):
+        self._add("create", reference, document_data, False, None)
+
+    def set(self, reference, document_data, merge=False):
+        self._add("set", reference, document_data, merge, None)
+
+    def update(self, reference, field_updates, option=None):
+        self._add("update", reference, field_updates, False, option)
+
+    def delete(self, reference, option=None):
+        self._add("delete", reference, None, False, option)
+
+    def commit(self):
+        self._backend.rpc("commit")
+        update_times = self._backend.store.commit(self._writes)
+        self._backend.record(writes=len(self._writes))
+        self._writes = []
+        return [FakeWriteResult(update_time) for update_time in update_times]
+
+
+class FakeTransaction(FakeWriteBatch):
+    pass
+
+
+class FakeDocumentChange:
+    def __init__(self, type, document, old_index, new_index):
+        self.type = type
+        self.document = document
+        self.old_index = old_index
+        self.new_index = new_index
+
+
+class FakeWatch:
+    """A snapshot listener; calls callback(snapshots, changes, read_time) on every change it sees."""
+
+    def __init__(self, backend, path, run, callback, doc_id=None):
+        self._backend = backend
+        self.path = path
+        self._run = run
+        self._callback = callback
+        self._doc_id = doc_id
+        self._last = None  # doc_id -> (index, update_time) of the previous delivery
+
+    def deliver(self):
+        snapshots = [snapshot for snapshot in self._run() if snapshot.exists or self._doc_id is not None]
+        current = {snapshot.id: (index, snapshot.update_time) for index, snapshot in enumerate(snapshots)
+                   if snapshot.exists}
+        previous = self._last or {}
+        if self._last is not None and current == previous:
+            return  # A commit to another document of the collection
+        changes = []
+        for doc_id, (old_index, _) in previous.items():
+            if doc_id not in current:
+                removed = FakeSnapshot(FakeDocumentReference(self._backend, self.path, doc_id), None)
+                changes.append(FakeDocumentChange(ChangeType.REMOVED, removed, old_index, -1))
+        by_id = {snapshot.id: snapshot for snapshot in snapshots}
+        for doc_id, (new_index, update_time) in current.items():
+            if doc_id not in previous:
+                changes.append(FakeDocumentChange(ChangeType.ADDED, by_id[doc_id], -1, new_index))
+            elif previous[doc_id][1] != update_time:
+                changes.append(FakeDocumentChange(ChangeType.MODIFIED, by_id[doc_id], previous[doc_id][0],
+                                                  new_index))
+        self._last = current
+        self._backend.rpc("listen")
+        self._backend.record(reads=max(len(changes), 1))
+        self._callback(snapshots, changes, datetime.now(timezone.utc))
+
+    def unsubscribe(self):
+        self._backend.store.unwatch(self)
+
+
+# Values, field paths and ordering
+
+def _field_name(field_path):
+    return field_path if isinstance(field_path, str) else field_path.to_api_repr()
+
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    return value
+
+
+def _copy_data(data):
+    return {key: _copy_value(value) if isinstance(value, (dict, list)) else value for key, value in data.items()}
+
+
+_MISSING = object()
+
+
+def _get_field(data, parts):
+    for part in parts:
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def _value_of(doc_id, data, field):
+    return doc_id if field == DOCUMENT_ID else _get_field(data, field.split("."))
+
+
+def _has_field(doc_id, data, field):
+    return _value_of(doc_id, data, field) is not _MISSING
+
+
+def _resolve(value, now):
+    if value is SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, dict):
+        return {key: _resolve(item, now) for key, item in value.items() if item is not DELETE_FIELD}
+    return _copy_value(value)
+
+
+def _apply_value(data, parts, value, now):
+    for part in parts[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    if value is DELETE_FIELD:
+        data.pop(parts[-1], None)
+    elif isinstance(value, ArrayUnion):
+        current = data.get(parts[-1])
+        current = list(current) if isinstance(current, list) else []
+        current.extend(item for item in value.values if item not in current)
+        data[parts[-1]] = current
+    else:
+        data[parts[-1]] = _resolve(value, now)
+
+
+def _merge(data, updates, now):
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(data.get(key), dict):
+            _merge(data[key], value, now)
+        else:
+            _apply_value(data, [key], value, now)
+
+
+def _type_rank(value):
+    # Firestore orders values of different types by type first
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, list):
+        return 7
+    if isinstance(value, dict):
+        return 8
+    return 6
+
+
+def _compare_values(a, b):
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 7:
+        for item_a, item_b in zip(a, b):
+            result = _compare_values(item_a, item_b)
+            if result:
+                return result
+        return (len(a) > len(b)) - (len(a) < len(b))
+    if rank_a == 8:
+        return _compare_values(sorted(a.items()), sorted(b.items()))
+    if rank_a in (0, 6):
+        return 0 if rank_a == 0 else (str(a) > str(b)) - (str(a) < str(b))
+    return (a > b) - (a < b)
+
+
+def _compare(values_a, values_b, directions):
+    for a, b, direction in zip(values_a, values_b, directions):
+        result = _compare_values(a, b)
+        if result:
+            return -result if direction == DESCENDING else result
+    return 0
+
+
+def _equal(a, b):
+    return _type_rank(a) == _type_rank(b) and _compare_values(a, b) == 0
+
+
+def _matches(value, op, expected):
+    if value is _MISSING:
+        return False
+    if op == "==":
+        return _equal(value, expected)
+    if op == "!=":
+        return value is not None and not _equal(value, expected)
+    if op == "in":
+        return any(_equal(value, item) for item in expected)
+    if op == "not-in":
+        return value is not None and not any(_equal(value, item) for item in expected)
+    if op == "array_contains":
+        return isinstance(value, list) and any(_equal(item, expected) for item in value)
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(_equal(item, wanted) for item in value for wanted in expected)
+    # Range filters only match values of the same type
+    if _type_rank(value) != _type_rank(expected):
+        return False
+    result = _compare_values(value, expected)
+    return {"<": result < 0, "<=": result <= 0, ">": result > 0, ">=": result >= 0}[op]
+
+
+_OPERATORS = {"==", "!=", "<", "<=", ">", ">=", "in", "not-in", "array_contains", "array_contains_any"}
+
+
+# Seeded datasets
+
+FESTIVAL_NAMES = ["Sziget", "VOLT", "Balaton Sound", "EFOTT", "Campus", "Strand", "Fishing on Orfű", "Bánkitó",
+                  "Művészetek Völgye", "Kolorádó", "Gyulai Várszínház", "Szegedi Ifjúsági Napok"]
+_OWNERS = ["Nagy", "Kovács", "Tóth", "Szabó", "Horváth", "Varga", "Kiss", "Molnár", "Németh", "Farkas", "Balogh",
+           "Papp", "Takács", "Juhász", "Lakatos", "Mészáros", "Oláh", "Simon", "Rácz", "Fekete"]
+_TRADES = ["Lángos", "Kürtőskalács", "Büfé", "Pizza", "Koktélbár", "Sörkert", "Gulyás", "Palacsinta", "Burger",
+           "Kávézó", "Fagyi", "Hot-dog", "Pálinka", "Limonádé", "Gyros", "Ékszer", "Póló", "Kalap"]
+_FORMS = ["Kft", "Bt", "Zrt", "Kft.", "és Társa Kft", "EV"]
+_COMMENT_TEXTS = ["Áram bekötve", "Hiányzik az elosztó", "Helyszín rendben", "Szoftver frissítve",
+                  "Visszahívást kér", "Hálózat instabil", "PTG kiadva", "Bontás elkezdve"]
+
+
+def generate_dataset(backend, companies=1000, festivals=8, seed=0, comments_per_company=0,
+                     collections=("Company_Install", "Company_Demolition")):
+    """Fill backend with festivals and companies that look like production data.
+
+    The same seed always gives the same data. Festival sizes are skewed (the
+    first ones are the biggest), statuses favour the early steps and flags
+    are set more often on companies further along. Returns the festival
+    names.
+    """
+    rng = random.Random(seed)
+    names = [FESTIVAL_NAMES[i % len(FESTIVAL_NAMES)] + (f" {2020 + i // len(FESTIVAL_NAMES)}"
+                                                       if i >= len(FESTIVAL_NAMES) else "")
+             for i in range(festivals)]
+    for index, name in enumerate(names):
+        backend.store.put("Programs", f"program{index:03d}", {"ProgramName": name})
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    started = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+    for collection in collections:
+        schema = get_schema(collection)
+        fields = [field for field in schema.fields if not field.derived]
+        for number in range(companies):
+            company_id = f"{1700000000000 + number * 1000 + rng.randrange(1000)}"
+            company_name = f"{rng.choice(_OWNERS)} {rng.choice(_TRADES)} {rng.choice(_FORMS)}"
+            # How far along the company is, drives its status and flags
+            progress = rng.random()
+            data = {"Id": company_id, "CompanyName": company_name, SEARCH_FIELD: normalize_search_text(company_name),
+                    "ProgramName": rng.choices(names, weights)[0],
+                    "LastModified": started + timedelta(seconds=rng.randrange(90 * 24 * 3600))}
+            for field in fields:
+                if field.kind == OPTION:
+                    step = min(int(progress * len(field.options) * rng.uniform(0.6, 1.2)), len(field.options) - 1)
+                    data[field.name] = field.options[step]
+                elif field.kind == BOOLEAN:
+                    data[field.name] = rng.random() < progress
+            backend.store.put(collection, company_id, data)
+            for comment_number in range(comments_per_company):
+                comment_id = f"{company_id}{comment_number:03d}"
+                backend.store.put(f"{collection}/{company_id}/comments", comment_id, {
+                    "Id": comment_id, "Text": rng.choice(_COMMENT_TEXTS), "Author": rng.choice(_OWNERS),
+                    "CreatedAt": data["LastModified"] - timedelta(hours=comment_number)})
+    logging.info(f"Generated {companies} companies per collection in {len(names)} festivals (seed {seed})")
+    return names
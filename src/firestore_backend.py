@@ -0,0 +1,129 @@
+import logging
+import os
+
+# Set by `gcloud emulators firestore start`; the Google client then talks to the emulator
+EMULATOR_HOST_ENV = "FIRESTORE_EMULATOR_HOST"
+DEFAULT_CREDENTIALS_PATH = r"C:\Users\Balogh Csaba\IdeaProjects\pythonrunnerapp\resources\runnerapp-232cc-firebase-adminsdk-2csiq-331f965683.json"
+
+
+class FirestoreBackend:
+    """Where FirestoreService's client and the special values it writes come from.
+
+    connect() returns an object with the google-cloud-firestore Client API
+    (collection, document, batch, transaction, write_option and the query
+    methods FirestoreService uses). The other methods supply the SDK
+    values, so the service never imports the SDK itself and can run
+    against src.fake_firestore instead of a real project.
+    """
+
+    def connect(self):
+        raise NotImplementedError
+
+    def delete_field(self):
+        raise NotImplementedError
+
+    def server_timestamp(self):
+        raise NotImplementedError
+
+    def array_union(self, values):
+        raise NotImplementedError
+
+    def document_id(self):
+        """Field path of the document ID, for ordering, cursors and ID-only projections."""
+        raise NotImplementedError
+
+    def transactional(self, function):
+        """Decorate function(transaction) so calling it with a transaction runs and commits it."""
+        raise NotImplementedError
+
+    def parse_update_time(self, value):
+        """Turn a FirestoreService.format_update_time string into a last_update_time precondition."""
+        raise NotImplementedError
+
+    def conflict_errors(self):
+        """Exceptions a commit raises when a create, precondition or update finds the document changed."""
+        raise NotImplementedError
+
+    def already_exists_error(self):
+        """Exception a create raises when the document exists."""
+        raise NotImplementedError
+
+    def retryable_errors(self):
+        """Exceptions of transient failures (contention, quota, unavailable, deadline) worth retrying."""
+        raise NotImplementedError
+
+
+class GoogleFirestoreBackend(FirestoreBackend):
+    """The real Firestore project, through firebase_admin and a service account file.
+
+    The SDK is imported on first use: it takes longer to import than the
+    window takes to show.
+    """
+
+    def __init__(self, credentials_path=None):
+        credentials_path = credentials_path or DEFAULT_CREDENTIALS_PATH
+        if not os.path.exists(credentials_path):
+            logging.error(f"Firebase credentials file not found at: {credentials_path}")
+            raise FileNotFoundError(f"Firebase credentials file not found at: {credentials_path}")
+        self.credentials_path = credentials_path
+
+    def connect(self):
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        cred = credentials.Certificate(self.credentials_path)
+        firebase_admin.initialize_app(cred)
+        return firestore.client()
+
+    def delete_field(self):
+        from google.cloud.firestore_v1.transforms import DELETE_FIELD
+        return DELETE_FIELD
+
+    def server_timestamp(self):
+        from google.cloud.firestore_v1.transforms import SERVER_TIMESTAMP
+        return SERVER_TIMESTAMP
+
+    def array_union(self, values):
+        from google.cloud.firestore_v1.transforms import ArrayUnion
+        return ArrayUnion(values)
+
+    def document_id(self):
+        from google.cloud.firestore_v1.field_path import FieldPath
+        return FieldPath.document_id()
+
+    def transactional(self, function):
+        from google.cloud.firestore_v1 import transactional
+        return transactional(function)
+
+    def parse_update_time(self, value):
+        from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+        return DatetimeWithNanoseconds.from_rfc3339(value).timestamp_pb()
+
+    def conflict_errors(self):
+        from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+        from google.cloud.exceptions import NotFound
+        return AlreadyExists, FailedPrecondition, NotFound
+
+    def already_exists_error(self):
+        from google.api_core.exceptions import AlreadyExists
+        return AlreadyExists
+
+    def retryable_errors(self):
+        from google.api_core.exceptions import (Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted,
+                                                ServiceUnavailable)
+        return Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable
+
+
+class EmulatorFirestoreBackend(GoogleFirestoreBackend):
+    """A local Firestore emulator at FIRESTORE_EMULATOR_HOST, for load tests; no credentials needed.
+
+    Every connect() returns a new client, so each simulated user gets its own.
+    """
+
+    def __init__(self, project="demo-runnerapp"):
+        if not os.environ.get(EMULATOR_HOST_ENV):
+            raise ValueError(f"{EMULATOR_HOST_ENV} is not set, start the emulator and export its host:port")
+        self.project = project
+
+    def connect(self):
+        from google.cloud import firestore
+        return firestore.Client(project=self.project)
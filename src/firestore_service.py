@@ -1,71 +1,370 @@
-import time
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
 import logging
-from google.cloud.exceptions import NotFound
-from google.cloud.firestore_v1.transforms import DELETE_FIELD
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.firestore_backend import GoogleFirestoreBackend
+from src.id_allocator import IdAllocator
+from src.instrumentation import FirestoreMetrics, estimate_documents_size, estimate_size, instrumented
+from src.schema import SEARCH_FIELD, get_schema, normalize_search_text
+from src.write_scheduler import WriteScheduler
+
+# The client and the SDK's special values come from a FirestoreBackend: the real project
+# (imported on first use, usually on a background thread) or the in-memory src.fake_firestore.
+
+# Every method that talks to Firestore is @instrumented: its latency and errors are recorded
+# per calling view in self.metrics, and it reports the documents it is billed for with
+# self.metrics.add_usage(). A query is billed at least one read even when it matches nothing.
+
+# Every write goes through self.write_scheduler, which rate-limits it, caps the writes in flight
+# per document and retries transient failures of writes that are safe to repeat.
+
+# Key under which read methods attach the document's server update time to a record
+UPDATE_TIME_FIELD = "_updateTime"
 
-class FirestoreService:
-    def __init__(self, credentials_path=None):
-        if credentials_path is None:
-            credentials_path = r"C:\Users\Balogh Csaba\IdeaProjects\pythonrunnerapp\resources\runnerapp-232cc-firebase-adminsdk-2csiq-331f965683.json"
 
-        if not os.path.exists(credentials_path):
-            logging.error(f"Firebase credentials file not found at: {credentials_path}")
-            raise FileNotFoundError(f"Firebase credentials file not found at: {credentials_path}")
+class WriteConflictError(Exception):
+    """A write was rejected because the document changed (or vanished) since it was read."""
 
-        cred = credentials.Certificate(credentials_path)
-        firebase_admin.initialize_app(cred)
-        self.db = firestore.client()
+
+class FirestoreService:
+    # Firestore rejects batches with more than 500 writes
+    MAX_BATCH_SIZE = 500
+    BULK_WRITE_WORKERS = 4
+    COUNT_CACHE_TTL = 60  # seconds
+    FESTIVAL_CACHE_TTL = 300  # seconds
+    SEARCH_LIMIT = 50
+    COMMENTS_SUBCOLLECTION = 'comments'
+    COMMENTS_PAGE_SIZE = 20
+    # Field names the legacy comment maps used for their timestamp
+    LEGACY_COMMENT_TIME_FIELDS = ('CreatedAt', 'createdAt', 'Timestamp', 'timestamp', 'Date', 'date')
+
+    def __init__(self, credentials_path=None, backend=None, write_scheduler=None):
+        # Without a backend the real project is used, with the service account file at credentials_path
+        self.backend = backend or GoogleFirestoreBackend(credentials_path)
+        self._db = None
+        self._connect_lock = threading.Lock()
+        self.metrics = FirestoreMetrics()
+        self.write_scheduler = write_scheduler or WriteScheduler(self.backend.retryable_errors)
+        self.id_allocator = IdAllocator(node_lease=self.lease_node_id)
+        self._count_cache = {}
+        self._festival_cache = None
+        self._festival_lock = threading.Lock()
+        self._festival_refresh = None  # Thread fetching a fresh festival list while the stale one is shown
         logging.info("FirestoreService initialized successfully")
 
-    def get_festivals(self):
+    @property
+    def db(self):
+        if self._db is None:
+            self.connect()
+        return self._db
+
+    @instrumented
+    def connect(self):
+        """Create the backend's client; done on first use so startup does not wait for it.
+
+        Callers on other threads block until the first connect has finished.
+        """
+        with self._connect_lock:
+            if self._db is None:
+                started = time.perf_counter()
+                self._db = self.backend.connect()
+                logging.info(f"Connected to Firestore in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return self._db
+
+    @instrumented
+    def get_festivals(self, max_age=FESTIVAL_CACHE_TTL, wait=False):
+        """Return the festival names; a list fetched at most max_age seconds ago is reused.
+
+        An older list is returned as it is while a fresh one is fetched in
+        the background, unless wait is set, so dialogs opening on the UI
+        thread never wait for Firestore once the list has been loaded.
+        """
+        cached = self._festival_cache
+        if max_age is not None and cached:
+            if time.monotonic() - cached[0] <= max_age:
+                return list(cached[1])
+            if not wait:
+                self._refresh_festivals_in_background()
+                return list(cached[1])
+        return self._fetch_festivals()
+
+    def _fetch_festivals(self):
         logging.info("Fetching festivals")
         try:
             festivals = self.db.collection('Programs').get()
             result = [festival.to_dict().get('ProgramName', 'Unknown Festival') for festival in festivals]
+            self.metrics.add_usage(reads=max(len(result), 1), bytes_read=estimate_documents_size(result))
+            self._festival_cache = (time.monotonic(), result)
             logging.info(f"Successfully fetched {len(result)} festivals")
-            return result
+            return list(result)
         except Exception as e:
             logging.error(f"Error fetching festivals: {e}", exc_info=True)
             return []
 
+    def _refresh_festivals_in_background(self):
+        with self._festival_lock:
+            if self._festival_refresh is not None and self._festival_refresh.is_alive():
+                return
+            # A failed refresh keeps the old list, the next call tries again
+            self._festival_refresh = threading.Thread(target=self._fetch_festivals, name="festival-refresh",
+                                                      daemon=True)
+            self._festival_refresh.start()
+
+    @instrumented
     def get_companies(self, collection, festival=None):
         logging.info(f"Fetching companies from collection: {collection}, festival: {festival}")
         try:
-            companies_ref = self.db.collection(collection)
-            if festival and festival != "All Festivals":
-                companies_ref = companies_ref.where('ProgramName', '==', festival)
+            return self.fetch_companies(collection, festival)
+        except Exception as e:
+            logging.error(f"Error fetching companies: {e}")
+            return []
+
+    @instrumented
+    def fetch_companies(self, collection, festival=None):
+        """Like get_companies, but errors are raised instead of returning an empty list."""
+        companies_ref = self.db.collection(collection)
+        if festival and festival != "All Festivals":
+            companies_ref = companies_ref.where('ProgramName', '==', festival)
 
-            companies = companies_ref.get()
+        result = [self.company_record(company) for company in companies_ref.get()]
+        self.metrics.add_usage(reads=max(len(result), 1), bytes_read=estimate_documents_size(result))
+        logging.info(f"Successfully fetched {len(result)} companies")
+        return result
 
-            result = []
-            for company in companies:
-                company_data = company.to_dict()
-                # Ensure we're using the 'Id' field from the data, not the document ID
-                if 'Id' not in company_data:
-                    company_data['Id'] = company.id  # Fallback to document ID if 'Id' is missing
-                result.append(company_data)
-                logging.debug(f"Fetched company: ID={company_data['Id']}, Name={company_data.get('CompanyName', 'N/A')}")
+    def company_record(self, snapshot):
+        company_data = snapshot.to_dict()
+        # Ensure we're using the 'Id' field from the data, not the document ID
+        if 'Id' not in company_data:
+            company_data['Id'] = snapshot.id  # Fallback to document ID if 'Id' is missing
+        company_data[UPDATE_TIME_FIELD] = self.format_update_time(snapshot.update_time)
+        logging.debug(f"Fetched company: ID={company_data['Id']}, Name={company_data.get('CompanyName', 'N/A')}")
+        return company_data
 
-            logging.info(f"Successfully fetched {len(result)} companies")
+    @instrumented
+    def search_companies(self, collection, text, festival=None, limit=SEARCH_LIMIT):
+        """Return up to limit companies whose name starts with text, ignoring case and accents.
+
+        Runs as an ordered range query on SEARCH_FIELD, so it reads at most
+        limit documents however large the collection is. Combined with a
+        festival it needs a composite (ProgramName, CompanyNameSearch) index.
+        """
+        prefix = normalize_search_text(text)
+        if not prefix:
+            return []
+        logging.info(f"Searching companies in collection: {collection}, festival: {festival}, prefix: {prefix!r}")
+        try:
+            query = self.db.collection(collection)
+            if festival and festival != "All Festivals":
+                query = query.where('ProgramName', '==', festival)
+            query = (query.where(SEARCH_FIELD, '>=', prefix)
+                     .where(SEARCH_FIELD, '<', prefix + '\uf8ff')
+                     .order_by(SEARCH_FIELD)
+                     .limit(limit))
+            result = [self.company_record(company) for company in query.get()]
+            self.metrics.add_usage(reads=max(len(result), 1), bytes_read=estimate_documents_size(result))
+            logging.info(f"Found {len(result)} companies")
             return result
         except Exception as e:
-            logging.error(f"Error fetching companies: {e}")
+            logging.error(f"Error searching companies: {e}")
             return []
 
+    def build_company_query(self, collection, filters=None):
+        query = self.db.collection(collection)
+        schema = get_schema(collection)
+        for field, value in (filters or {}).items():
+            values = schema.stored_values(field, value)
+            query = query.where(field, 'in', values) if len(values) > 1 else query.where(field, '==', values[0])
+        return query
+
+    @instrumented
+    def count_companies(self, collection, filters=None, max_age=None):
+        """Count matching companies with a count() aggregation (one read per 1000 matches).
+
+        With max_age (seconds) a cached count that is at most that old is
+        returned instead of querying again.
+        """
+        cache_key = (collection, tuple(sorted((filters or {}).items())))
+        if max_age is not None:
+            cached = self._count_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] <= max_age:
+                return cached[1]
+
+        logging.info(f"Counting companies in collection: {collection}, filters: {filters}")
+        try:
+            query = self.build_company_query(collection, filters)
+            result = query.count(alias='count').get()
+            count = int(result[0][0].value)
+            self.metrics.add_usage(reads=count // 1000 + 1)
+            self._count_cache[cache_key] = (time.monotonic(), count)
+            logging.info(f"Counted {count} companies")
+            return count
+        except Exception as e:
+            logging.error(f"Error counting companies: {e}", exc_info=True)
+            return None
+
+    @instrumented
+    def count_companies_many(self, collection, named_filters, max_age=COUNT_CACHE_TTL):
+        """Run several count() aggregations concurrently; returns {name: count or None}."""
+        with ThreadPoolExecutor(max_workers=min(len(named_filters), 8) or 1, thread_name_prefix="count") as executor:
+            futures = {name: executor.submit(self.count_companies, collection, filters, max_age)
+                       for name, filters in named_filters.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    @instrumented
+    def iter_company_refs(self, collection, filters=None, page_size=1000):
+        """Yield document references matching the filters without reading their fields."""
+        logging.info(f"Streaming company refs from collection: {collection}, filters: {filters}")
+        for snapshot in self.iter_company_snapshots(collection, filters, [self.backend.document_id()], page_size):
+            yield snapshot.reference
+
+    @instrumented
+    def iter_company_snapshots(self, collection, filters=None, fields=None, page_size=1000):
+        """Yield matching snapshots page by page, reading only the given fields."""
+        query = self.build_company_query(collection, filters)
+        if fields is not None:
+            query = query.select(fields)
+        query = query.order_by(self.backend.document_id()).limit(page_size)
+        last_snapshot = None
+        while True:
+            page_query = query.start_after(last_snapshot) if last_snapshot else query
+            snapshots = list(page_query.stream())
+            self.metrics.add_usage(reads=max(len(snapshots), 1))
+            yield from snapshots
+            if len(snapshots) < page_size:
+                break
+            last_snapshot = snapshots[-1]
+
+    @instrumented
+    def backfill_search_field(self, collection, progress_callback=None):
+        """Write SEARCH_FIELD to every company whose copy is missing or out of date.
+
+        Returns a (scanned, updated, failed) tuple; progress_callback(done, failed)
+        is called after every committed batch.
+        """
+        scanned = 0
+
+        def writes():
+            nonlocal scanned
+            for snapshot in self.iter_company_snapshots(collection, fields=['CompanyName', SEARCH_FIELD]):
+                scanned += 1
+                data = snapshot.to_dict() or {}
+                normalized = normalize_search_text(data.get('CompanyName'))
+                if data.get(SEARCH_FIELD) != normalized:
+                    yield snapshot.reference, {SEARCH_FIELD: normalized}
+
+        updated_count, failed_ids = self.commit_updates(writes(), progress_callback)
+        return scanned, updated_count, len(failed_ids)
+
+    @instrumented
+    def apply_patch_to_refs(self, doc_refs, patch, progress_callback=None, collection=None):
+        """Write the same field patch to every ref in concurrent batches.
+
+        progress_callback(done, failed) is called on the calling thread after
+        every committed batch; returning False stops submitting new batches.
+        Returns a (updated_count, failed_count) tuple.
+        """
+        data = self.prepare_data_for_save(patch, collection)
+        logging.info(f"Applying bulk patch: {data}")
+        updated_count, failed_ids = self.commit_updates(((doc_ref, data) for doc_ref in doc_refs),
+                                                        progress_callback)
+        return updated_count, len(failed_ids)
+
+    @instrumented
+    def update_companies(self, collection, patches, progress_callback=None):
+        """Write a per-document patch ({company_id: {field: value}}) once per document.
+
+        Returns a (updated_count, failed_ids) tuple.
+        """
+        logging.info(f"Updating {len(patches)} companies in collection: {collection}")
+        collection_ref = self.db.collection(collection)
+        writes = ((collection_ref.document(company_id), self.prepare_data_for_save(patch, collection))
+                  for company_id, patch in patches.items() if patch)
+        return self.commit_updates(writes, progress_callback)
+
+    @instrumented
+    def commit_updates(self, writes, progress_callback=None):
+        """Commit (doc_ref, data) updates in concurrent batches of MAX_BATCH_SIZE.
+
+        A failing batch is retried document by document so a single missing
+        document does not fail the other writes in its batch.
+        """
+        updated_count = 0
+        failed_ids = []
+        cancelled = False
+
+        def commit_batch(chunk):
+            batch = self.db.batch()
+            for doc_ref, data in chunk:
+                batch.update(doc_ref, data)
+            batch.commit()
+
+        def commit(chunk):
+            try:
+                self.write_scheduler.run(lambda: commit_batch(chunk), [doc_ref.path for doc_ref, _ in chunk],
+                                         len(chunk))
+                return len(chunk), [], chunk_size(chunk)
+            except Exception as e:
+                logging.warning(f"Batch of {len(chunk)} updates failed, retrying one by one: {e}")
+            committed = 0
+            failed = []
+            for doc_ref, data in chunk:
+                try:
+                    self.write_scheduler.run(lambda: doc_ref.update(data), [doc_ref.path])
+                    committed += 1
+                except Exception as e:
+                    logging.error(f"Error updating document {doc_ref.id}: {e}")
+                    failed.append(doc_ref.id)
+            return committed, failed, chunk_size(chunk) * committed // len(chunk)
+
+        def chunk_size(chunk):
+            return sum(estimate_size(data) for _, data in chunk)
+
+        with ThreadPoolExecutor(max_workers=self.BULK_WRITE_WORKERS) as executor:
+            pending = set()
+
+            def collect(futures):
+                nonlocal updated_count, cancelled
+                for future in futures:
+                    pending.discard(future)
+                    committed, failed, bytes_written = future.result()
+                    # Recorded here, the worker threads run outside the instrumented call
+                    self.metrics.add_usage(writes=committed, bytes_written=bytes_written)
+                    updated_count += committed
+                    failed_ids.extend(failed)
+                    if progress_callback and progress_callback(updated_count, len(failed_ids)) is False:
+                        cancelled = True
+
+            chunk = []
+            for write in writes:
+                chunk.append(write)
+                if len(chunk) == self.MAX_BATCH_SIZE:
+                    pending.add(executor.submit(commit, chunk))
+                    chunk = []
+                    # Keep a bounded number of batches in flight
+                    if len(pending) >= self.BULK_WRITE_WORKERS * 2:
+                        collect([next(as_completed(list(pending)))])
+                    if cancelled:
+                        break
+            if chunk and not cancelled:
+                pending.add(executor.submit(commit, chunk))
+            collect(as_completed(list(pending)))
+
+        logging.info(f"Bulk update finished: {updated_count} updated, {len(failed_ids)} failed")
+        return updated_count, failed_ids
+
+    @instrumented
     def get_company(self, collection, company_id):
         logging.info(f"Fetching company details - Collection: {collection}, ID: {company_id}")
         try:
             doc_ref = self.db.collection(collection).document(company_id)
             doc = doc_ref.get()
+            self.metrics.add_usage(reads=1)
             if doc.exists:
-                company_data = doc.to_dict()
-                # Convert boolean fields to "Van"/"Nincs" for UI display
-                for key, value in company_data.items():
-                    if isinstance(value, bool):
-                        company_data[key] = "Van" if value else "Nincs"
+                # Boolean fields are shown as "Van"/"Nincs" in the UI
+                company_data = get_schema(collection).display_record(doc.to_dict())
+                company_data[UPDATE_TIME_FIELD] = self.format_update_time(doc.update_time)
+                self.metrics.add_usage(bytes_read=estimate_size(company_data))
                 logging.info(f"Successfully fetched company data for ID: {company_id}")
                 logging.debug(f"Company data: {company_data}")
                 return company_data
@@ -76,41 +375,155 @@ class FirestoreService:
             logging.error(f"Error fetching company details: {e}")
             return None
 
+    @instrumented
+    def lease_node_id(self):
+        logging.info("Leasing ID allocator node")
+        counter_ref = self.db.collection('_meta').document('idAllocator')
+
+        @self.backend.transactional
+        def lease(transaction):
+            snapshot = counter_ref.get(transaction=transaction)
+            next_node = snapshot.to_dict().get('NextNode', 0) if snapshot.exists else 0
+            transaction.set(counter_ref, {
+                'NextNode': next_node + 1,
+                'LastLeased': self.server_timestamp()
+            }, merge=True)
+            return next_node
+
+        node_id = lease(self.db.transaction())
+        self.metrics.add_usage(reads=1, writes=1)
+        return node_id
+
     def generate_id(self):
-        new_id = str(int(time.time() * 1000))
+        new_id = self.id_allocator.next_id()
         logging.info(f"Generated new ID: {new_id}")
         return new_id
 
+    def generate_ids(self, count):
+        new_ids = self.id_allocator.next_ids(count)
+        logging.info(f"Generated {len(new_ids)} new IDs")
+        return new_ids
+
+    @instrumented
     def add_company(self, collection, data):
         logging.info(f"Adding new company to collection: {collection}")
         logging.debug(f"Company data: {data}")
         try:
             doc_ref = self.db.collection(collection).document(data['Id'])
-            doc_ref.set(self.prepare_data_for_save(data))
+            # create() fails on an existing document instead of silently overwriting it
+            encoded = self.prepare_data_for_save(data, collection)
+            # The ID is ours alone, so "already exists" on a retry means the first attempt landed
+            self.write_scheduler.run(lambda: doc_ref.create(encoded), [doc_ref.path],
+                                     already_done=self.backend.already_exists_error())
+            self.metrics.add_usage(writes=1, bytes_written=estimate_size(encoded))
             logging.info(f"Successfully added company with ID: {data['Id']}")
             return data['Id']
         except Exception as e:
             logging.error(f"Error adding company: {e}")
             raise
 
+    @instrumented
     def update_company(self, collection, company_id, data):
         logging.info(f"Updating company - Collection: {collection}, ID: {company_id}")
         logging.debug(f"Update data: {data}")
         try:
             doc_ref = self.db.collection(collection).document(company_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                doc_ref.set(self.prepare_data_for_save(data), merge=True)
-                logging.info(f"Successfully updated company with ID: {company_id}")
-                return True
-            else:
+            encoded = self.prepare_data_for_save(data, collection)
+            try:
+                # update() fails on a missing document, no read is needed to check that it exists
+                self.write_scheduler.run(lambda: doc_ref.update(encoded), [doc_ref.path])
+            except self.backend.conflict_errors():
                 logging.warning(f"No document found with ID: {company_id} in collection: {collection}")
                 return False
+            self.metrics.add_usage(writes=1, bytes_written=estimate_size(encoded))
+            logging.info(f"Successfully updated company with ID: {company_id}")
+            return True
         except Exception as e:
             logging.error(f"Error updating company: {e}")
             raise
 
-    def prepare_data_for_save(self, data):
+    @instrumented
+    def patch_company(self, collection, company_id, changes):
+        """Send only the given fields with update(); fails if the document no longer exists."""
+        logging.info(f"Patching company - Collection: {collection}, ID: {company_id}, fields: {list(changes)}")
+        logging.debug(f"Patch data: {changes}")
+        try:
+            doc_ref = self.db.collection(collection).document(company_id)
+            encoded = self.prepare_data_for_save(changes, collection)
+            self.write_scheduler.run(lambda: doc_ref.update(encoded), [doc_ref.path])
+            self.metrics.add_usage(writes=1, bytes_written=estimate_size(encoded))
+            logging.info(f"Successfully patched company with ID: {company_id}")
+            return True
+        except Exception as e:
+            logging.error(f"Error patching company: {e}")
+            raise
+
+    @instrumented
+    def commit_mutations(self, mutations):
+        """Commit queued mutations atomically in one batch, in the given order.
+
+        Each mutation is a dict with op ('create', 'update', 'delete' or
+        'comment'), collection, company_id, data and an optional
+        base_update_time used as an update-time precondition. Returns the new
+        update time of every mutation, None for comments, which change a
+        document of the comments subcollection and not the company; raises
+        WriteConflictError when a precondition fails.
+        """
+        logging.info(f"Committing {len(mutations)} queued mutations")
+        batch = self.db.batch()
+        bytes_written = 0
+        paths = []
+        for mutation in mutations:
+            doc_ref = self.db.collection(mutation['collection']).document(mutation['company_id'])
+            option = None
+            if mutation.get('base_update_time'):
+                option = self.db.write_option(last_update_time=self.parse_update_time(mutation['base_update_time']))
+            op = mutation['op']
+            if op == 'create':
+                batch.create(doc_ref, self.prepare_data_for_save(mutation['data'], mutation['collection']))
+            elif op == 'update':
+                batch.update(doc_ref, self.prepare_data_for_save(mutation['data'], mutation['collection']), option=option)
+            elif op == 'delete':
+                batch.delete(doc_ref, option=option)
+            elif op == 'comment':
+                comment = self.prepare_comment(mutation['data'])
+                batch.set(doc_ref.collection(self.COMMENTS_SUBCOLLECTION).document(comment['Id']), comment)
+            else:
+                raise ValueError(f"Unknown mutation: {op}")
+            paths.append(doc_ref.path)
+            bytes_written += estimate_size(mutation.get('data'))
+        # A repeated create or precondition would fail on our own earlier write, the queue retries those itself
+        idempotent = all(mutation['op'] != 'create' and not mutation.get('base_update_time')
+                         for mutation in mutations)
+        try:
+            results = self.write_scheduler.run(batch.commit, paths, len(mutations), idempotent=idempotent)
+        except self.backend.conflict_errors() as e:
+            logging.warning(f"Queued mutations rejected: {e}")
+            raise WriteConflictError(str(e)) from e
+        self.metrics.add_usage(writes=len(mutations), bytes_written=bytes_written)
+        return [None if mutation['op'] == 'comment' else self.format_update_time(result.update_time)
+                for mutation, result in zip(mutations, results)]
+
+    @staticmethod
+    def format_update_time(update_time):
+        # Fixed nanosecond precision keeps the strings ordered and round-trippable
+        if update_time is None:
+            return None
+        nanos = getattr(update_time, 'nanosecond', update_time.microsecond * 1000)
+        return update_time.strftime('%Y-%m-%dT%H:%M:%S') + f'.{nanos:09d}Z'
+
+    def parse_update_time(self, value):
+        return self.backend.parse_update_time(value)
+
+    def prepare_data_for_save(self, data, collection=None):
+        delete_field = self.backend.delete_field()
+        if collection is not None:
+            # Only fields the schema declares boolean are converted, a company named "Van" stays a name
+            encoded = get_schema(collection).encode_record(data)
+            if 'CompanyName' in encoded:
+                # Kept in step with the name so server-side search finds renamed companies
+                encoded[SEARCH_FIELD] = normalize_search_text(encoded['CompanyName'])
+            return {key: delete_field if value is None else value for key, value in encoded.items()}
         updated_data = {}
         for key, value in data.items():
             if isinstance(value, bool):
@@ -120,32 +533,278 @@ class FirestoreService:
             elif value == "Nincs":
                 updated_data[key] = False
             elif value is None:
-                updated_data[key] = DELETE_FIELD
+                updated_data[key] = delete_field
             else:
                 updated_data[key] = value
         return updated_data
 
+    @instrumented
     def delete_company(self, collection, company_id):
         logging.info(f"Deleting company - Collection: {collection}, ID: {company_id}")
         try:
-            self.db.collection(collection).document(company_id).delete()
+            doc_ref = self.db.collection(collection).document(company_id)
+            self.write_scheduler.run(doc_ref.delete, [doc_ref.path])
+            self.metrics.add_usage(writes=1)
             logging.info(f"Successfully deleted company with ID: {company_id}")
         except Exception as e:
             logging.error(f"Error deleting company: {e}", exc_info=True)
             raise
 
-    def add_comment(self, collection, company_id, comment_data):
+    @instrumented
+    def iter_company_snapshots_by_id(self, collection, company_ids, page_size=300):
+        """Yield full snapshots of the given companies with batched gets; missing ones are skipped."""
+        collection_ref = self.db.collection(collection)
+        company_ids = list(company_ids)
+        for start in range(0, len(company_ids), page_size):
+            refs = [collection_ref.document(company_id) for company_id in company_ids[start:start + page_size]]
+            snapshots = [snapshot for snapshot in self.db.get_all(refs) if snapshot.exists]
+            self.metrics.add_usage(reads=len(refs), bytes_read=estimate_documents_size(
+                [snapshot.to_dict() for snapshot in snapshots]))
+            yield from snapshots
+
+    @instrumented
+    def document_tree(self, reference, data):
+        """[(reference, data)] of a document and every document in its subcollections, parents first."""
+        documents = [(reference, data)]
+        subcollections = list(reference.collections())
+        self.metrics.add_usage(reads=1)
+        for subcollection in subcollections:
+            snapshots = list(subcollection.stream())
+            self.metrics.add_usage(reads=max(len(snapshots), 1))
+            for snapshot in snapshots:
+                documents.extend(self.document_tree(snapshot.reference, snapshot.to_dict()))
+        return documents
+
+    @instrumented
+    def delete_companies(self, snapshots, delete_snapshot, progress_callback=None):
+        """Delete companies with everything in their subcollections, in concurrent batches.
+
+        snapshots yields full company snapshots (iter_company_snapshots or
+        iter_company_snapshots_by_id). Every document is written to
+        delete_snapshot before its delete is sent. A company goes in one
+        batch with its subcollections, so it is deleted whole or not at all;
+        a tree bigger than a batch has its subcollections deleted first.
+        progress_callback(deleted, failed) is called on the calling thread
+        after every batch; returning False stops submitting new batches.
+        Returns a (deleted_ids, failed_ids) tuple of company IDs.
+        """
+        deleted_ids = []
+        failed_ids = []
+        cancelled = False
+
+        def delete_refs(refs):
+            def commit_batch():
+                batch = self.db.batch()
+                for ref in refs:
+                    batch.delete(ref)
+                batch.commit()
+            # Deletes are safe to repeat, a retry of a batch that landed changes nothing
+            self.write_scheduler.run(commit_batch, [ref.path for ref in refs], len(refs))
+
+        def commit(units):
+            company_ids = [company_id for company_id, _ in units]
+            refs = [ref for _, unit_refs in units for ref in unit_refs]
+            try:
+                delete_refs(refs)
+                return company_ids, [], len(refs)
+            except Exception as e:
+                logging.error(f"Batch deleting {len(company_ids)} companies failed: {e}")
+                return [], company_ids, 0
+
+        with ThreadPoolExecutor(max_workers=self.BULK_WRITE_WORKERS) as executor:
+            pending = set()
+
+            def collect(futures):
+                nonlocal cancelled
+                for future in futures:
+                    pending.discard(future)
+                    deleted, failed, writes = future.result()
+                    self.metrics.add_usage(writes=writes)
+                    deleted_ids.extend(deleted)
+                    failed_ids.extend(failed)
+                    if progress_callback and progress_callback(len(deleted_ids), len(failed_ids)) is False:
+                        cancelled = True
+
+            def submit(units):
+                pending.add(executor.submit(commit, units))
+                # Keep a bounded number of batches in flight
+                if len(pending) >= self.BULK_WRITE_WORKERS * 2:
+                    collect([next(as_completed(list(pending)))])
+
+            units = []
+            unit_writes = 0
+            for snapshot in snapshots:
+                data = snapshot.to_dict() or {}
+                company_id = data.get('Id', snapshot.id)
+                tree = self.document_tree(snapshot.reference, data)
+                delete_snapshot.write((ref.path, document) for ref, document in tree)
+                # Children before their parents, so nothing is left without a parent if a batch fails
+                refs = [ref for ref, _ in reversed(tree)]
+                if len(refs) > self.MAX_BATCH_SIZE:
+                    descendants, refs = refs[:-1], refs[-1:]
+                    try:
+                        for start in range(0, len(descendants), self.MAX_BATCH_SIZE):
+                            delete_refs(descendants[start:start + self.MAX_BATCH_SIZE])
+                        self.metrics.add_usage(writes=len(descendants))
+                    except Exception as e:
+                        logging.error(f"Deleting the subcollections of company {company_id} failed: {e}")
+                        failed_ids.append(company_id)
+                        continue
+                if unit_writes + len(refs) > self.MAX_BATCH_SIZE:
+                    submit(units)
+                    units = []
+                    unit_writes = 0
+                units.append((company_id, refs))
+                unit_writes += len(refs)
+                if cancelled:
+                    units = []
+                    break
+            if units:
+                pending.add(executor.submit(commit, units))
+            collect(as_completed(list(pending)))
+
+        logging.info(f"Bulk delete finished: {len(deleted_ids)} companies deleted, {len(failed_ids)} failed")
+        return deleted_ids, failed_ids
+
+    @instrumented
+    def restore_documents(self, documents, progress_callback=None):
+        """Write (path, data) pairs back with set(), e.g. from a DeleteSnapshot; returns how many were written."""
+        restored = 0
+
+        def commit(chunk):
+            nonlocal restored
+            batch = self.db.batch()
+            for path, data in chunk:
+                batch.set(self.db.document(path), data)
+            self.write_scheduler.run(batch.commit, [path for path, _ in chunk], len(chunk))
+            self.metrics.add_usage(writes=len(chunk), bytes_written=estimate_documents_size(
+                [data for _, data in chunk]))
+            restored += len(chunk)
+            if progress_callback:
+                progress_callback(restored)
+
+        chunk = []
+        for document in documents:
+            chunk.append(document)
+            if len(chunk) == self.MAX_BATCH_SIZE:
+                commit(chunk)
+                chunk = []
+        if chunk:
+            commit(chunk)
+        logging.info(f"Restored {restored} documents")
+        return restored
+
+    def comments_ref(self, collection, company_id):
+        return self.db.collection(collection).document(company_id).collection(self.COMMENTS_SUBCOLLECTION)
+
+    def prepare_comment(self, comment_data, comment_id=None):
+        comment = dict(comment_data)
+        comment['Id'] = comment_id or comment.get('Id') or self.generate_id()
+        comment.setdefault('CreatedAt', self.server_timestamp())
+        return comment
+
+    @instrumented
+    def add_comment(self, collection, company_id, comment_data, comment_id=None):
         logging.info(f"Adding comment - Collection: {collection}, ID: {company_id}")
         logging.debug(f"Comment data: {comment_data}")
         try:
-            company_ref = self.db.collection(collection).document(company_id)
-            company_ref.update({
-                "comments": firestore.ArrayUnion([comment_data])
-            })
-            logging.info(f"Successfully added comment to company with ID: {company_id}")
+            # Comments live in a subcollection so company reads stay small however long the history gets
+            comment = self.prepare_comment(comment_data, comment_id)
+            doc_ref = self.comments_ref(collection, company_id).document(comment['Id'])
+            # The comment ID is fixed before the first attempt, so a retry cannot add it twice
+            self.write_scheduler.run(lambda: doc_ref.set(comment), [doc_ref.path])
+            self.metrics.add_usage(writes=1, bytes_written=estimate_size(comment))
+            logging.info(f"Successfully added comment {comment['Id']} to company with ID: {company_id}")
+            return comment['Id']
         except Exception as e:
             logging.error(f"Error adding comment: {e}", exc_info=True)
             raise
 
+    @instrumented
+    def get_comments(self, collection, company_id, page_size=None, start_after=None):
+        """Return one page of comments, newest first, and the cursor for the next page.
+
+        Pass the returned cursor as start_after to read the following page;
+        it is None once there are no more comments.
+        """
+        page_size = page_size or self.COMMENTS_PAGE_SIZE
+        logging.info(f"Fetching comments - Collection: {collection}, ID: {company_id}, page size: {page_size}")
+        try:
+            query = (self.comments_ref(collection, company_id)
+                     .order_by('CreatedAt', direction='DESCENDING')
+                     .limit(page_size))
+            if start_after is not None:
+                query = query.start_after(start_after)
+            snapshots = list(query.stream())
+            comments = []
+            for snapshot in snapshots:
+                comment = snapshot.to_dict()
+                comment.setdefault('Id', snapshot.id)
+                comments.append(comment)
+            self.metrics.add_usage(reads=max(len(comments), 1), bytes_read=estimate_documents_size(comments))
+            next_cursor = snapshots[-1] if len(snapshots) == page_size else None
+            logging.info(f"Successfully fetched {len(comments)} comments")
+            return comments, next_cursor
+        except Exception as e:
+            logging.error(f"Error fetching comments: {e}", exc_info=True)
+            return [], None
+
+    @instrumented
+    def migrate_comments_to_subcollection(self, collection, progress_callback=None):
+        """Move every legacy 'comments' array of a collection into the comments subcollection.
+
+        Comment documents get deterministic IDs, so the migration can be
+        re-run safely after an interruption. The array is removed from the
+        company in the same batch as its last comments.
+        Returns a (companies_migrated, comments_moved) tuple.
+        """
+        delete_field = self.backend.delete_field()
+        logging.info(f"Migrating comment arrays in collection: {collection}")
+        companies_migrated = 0
+        comments_moved = 0
+        for snapshot in self.db.collection(collection).select(['comments']).stream():
+            self.metrics.add_usage(reads=1)
+            comments = (snapshot.to_dict() or {}).get('comments')
+            if not isinstance(comments, list):
+                continue
+            company_ref = snapshot.reference
+            comments_ref = company_ref.collection(self.COMMENTS_SUBCOLLECTION)
+            writes = []
+            for index, comment in enumerate(comments):
+                comment = dict(comment) if isinstance(comment, dict) else {'Text': str(comment)}
+                comment.setdefault('CreatedAt', self.legacy_comment_time(comment, index))
+                comment['Id'] = f"legacy-{index:05d}"
+                writes.append((comments_ref.document(comment['Id']), comment))
+
+            # Leave room for the update that drops the array from the company
+            chunk_size = self.MAX_BATCH_SIZE - 1
+            for start in range(0, max(len(writes), 1), chunk_size):
+                batch = self.db.batch()
+                chunk = writes[start:start + chunk_size]
+                for doc_ref, comment in chunk:
+                    batch.set(doc_ref, comment)
+                paths = [doc_ref.path for doc_ref, _ in chunk]
+                if start + chunk_size >= len(writes):
+                    batch.update(company_ref, {'comments': delete_field})
+                    paths.append(company_ref.path)
+                self.write_scheduler.run(batch.commit, paths, len(paths))
+            self.metrics.add_usage(writes=len(writes) + 1, bytes_written=estimate_documents_size([comment for _, comment in writes]))
+
+            companies_migrated += 1
+            comments_moved += len(writes)
+            logging.debug(f"Migrated {len(writes)} comments of company {snapshot.id}")
+            if progress_callback:
+                progress_callback(companies_migrated, comments_moved)
+
+        logging.info(f"Migrated {comments_moved} comments from {companies_migrated} companies in {collection}")
+        return companies_migrated, comments_moved
+
+    def legacy_comment_time(self, comment, index):
+        for field in self.LEGACY_COMMENT_TIME_FIELDS:
+            if isinstance(comment.get(field), datetime):
+                return comment[field]
+        # Without a timestamp, keep the array order (oldest first) with synthetic times
+        return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=index)
+
     def server_timestamp(self):
-        return firestore.SERVER_TIMESTAMP
\ No newline at end of file
+        return self.backend.server_timestamp()
\ No newline at end of file
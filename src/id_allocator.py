@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+
+class NodeSpaceExhaustedError(Exception):
+    """Raised when every node id has been leased and a new one would repeat an old one."""
+
+
+class IdAllocator:
+    """Hands out unique, roughly time-ordered company IDs.
+
+    An ID is the current millisecond timestamp followed by a node id and a
+    per-millisecond sequence number, all as decimal digits. Every running
+    client leases its own node id once (see FirestoreService.lease_node_id),
+    so IDs never collide across machines and no read is needed per ID. The
+    millisecond prefix keeps new IDs sortable next to the old timestamp-only
+    ones.
+
+    Node ids are never reused: a lease past the last one raises
+    NodeSpaceExhaustedError instead of wrapping around to a node another
+    session may still be using. A lease that keeps failing is retried
+    LEASE_ATTEMPTS times with backoff and then raised, rather than guessing
+    a node another client may hold; the next ID asked for tries again.
+    """
+
+    NODE_DIGITS = 6
+    SEQUENCE_DIGITS = 3
+    LEASE_ATTEMPTS = 3
+    LEASE_BACKOFF = 0.5  # seconds before the second attempt, doubled after every failure
+
+    def __init__(self, node_id=None, node_lease=None, clock=time.time, sleep=time.sleep):
+        if node_id is None and node_lease is None:
+            raise ValueError("IdAllocator needs a node_id or a node_lease")
+        self._node_id = node_id
+        self._node_lease = node_lease
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+        self._max_node = 10 ** self.NODE_DIGITS
+        self._max_sequence = 10 ** self.SEQUENCE_DIGITS
+
+    @property
+    def node_id(self):
+        with self._lock:
+            return self._leased_node_id()
+
+    def _leased_node_id(self):
+        # Called with the lock held, so threads asking for their first ID at once lease a single node
+        if self._node_id is None:
+            self._node_id = self._acquire_node_id()
+        return self._node_id
+
+    def _acquire_node_id(self):
+        for attempt in range(1, self.LEASE_ATTEMPTS + 1):
+            try:
+                node_id = int(self._node_lease())
+                break
+            except Exception as e:
+                if attempt == self.LEASE_ATTEMPTS:
+                    logging.error(f"Error leasing ID allocator node, giving up after {attempt} attempts: {e}")
+                    raise
+                delay = self.LEASE_BACKOFF * 2 ** (attempt - 1)
+                logging.warning(f"Error leasing ID allocator node, retrying in {delay:.1f} s: {e}")
+                self._sleep(delay)
+        if node_id >= self._max_node:
+            raise NodeSpaceExhaustedError(f"All {self._max_node} ID allocator nodes have been leased")
+        logging.info(f"Leased ID allocator node: {node_id}")
+        return node_id
+
+    def _current_ms(self):
+        return int(self._clock() * 1000)
+
+    def next_id(self):
+        with self._lock:
+            node_id = self._leased_node_id()
+            now_ms = self._current_ms()
+            # Never step backwards if the wall clock is adjusted
+            if now_ms <= self._last_ms:
+                now_ms = self._last_ms
+                self._sequence += 1
+                if self._sequence >= self._max_sequence:
+                    # Sequence exhausted for this millisecond, borrow the next one
+                    now_ms = self._last_ms + 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (f"{now_ms}"
+                    f"{node_id:0{self.NODE_DIGITS}d}"
+                    f"{self._sequence:0{self.SEQUENCE_DIGITS}d}")
+
+    def next_ids(self, count):
+        return [self.next_id() for _ in range(count)]
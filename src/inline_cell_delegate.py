@@ -0,0 +1,41 @@
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtWidgets import QComboBox, QStyledItemDelegate
+
+
+class InlineCellDelegate(QStyledItemDelegate):
+    """Changes status and flag cells of the company table in place with a drop-down.
+
+    The picked value is not written into the table item. It is reported
+    through valueChosen, and the row is redrawn from the record once the
+    change has been queued, so the table never shows a value the record
+    does not have.
+    """
+
+    valueChosen = pyqtSignal(int, int, str)  # row, column, display value
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.schema = None  # Schema of the collection the table shows
+
+    def createEditor(self, parent, option, index):
+        field = self.schema.inline_columns.get(index.column()) if self.schema is not None else None
+        if field is None:
+            return None
+        editor = QComboBox(parent)
+        editor.addItems(self.schema.choices(field))
+        # Picking a value commits it, there is nothing else to confirm
+        editor.activated.connect(lambda _: self.commit_and_close(editor))
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data() or "")
+        QTimer.singleShot(0, editor.showPopup)
+
+    def setModelData(self, editor, model, index):
+        value = editor.currentText()
+        if value != index.data():
+            self.valueChosen.emit(index.row(), index.column(), value)
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
@@ -0,0 +1,273 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames in these files are the service itself, not the code that called it
+SERVICE_FILES = {"firestore_service.py", "instrumentation.py"}
+# Documents sampled to estimate the size of a large result
+SIZE_SAMPLE = 64
+
+
+def estimate_size(value):
+    """Approximate stored size in bytes, using Firestore's document size rules."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, dict):
+        return 32 + sum(len(str(key)) + 1 + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    return 16
+
+
+def estimate_documents_size(documents):
+    """Size of a list of documents, estimated from a sample so large reads stay cheap to account."""
+    if len(documents) <= SIZE_SAMPLE:
+        return sum(estimate_size(document) for document in documents)
+    step = len(documents) / SIZE_SAMPLE
+    sample = [documents[int(i * step)] for i in range(SIZE_SAMPLE)]
+    return sum(estimate_size(document) for document in sample) * len(documents) // SIZE_SAMPLE
+
+
+def calling_view(frame):
+    """Class.method (or module.function) of the nearest application frame outside the service."""
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(filename) == SRC_DIR and os.path.basename(filename) not in SERVICE_FILES:
+            owner = frame.f_locals.get("self")
+            prefix = type(owner).__name__ if owner is not None else os.path.basename(filename)[:-3]
+            return f"{prefix}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    # Worker threads of the service itself are named after their job
+    return threading.current_thread().name
+
+
+class OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # the last one is +Inf
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls, in seconds."""
+        if not self.calls:
+            return 0.0
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "reads": self.reads,
+            "writes": self.writes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "latency_ms": {
+                "sum": round(self.latency_sum * 1000, 1),
+                "mean": round(self.latency_sum * 1000 / self.calls, 1) if self.calls else 0.0,
+                "p50": round(self.percentile(0.5) * 1000, 1),
+                "p95": round(self.percentile(0.95) * 1000, 1),
+                "max": round(self.latency_max * 1000, 1),
+                "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets)},
+            },
+        }
+
+
+class _Call:
+    def __init__(self, operation, view):
+        self.operation = operation
+        self.view = view
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+class FirestoreMetrics:
+    """Latency, documents and bytes of every Firestore operation, per operation and calling view.
+
+    Only the outermost instrumented call on a thread is recorded; what the
+    methods it calls read and write is added to it, so the figures for
+    get_companies include the fetch_companies it runs. Counts are the
+    documents Firestore bills for, sizes are estimates.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stats = {}  # (operation, view) -> OperationStats
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, operation, frame):
+        stack = self._stack()
+        call = _Call(operation, calling_view(frame) if not stack else stack[0].view)
+        stack.append(call)
+        return call
+
+    def end(self, call, seconds, error=False):
+        stack = self._stack()
+        stack.remove(call)
+        if stack:
+            return  # Accounted to the outermost call
+        with self._lock:
+            stats = self.stats.get((call.operation, call.view))
+            if stats is None:
+                stats = self.stats[(call.operation, call.view)] = OperationStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.reads += call.reads
+            stats.writes += call.writes
+            stats.bytes_read += call.bytes_read
+            stats.bytes_written += call.bytes_written
+            stats.latency_sum += seconds
+            stats.latency_max = max(stats.latency_max, seconds)
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def add_usage(self, reads=0, writes=0, bytes_read=0, bytes_written=0):
+        """Add billed documents and bytes to the call running on this thread."""
+        stack = self._stack()
+        if stack:
+            call = stack[0]
+            call.reads += reads
+            call.writes += writes
+            call.bytes_read += bytes_read
+            call.bytes_written += bytes_written
+            return
+        # Outside any instrumented call, e.g. on a worker thread of a bulk write
+        call = _Call("untracked", threading.current_thread().name)
+        stack.append(call)
+        self.add_usage(reads, writes, bytes_read, bytes_written)
+        self.end(call, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self.stats.items()}
+
+    def totals(self):
+        with self._lock:
+            all_stats = list(self.stats.values())
+        latencies = OperationStats()
+        for stats in all_stats:
+            latencies.calls += stats.calls
+            latencies.latency_max = max(latencies.latency_max, stats.latency_max)
+            latencies.buckets = [a + b for a, b in zip(latencies.buckets, stats.buckets)]
+        return {
+            "calls": latencies.calls,
+            "errors": sum(stats.errors for stats in all_stats),
+            "reads": sum(stats.reads for stats in all_stats),
+            "writes": sum(stats.writes for stats in all_stats),
+            "bytes_read": sum(stats.bytes_read for stats in all_stats),
+            "bytes_written": sum(stats.bytes_written for stats in all_stats),
+            "p95_ms": round(latencies.percentile(0.95) * 1000, 1),
+        }
+
+    def to_json(self):
+        operations = [{"operation": operation, "view": view, **stats}
+                      for (operation, view), stats in sorted(self.snapshot().items())]
+        return json.dumps({"started_at": self.started_at, "totals": self.totals(), "operations": operations},
+                          indent=2, ensure_ascii=False)
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self.stats.items())
+        lines = ["# HELP firestore_call_duration_seconds Latency of Firestore operations.",
+                 "# TYPE firestore_call_duration_seconds histogram"]
+        for (operation, view), stats in items:
+            labels = f'operation="{_escape(operation)}",view="{_escape(view)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                cumulative += count
+                lines.append(f'firestore_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"firestore_call_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}")
+            lines.append(f"firestore_call_duration_seconds_count{{{labels}}} {stats.calls}")
+        for name, attribute, help_text in (
+                ("firestore_call_errors_total", "errors", "Firestore operations that raised."),
+                ("firestore_documents_read_total", "reads", "Billed document reads."),
+                ("firestore_documents_written_total", "writes", "Billed document writes and deletes."),
+                ("firestore_bytes_read_total", "bytes_read", "Estimated bytes of documents read."),
+                ("firestore_bytes_written_total", "bytes_written", "Estimated bytes of documents written.")):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (operation, view), stats in items:
+                lines.append(f'{name}{{operation="{_escape(operation)}",view="{_escape(view)}"}} '
+                             f'{getattr(stats, attribute)}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """Write the metrics to path, as Prometheus text for .prom/.txt files and JSON otherwise."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def instrumented(method):
+    """Record latency and errors of a FirestoreService method in the service's metrics."""
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            call = self.metrics.begin(method.__name__, sys._getframe(1))
+            started = time.perf_counter()
+            error = False
+            try:
+                yield from method(self, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.metrics.end(call, time.perf_counter() - started, error)
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        call = self.metrics.begin(method.__name__, sys._getframe(1))
+        started = time.perf_counter()
+        error = False
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.metrics.end(call, time.perf_counter() - started, error)
+    return wrapper
@@ -1,38 +1,86 @@
-import csv
 import logging
-import os
 import sys
+import time
+from datetime import datetime
 
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
                              QPushButton, QComboBox, QRadioButton, QLineEdit, QButtonGroup, QMessageBox,
-                             QFileDialog, QApplication, QCheckBox, QAbstractItemView)
-from PyQt6.QtCore import Qt
-
-from src.company_details_view_install import CompanyDetailsViewInstall
-from src.company_details_view_demolition import CompanyDetailsViewDemolition
-from src.edit_field_dialog import EditFieldDialog
-from src.firestore_service import FirestoreService
-from src.excel_exporter import ExcelExporter
-from src.table_filter import FilterableTableView
+                             QFileDialog, QApplication, QCheckBox, QAbstractItemView, QProgressDialog)
+from PyQt6.QtCore import Qt, QTimer, QItemSelectionModel
+from PyQt6.QtGui import QColor
+
+from src.details_dialog_pool import DetailsDialogPool
+from src.firestore_service import UPDATE_TIME_FIELD
+from src.inline_cell_delegate import InlineCellDelegate
+from src.metrics_overlay import MetricsOverlay
+from src.offline_queue import OfflineWriteQueue
+from src.document_prefetcher import DocumentPrefetcher
+from src.schema import get_schema
+from src.startup import StartupPipeline, StartupTimer
+
+# Dialogs, exporters and the Firestore SDK most sessions never use are imported where they are opened,
+# and so are the NumPy-backed indexes, which are first needed when the list is filled
 
 class MainWindow(QMainWindow):
-    def __init__(self, firestore_service):
+    PREFETCH_NEIGHBOURS = 2  # Rows on each side of the current one fetched ahead for next/previous
+    REJECTED_CELL_COLOR = QColor(255, 205, 205)
+    SEARCH_DEBOUNCE_MS = 300
+
+    def __init__(self, firestore_service, session_snapshot=None, startup_timer=None, write_queue=None,
+                 delete_snapshot_dir=None):
         super().__init__()
         self.setWindowTitle("Festival Company Management")
         self.setGeometry(100, 100, 1200, 800)
 
         self.firestore_service = firestore_service
+        # With a snapshot store the window opens on the last session's list and loads in the background
+        self.session_snapshot = session_snapshot
+        self.startup_timer = startup_timer or StartupTimer()
+        self.startup = None
+        self.live_data_shown = False
         self.current_sort_column = -1
         self.current_sort_order = Qt.SortOrder.AscendingOrder
         self.filter_inputs = []  # New attribute to store filter inputs
+        self.filter_headers = []
+        self.facet_index = None  # Value index of the table columns, rebuilt on every load
+        self.filter_specs = {}
+        self.filter_masks = {}
+        self.visible_mask = 0
+        self.facet_refresh_pending = False
+        self.companies = []
+        self.companies_by_id = {}  # Last loaded records, used to skip no-op writes
+        self.row_by_id = None  # Lazily rebuilt whenever table rows move
+        self.company_frame = None  # Column store for analytics and derived columns
+        self.derived_columns = None
+        self.pivot_view = None
+        self.pending_conflicts = []
+        self.last_delete_snapshot = None  # DeleteSnapshot of the last bulk delete, for undo
+        self.delete_snapshot_dir = delete_snapshot_dir  # Where bulk deletes are saved, the user's folder if None
+        self.inline_edits = {}  # (collection, company_id) -> {field: value before the unconfirmed in-place edit}
+        self.rejected_cells = {}  # company_id -> {field: error} of in-place edits rolled back since the last load
+        # Callers running against a test backend pass their own queue, so the user's pending writes stay untouched
+        self.write_queue = write_queue or OfflineWriteQueue(firestore_service, parent=self)
+        self.write_queue.mutationQueued.connect(self.apply_local_mutation)
+        self.write_queue.mutationCommitted.connect(self.on_mutation_committed)
+        self.write_queue.conflictDetected.connect(self.on_write_conflict)
+        self.write_queue.pendingCountChanged.connect(self.update_sync_status)
+        self.write_queue.flushFailed.connect(self.on_flush_failed)
+        self.prefetcher = DocumentPrefetcher(firestore_service, self)
+        self.prefetcher.documentLoaded.connect(self.on_document_loaded)
+        self.details_pool = DetailsDialogPool(firestore_service, self.write_queue, self)
+        self.details_pool.navigateRequested.connect(self.navigate_company_details)
+        self.details_view = None
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
 
         self.setup_ui()
-        self.populate_festivals()
-        self.load_companies()
+        if session_snapshot is None:
+            self.populate_festivals()
+            self.load_companies()
+        else:
+            self.start_from_snapshot()
 
     def setup_ui(self):
         # Top layout
@@ -59,6 +107,15 @@ class MainWindow(QMainWindow):
         self.search_button = QPushButton("Search")
         self.search_button.clicked.connect(self.filter_companies)
         top_layout.addWidget(self.search_button)
+        # For collections too big to load: only the companies whose name starts with the search text are fetched
+        self.server_search_checkbox = QCheckBox("Server search")
+        self.server_search_checkbox.toggled.connect(self.load_companies)
+        top_layout.addWidget(self.server_search_checkbox)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.load_companies)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
 
         self.main_layout.addLayout(top_layout)
 
@@ -75,8 +132,14 @@ class MainWindow(QMainWindow):
         self.company_table = QTableWidget()
         self.company_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.company_table.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
-        self.company_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        # Status and flag cells are changed in place; double-click still opens the details dialog
+        self.company_table.setEditTriggers(QAbstractItemView.EditTrigger.SelectedClicked |
+                                           QAbstractItemView.EditTrigger.EditKeyPressed)
+        self.cell_delegate = InlineCellDelegate(self.company_table)
+        self.cell_delegate.valueChosen.connect(self.on_cell_value_chosen)
+        self.company_table.setItemDelegate(self.cell_delegate)
         self.company_table.doubleClicked.connect(self.open_company_details)
+        self.company_table.currentCellChanged.connect(lambda row, *_: self.prefetch_neighbours(row))
         self.company_table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         self.main_layout.addWidget(self.company_table)
 
@@ -99,8 +162,39 @@ class MainWindow(QMainWindow):
         self.bulk_edit_button.clicked.connect(self.bulk_edit)
         button_layout.addWidget(self.bulk_edit_button)
 
+        self.bulk_edit_filter_button = QPushButton("Bulk Edit by Filter")
+        self.bulk_edit_filter_button.clicked.connect(self.bulk_edit_by_filter)
+        button_layout.addWidget(self.bulk_edit_filter_button)
+
+        self.bulk_delete_button = QPushButton("Bulk Delete")
+        self.bulk_delete_button.clicked.connect(self.bulk_delete)
+        button_layout.addWidget(self.bulk_delete_button)
+
+        self.bulk_delete_filter_button = QPushButton("Delete by Filter")
+        self.bulk_delete_filter_button.clicked.connect(self.bulk_delete_by_filter)
+        button_layout.addWidget(self.bulk_delete_filter_button)
+
+        self.undo_delete_button = QPushButton("Undo Delete")
+        self.undo_delete_button.setEnabled(False)
+        self.undo_delete_button.clicked.connect(self.undo_bulk_delete)
+        button_layout.addWidget(self.undo_delete_button)
+
+        self.dashboard_button = QPushButton("Dashboard")
+        self.dashboard_button.clicked.connect(self.open_dashboard)
+        button_layout.addWidget(self.dashboard_button)
+
+        self.pivot_button = QPushButton("Pivot")
+        self.pivot_button.clicked.connect(self.open_pivot_view)
+        button_layout.addWidget(self.pivot_button)
+
         self.main_layout.addLayout(button_layout)
 
+        # Reads, writes and latency of this session's Firestore calls
+        metrics = getattr(self.firestore_service, "metrics", None)
+        if metrics is not None:
+            self.metrics_overlay = MetricsOverlay(metrics, self)
+            self.statusBar().addPermanentWidget(self.metrics_overlay)
+
         # Connect radio buttons to load_companies and update_filter_inputs
         self.install_radio.toggled.connect(self.on_collection_changed)
         self.demolition_radio.toggled.connect(self.on_collection_changed)
@@ -119,6 +213,72 @@ class MainWindow(QMainWindow):
             logging.error(f"Error populating festivals: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load festivals: {str(e)}")
 
+    def set_festivals(self, festivals):
+        current = self.festival_combo.currentText()
+        self.festival_combo.blockSignals(True)
+        self.festival_combo.clear()
+        self.festival_combo.addItems(["All Festivals"] + festivals)
+        if current in festivals:
+            self.festival_combo.setCurrentText(current)
+        self.festival_combo.blockSignals(False)
+
+    def start_from_snapshot(self):
+        """Paint the list saved by the last session now and replace it with live data when that arrives."""
+        saved = self.session_snapshot.load()
+        if saved is not None:
+            self.set_festivals(saved["festivals"])
+            for radio in (self.install_radio, self.demolition_radio):
+                radio.blockSignals(True)
+            (self.demolition_radio if saved["collection"] == "Company_Demolition" else
+             self.install_radio).setChecked(True)
+            for radio in (self.install_radio, self.demolition_radio):
+                radio.blockSignals(False)
+            self.festival_combo.setCurrentText(saved["festival"])
+            try:
+                self.show_companies(saved["companies"], self.get_current_collection())
+                age_minutes = max(0, int((time.time() - saved["saved_at"]) / 60))
+                self.statusBar().showMessage(f"Showing the list saved {age_minutes} min ago, refreshing...")
+                self.startup_timer.mark("snapshot painted")
+            except Exception as e:
+                logging.error(f"Error showing session snapshot: {e}")
+        else:
+            self.festival_combo.addItem("All Festivals")
+            self.statusBar().showMessage("Loading companies...")
+
+        self.startup = StartupPipeline(self.firestore_service, self)
+        self.startup.festivalsLoaded.connect(self.on_festivals_loaded)
+        self.startup.companiesLoaded.connect(self.on_companies_loaded)
+        self.startup.failed.connect(self.on_startup_failed)
+        self.startup.start(self.get_current_collection(), self.festival_combo.currentText())
+
+    def on_festivals_loaded(self, festivals):
+        if festivals:
+            self.set_festivals(festivals)
+        self.startup_timer.mark("festivals loaded")
+
+    def on_companies_loaded(self, collection, festival, companies):
+        # A reload started by the user since then has newer data, or data for another selection
+        if self.live_data_shown or collection != self.get_current_collection() or \
+                festival != self.festival_combo.currentText() or self.server_search_checkbox.isChecked():
+            return
+        try:
+            self.show_companies(companies, collection)
+            self.live_data_shown = True
+            self.statusBar().showMessage(f"Loaded {len(companies)} companies", 3000)
+        except Exception as e:
+            logging.error(f"Error loading companies: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to load companies: {str(e)}")
+        self.startup_timer.mark("live data shown")
+        self.startup_timer.report()
+
+    def on_startup_failed(self, step, error):
+        if step == "festivals":
+            return
+        if self.companies:
+            self.statusBar().showMessage(f"Offline - showing the saved list ({error})")
+        else:
+            QMessageBox.critical(self, "Error", f"Failed to load companies: {error}")
+
     def on_header_clicked(self, logical_index):
         if self.current_sort_column == logical_index:
             # Toggle sort order if clicking on the same column
@@ -132,17 +292,8 @@ class MainWindow(QMainWindow):
             self.current_sort_order = Qt.SortOrder.AscendingOrder
 
         self.company_table.sortItems(self.current_sort_column, self.current_sort_order)
-
-    def filter_companies(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.company_table.rowCount()):
-            should_show = False
-            for col in range(1, self.company_table.columnCount()):
-                item = self.company_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    should_show = True
-                    break
-            self.company_table.setRowHidden(row, not should_show)
+        # Hidden flags stay with the row positions, not with the moved items
+        self.update_row_visibility(full=True)
 
     def load_companies(self):
         try:
@@ -151,23 +302,14 @@ class MainWindow(QMainWindow):
             if festival == "All Festivals":
                 festival = None
 
-            companies = self.firestore_service.get_companies(collection, festival)
-
-            self.company_table.setRowCount(len(companies))
-            headers = self.get_headers_for_collection(collection)
-            self.company_table.setColumnCount(len(headers))
-            self.company_table.setHorizontalHeaderLabels(headers)
-
-            for row, company in enumerate(companies):
-                for col, header in enumerate(headers):
-                    if header == "ID":
-                        value = company.get('Id', '')  # Use 'Id' from the data
-                    else:
-                        value = self.get_company_value(company, header, collection)
-                    item = QTableWidgetItem(str(value))
-                    self.company_table.setItem(row, col, item)
-
-            self.company_table.resizeColumnsToContents()
+            if self.server_search_checkbox.isChecked():
+                self.search_timer.stop()
+                companies = self.firestore_service.search_companies(collection, self.search_input.text(), festival)
+                self.show_search_status(companies)
+            else:
+                companies = self.firestore_service.get_companies(collection, festival)
+            self.show_companies(companies, collection)
+            self.live_data_shown = True
 
             if not companies:
                 logging.info(f"No companies found for collection: {collection}, festival: {festival}")
@@ -178,34 +320,362 @@ class MainWindow(QMainWindow):
             logging.error(f"Error loading companies: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load companies: {str(e)}")
 
+    def show_companies(self, companies, collection):
+        """Rebuild the table, index and derived columns from a fresh list of records."""
+        self.companies = companies
+        self.companies_by_id = {str(company.get('Id', '')): company for company in companies}
+        # Changes not yet confirmed by the server stay visible after a reload
+        self.company_frame = None
+        self.apply_pending_mutations(collection)
+
+        self.company_table.setRowCount(len(self.companies))
+        headers = self.get_headers_for_collection(collection)
+        self.company_table.setColumnCount(len(headers))
+        self.company_table.setHorizontalHeaderLabels(headers)
+        self.cell_delegate.schema = get_schema(collection)
+        self.rejected_cells = {}
+
+        from src.facet_index import FacetIndex
+        facet_headers = get_schema(collection).facet_headers
+        self.facet_index = FacetIndex([col for col, header in enumerate(headers) if header in facet_headers],
+                                      range(len(headers)))
+        self.row_by_id = None
+        self.get_company_frame()  # Derived columns are computed over it in one go
+        for row, company in enumerate(self.companies):
+            self.set_company_row(row, company, headers, collection)
+        if headers != self.filter_headers:
+            self.update_filter_inputs()
+        self.filter_specs = {}  # Recompute every filter mask against the new index
+        self.apply_filters(full=True)
+        self.refresh_pivot_view()
+
+        self.company_table.resizeColumnsToContents()
+
+    def set_company_row(self, row, company, headers, collection):
+        schema = get_schema(collection)
+        values = schema.display_row(self.get_display_record(company))
+        for col, value in enumerate(values):
+            if col in schema.numeric_columns and value:
+                # Numbers sort numerically rather than as text
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, int(value))
+            else:
+                item = QTableWidgetItem(value)
+            self.company_table.setItem(row, col, item)
+        if self.rejected_cells:
+            for field, error in self.rejected_cells.get(str(company.get('Id', '')), {}).items():
+                item = self.company_table.item(row, schema.column_fields.index(field))
+                item.setBackground(self.REJECTED_CELL_COLOR)
+                item.setToolTip(f"Change not saved: {error}")
+        if self.facet_index is not None:
+            self.facet_index.set_row(str(company.get('Id', '')), dict(enumerate(values)))
+
+    def find_company_row(self, company_id):
+        row = -1 if self.row_by_id is None else self.row_by_id.get(company_id, -1)
+        item = self.company_table.item(row, 1) if row >= 0 else None
+        if item is None or item.text() != company_id:
+            self.row_by_id = {}
+            for table_row in range(self.company_table.rowCount()):
+                item = self.company_table.item(table_row, 1)  # Assuming ID is in column 1
+                if item:
+                    self.row_by_id[item.text()] = table_row
+            row = self.row_by_id.get(company_id, -1)
+        return row
+
+    def apply_pending_mutations(self, collection):
+        for op, _, company_id, data in self.write_queue.pending_mutations(collection):
+            self.apply_mutation_to_records(op, company_id, data)
+
+    def apply_mutation_to_records(self, op, company_id, data):
+        if op == "update":
+            if company_id in self.companies_by_id:
+                self.companies_by_id[company_id].update(data)
+                if self.company_frame is not None:
+                    self.company_frame.update(company_id, data)
+        elif op == "create":
+            if company_id not in self.companies_by_id:
+                company = dict(data)
+                self.companies.append(company)
+                self.companies_by_id[company_id] = company
+                if self.company_frame is not None:
+                    self.company_frame.upsert(company)
+        elif op == "delete":
+            company = self.companies_by_id.pop(company_id, None)
+            if company is not None:
+                self.companies.remove(company)
+                if self.company_frame is not None:
+                    self.company_frame.remove(company_id)
+
+    def apply_local_mutation(self, op, collection, company_id, data):
+        """Show a queued mutation right away, before Firestore has confirmed it."""
+        if collection != self.get_current_collection():
+            return
+        was_loaded = company_id in self.companies_by_id
+        self.apply_mutation_to_records(op, company_id, data)
+        if op == "delete":
+            row = self.find_company_row(company_id) if was_loaded else -1
+            if row >= 0:
+                self.company_table.removeRow(row)
+                self.row_by_id = None
+            if self.facet_index is not None:
+                self.facet_index.remove_row(company_id)
+                self.update_row_visibility()
+                self.schedule_facet_refresh()
+        elif company_id in self.companies_by_id:
+            row = self.find_company_row(company_id)
+            if row < 0:
+                row = self.company_table.rowCount()
+                self.company_table.insertRow(row)
+                self.row_by_id = None
+            self.set_company_row(row, self.companies_by_id[company_id],
+                                 self.get_headers_for_collection(collection), collection)
+            self.refilter_company(company_id)
+        self.refresh_pivot_view()
+
+    def get_company_frame(self):
+        if self.company_frame is None:
+            from src.analytics import CompanyFrame
+            from src.derived_columns import DerivedColumns, DERIVED_COLUMNS
+            collection = self.get_current_collection()
+            fields = [field for field in get_schema(collection).stored_fields
+                      if field not in ("Id", "CompanyName", "LastModified")]
+            self.company_frame = CompanyFrame(collection, fields, self.companies)
+            self.derived_columns = DerivedColumns(self.company_frame, DERIVED_COLUMNS.get(collection, {}))
+        return self.company_frame
+
+    def get_display_record(self, company):
+        """The record with its derived column values added."""
+        if self.derived_columns is None or not self.derived_columns.columns:
+            return company
+        return {**company, **self.derived_columns.row_values(company.get('Id', ''))}
+
+    def open_pivot_view(self):
+        from src.pivot_view import PivotView
+        from src.status_dashboard import DASHBOARD_FIELDS
+        collection = self.get_current_collection()
+        flag_fields = [field for field, _ in DASHBOARD_FIELDS[collection]["checks"]]
+        if self.pivot_view is not None:
+            self.pivot_view.close()
+            self.pivot_view.deleteLater()
+        self.pivot_view = PivotView(self.get_company_frame(), self.get_field_mapping(collection), flag_fields, self)
+        self.pivot_view.setWindowTitle(f"Pivot - {collection}")
+        self.pivot_view.show()
+
+    def refresh_pivot_view(self):
+        if self.pivot_view is None or not self.pivot_view.isVisible():
+            return
+        if self.pivot_view.company_frame is not self.get_company_frame():
+            if self.pivot_view.company_frame.fields != self.company_frame.fields:
+                # The collection changed under the view, its field choices no longer apply
+                self.pivot_view.close()
+                return
+            self.pivot_view.set_company_frame(self.company_frame)
+        else:
+            self.pivot_view.refresh()
+
+    def on_cell_value_chosen(self, row, column, text):
+        """Queue a status or flag picked in the table; the row shows it before the write is sent."""
+        collection = self.get_current_collection()
+        schema = get_schema(collection)
+        field = schema.inline_columns.get(column)
+        item = self.company_table.item(row, 1)  # Assuming ID is in column 1
+        company = self.companies_by_id.get(item.text()) if item else None
+        if field is None or company is None:
+            return
+        company_id = item.text()
+        value = schema.parse_display_value(field, text)
+        if schema.encode_value(field, company.get(field)) == value:
+            return
+        # What the server had is kept until the write is confirmed, to put back if it is rejected
+        self.inline_edits.setdefault((collection, company_id), {}).setdefault(field, company.get(field))
+        self.rejected_cells.get(company_id, {}).pop(field, None)
+        self.write_queue.submit(collection, company_id, {field: value, "LastModified": datetime.now()},
+                                company.get(UPDATE_TIME_FIELD))
+
+    def roll_back_inline_edit(self, collection, company_id, data, error):
+        """Put back the values of rejected in-place edits and mark their cells.
+
+        Returns True when the rejected write held nothing but in-place edits.
+        """
+        edits = self.inline_edits.pop((collection, company_id), None)
+        if not edits:
+            return False
+        schema = get_schema(collection)
+        if collection == self.get_current_collection() and company_id in self.companies_by_id:
+            self.rejected_cells.setdefault(company_id, {}).update(dict.fromkeys(edits, error))
+            self.apply_local_mutation("update", collection, company_id, edits)
+        fields = ", ".join(schema.header_by_field.get(field, field) for field in edits)
+        self.statusBar().showMessage(f"Change of {fields} on {company_id} was rejected and rolled back: {error}",
+                                     10000)
+        # Show what was saved in the meantime instead of the version the edit was based on
+        self.prefetcher.invalidate(collection, company_id)
+        self.prefetcher.fetch(collection, company_id)
+        return set(data) <= set(edits) | {"LastModified"}
+
+    def on_mutation_committed(self, op, collection, company_id, data, update_time):
+        edits = self.inline_edits.get((collection, company_id))
+        if edits is not None and op == "update":
+            for field in data:
+                edits.pop(field, None)
+            if not edits:
+                del self.inline_edits[(collection, company_id)]
+        self.prefetcher.invalidate(collection, company_id)
+        company = self.companies_by_id.get(company_id)
+        if collection == self.get_current_collection() and company is not None and update_time:
+            company[UPDATE_TIME_FIELD] = update_time
+
+    def on_write_conflict(self, op, collection, company_id, data, error):
+        if op == "update" and self.roll_back_inline_edit(collection, company_id, data, error):
+            return
+        self.pending_conflicts.append(company_id)
+        if len(self.pending_conflicts) == 1:
+            # Report all conflicts of one flush together
+            QTimer.singleShot(0, self.report_write_conflicts)
+
+    def report_write_conflicts(self):
+        conflicts, self.pending_conflicts = self.pending_conflicts, []
+        QMessageBox.warning(self, "Sync Conflict",
+                            f"{len(conflicts)} change(s) were rejected because the companies were modified "
+                            f"by someone else in the meantime:\n{', '.join(conflicts)}\n\n"
+                            f"The list will be reloaded with the current data.")
+        self.load_companies()
+
+    def update_sync_status(self, pending_count):
+        if pending_count:
+            self.statusBar().showMessage(f"{pending_count} change(s) waiting to sync")
+        elif self.rejected_cells:
+            rejected = sum(len(fields) for fields in self.rejected_cells.values())
+            self.statusBar().showMessage(f"All changes synced, {rejected} change(s) were rejected and rolled back")
+        else:
+            self.statusBar().showMessage("All changes synced", 3000)
+
+    def on_flush_failed(self, error):
+        self.statusBar().showMessage(f"Offline - {self.write_queue.pending_count()} change(s) queued ({error})")
+
     def get_current_collection(self):
         return "Company_Install" if self.install_radio.isChecked() else "Company_Demolition"
 
     def get_company_value(self, company, header, collection):
-        field_mapping = self.get_field_mapping(collection)
-        field = next((f for f, h in field_mapping.items() if h == header), None)
+        schema = get_schema(collection)
+        field = schema.field_by_header.get(header)
         if field is None:
             return ""
+        return schema.display_value(field, company.get(field))
+
+    def current_filters(self):
+        """Return {column or "search": (kind, value)} for every filter that is set."""
+        filters = {}
+        for col, filter_input in enumerate(self.filter_inputs):
+            if isinstance(filter_input, QComboBox):
+                if filter_input.currentData() is not None:
+                    filters[col] = ("facet", filter_input.currentData())
+            elif filter_input.text():
+                filters[col] = ("text", filter_input.text().lower())
+        search_text = self.search_input.text().lower()
+        # Server search already picked the rows by name, with accents folded
+        if search_text and not self.server_search_checkbox.isChecked():
+            filters["search"] = ("search", search_text)
+        return filters
+
+    def filter_mask(self, key, spec):
+        kind, value = spec
+        if kind == "facet":
+            return self.facet_index.value_mask(key, [value])
+        if kind == "text":
+            return self.facet_index.matching_mask(key, lambda text: value in text.lower())
+        mask = 0
+        for col in range(1, len(self.filter_headers)):
+            mask |= self.facet_index.matching_mask(col, lambda text: value in text.lower())
+        return mask
+
+    def filter_matches(self, key, spec, company_id):
+        kind, value = spec
+        if kind == "facet":
+            return self.facet_index.value(key, company_id) == value
+        if kind == "text":
+            return value in (self.facet_index.value(key, company_id) or "").lower()
+        return any(value in (self.facet_index.value(col, company_id) or "").lower()
+                   for col in range(1, len(self.filter_headers)))
+
+    def apply_filters(self, full=False):
+        if self.facet_index is None:
+            return
+        # Only filters that changed are evaluated again, the others keep their masks
+        filters = self.current_filters()
+        self.filter_masks = {key: self.filter_masks[key] if self.filter_specs.get(key) == spec
+                             else self.filter_mask(key, spec)
+                             for key, spec in filters.items()}
+        self.filter_specs = filters
+        self.update_row_visibility(full)
+        self.refresh_facet_counts()
+
+    def refilter_company(self, company_id):
+        """Re-evaluate the filters for one changed record instead of the whole table."""
+        slot = self.facet_index.slot(company_id) if self.facet_index is not None else None
+        if slot is None:
+            return
+        bit = 1 << slot
+        for key, spec in self.filter_specs.items():
+            if self.filter_matches(key, spec, company_id):
+                self.filter_masks[key] |= bit
+            else:
+                self.filter_masks[key] &= ~bit
+        self.update_row_visibility()
+        self.schedule_facet_refresh()
 
-        value = company.get(field, "")
-        if header in ["Elosztó", "Áram", "Hálózat", "PTG", "Szoftver", "Param", "Helyszín", "Bázis Leszerelés"]:
-            return "Van" if value else "Nincs"
-        elif header == "Last Modified":
-            return str(value) if value else ""
-        else:
-            return str(value)
-
-    def apply_filters(self):
-        for row in range(self.company_table.rowCount()):
-            should_show = True
-            for col, filter_input in enumerate(self.filter_inputs):
-                filter_text = filter_input.text().lower()
-                if filter_text:
-                    item = self.company_table.item(row, col)
-                    if item is None or filter_text not in item.text().lower():
-                        should_show = False
-                        break
-            self.company_table.setRowHidden(row, not should_show)
+    def update_row_visibility(self, full=False):
+        """Show and hide rows by the filter masks, touching only rows whose visibility changed."""
+        if self.facet_index is None:
+            return
+        mask = self.facet_index.all_mask
+        for filter_mask in self.filter_masks.values():
+            mask &= filter_mask
+        changed = self.facet_index.all_mask if full else self.visible_mask ^ mask
+        self.visible_mask = mask
+        # Without this the table relayouts after every single hidden row
+        self.company_table.setUpdatesEnabled(False)
+        try:
+            for slots, hidden in ((changed & mask, False), (changed & ~mask, True)):
+                for slot in self.facet_index.iter_slots(slots):
+                    company_id = self.facet_index.key_for_slot(slot)
+                    row = self.find_company_row(company_id) if company_id is not None else -1
+                    if row >= 0:
+                        self.company_table.setRowHidden(row, hidden)
+        finally:
+            self.company_table.setUpdatesEnabled(True)
+
+    def schedule_facet_refresh(self):
+        if not self.facet_refresh_pending:
+            # Many records can change in one go, count them once afterwards
+            self.facet_refresh_pending = True
+            QTimer.singleShot(0, self.refresh_facet_counts)
+
+    def refresh_facet_counts(self):
+        self.facet_refresh_pending = False
+        if self.facet_index is None:
+            return
+        for col, filter_input in enumerate(self.filter_inputs):
+            if not isinstance(filter_input, QComboBox):
+                continue
+            # Each facet counts the rows left by all the other filters
+            mask = self.facet_index.all_mask
+            for key, filter_mask in self.filter_masks.items():
+                if key != col:
+                    mask &= filter_mask
+            self.set_facet_items(filter_input, self.filter_headers[col], self.facet_index.counts(col, mask),
+                                 mask.bit_count())
+
+    def set_facet_items(self, combo, header, counts, total):
+        selected = combo.currentData()
+        if selected is not None:
+            counts.setdefault(selected, 0)
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItem(f"All {header} ({total})", None)
+        for value in sorted(counts):
+            combo.addItem(f"{value or '(empty)'} ({counts[value]})", value)
+        combo.setCurrentIndex(max(combo.findData(selected), 0) if selected is not None else 0)
+        combo.blockSignals(False)
 
     def update_filter_inputs(self):
         # Clear existing filter inputs
@@ -221,56 +691,128 @@ class MainWindow(QMainWindow):
 
         # Add new filter inputs
         headers = self.get_headers_for_collection(self.get_current_collection())
+        facet_headers = get_schema(self.get_current_collection()).facet_headers
         for header in headers:
-            filter_input = QLineEdit()
-            filter_input.setPlaceholderText(f"Filter {header}...")
-            filter_input.textChanged.connect(self.apply_filters)
+            if header in facet_headers:
+                filter_input = QComboBox()
+                filter_input.addItem(f"All {header}", None)
+                filter_input.currentIndexChanged.connect(lambda _: self.apply_filters())
+            else:
+                filter_input = QLineEdit()
+                filter_input.setPlaceholderText(f"Filter {header}...")
+                filter_input.textChanged.connect(lambda _: self.apply_filters())
             self.filter_layout.addWidget(filter_input)
             self.filter_inputs.append(filter_input)
+        self.filter_headers = headers
+        self.filter_specs = {}
+        self.filter_masks = {}
 
     def on_collection_changed(self):
         self.load_companies()
-        self.update_filter_inputs()
 
-    # Existing filter_companies method (keep for backwards compatibility)
     def filter_companies(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.company_table.rowCount()):
-            should_show = False
-            for col in range(1, self.company_table.columnCount()):
-                item = self.company_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    should_show = True
-                    break
-            self.company_table.setRowHidden(row, not should_show)
+        if self.server_search_checkbox.isChecked():
+            self.load_companies()
+        else:
+            self.apply_filters()
+
+    def on_search_text_changed(self, text):
+        if self.server_search_checkbox.isChecked():
+            # One query once typing pauses, not one per keystroke
+            self.search_timer.start()
+
+    def show_search_status(self, companies):
+        if not self.search_input.text().strip():
+            self.statusBar().showMessage("Server search: type the beginning of a company name")
+        elif len(companies) >= self.firestore_service.SEARCH_LIMIT:
+            self.statusBar().showMessage(f"Server search: showing the first {len(companies)} matches, "
+                                         f"type more to narrow it down")
+        else:
+            self.statusBar().showMessage(f"Server search: {len(companies)} match(es)")
 
     def get_headers_for_collection(self, collection):
-        common_headers = ["ID", "Name", "Program"]
-        if collection == "Company_Install":
-            specific_headers = ["Felderítés", "Telepítés", "Elosztó", "Áram", "Hálózat", "PTG", "Szoftver", "Param", "Helyszín"]
-        else:  # Company_Demolition
-            specific_headers = ["Bontás", "Felszerelés", "Bázis Leszerelés"]
-        return ["Select"] + common_headers + specific_headers + ["Last Modified"]
+        return get_schema(collection).headers
 
     def open_company_details(self, index):
         try:
             company_id = self.company_table.item(index.row(), 1).text()  # Assuming ID is in column 1
             collection = self.get_current_collection()
-            company_data = self.firestore_service.get_company(collection, company_id)
+            company = self.companies_by_id.get(company_id)
+            # The list already holds the document, the dialog opens from it and a fresh copy follows
+            company_data = dict(company) if company is not None else self.firestore_service.get_company(collection,
+                                                                                                         company_id)
 
             if company_data is None:
                 raise ValueError(f"No data found for company ID: {company_id}")
 
-            if collection == "Company_Install":
-                details_view = CompanyDetailsViewInstall(self.firestore_service, company_id, self, company_data)
-            else:
-                details_view = CompanyDetailsViewDemolition(self.firestore_service, company_id, self, company_data)
-
-            details_view.companyUpdated.connect(self.load_companies)
+            details_view = self.details_pool.acquire(collection, company_id, company_data)
+            self.details_view = details_view
+            self.prefetcher.fetch(collection, company_id)
+            self.prefetch_neighbours(index.row())
             details_view.exec()
         except Exception as e:
             logging.error(f"Error opening company details: {e}")
             QMessageBox.critical(self, "Error", f"Failed to open company details: {str(e)}")
+        finally:
+            self.details_view = None
+
+    def neighbour_rows(self, row, step, count):
+        """The next count visible rows from row in the direction of step."""
+        rows = []
+        row += step
+        while 0 <= row < self.company_table.rowCount() and len(rows) < count:
+            if not self.company_table.isRowHidden(row):
+                rows.append(row)
+            row += step
+        return rows
+
+    def prefetch_neighbours(self, row):
+        if row < 0:
+            return
+        company_ids = []
+        for step in (1, -1):
+            for neighbour in self.neighbour_rows(row, step, self.PREFETCH_NEIGHBOURS):
+                item = self.company_table.item(neighbour, 1)  # Assuming ID is in column 1
+                if item:
+                    company_ids.append(item.text())
+        self.prefetcher.prefetch(self.get_current_collection(), company_ids)
+
+    def navigate_company_details(self, step):
+        details_view = self.details_view
+        if details_view is None:
+            return
+        neighbours = self.neighbour_rows(self.find_company_row(details_view.company_id), step, 1)
+        if not neighbours:
+            return
+        row = neighbours[0]
+        company_id = self.company_table.item(row, 1).text()  # Assuming ID is in column 1
+        company = self.companies_by_id.get(company_id)
+        if company is None:
+            return
+        # Move the current row along without touching the multi-row selection
+        self.company_table.setCurrentCell(row, 1, QItemSelectionModel.SelectionFlag.NoUpdate)
+        self.company_table.scrollToItem(self.company_table.item(row, 1))
+        details_view.set_company(company_id, dict(company))
+        self.prefetcher.fetch(self.get_current_collection(), company_id)
+
+    def on_document_loaded(self, collection, company_id, document):
+        """Merge a freshly fetched document into the list and into an open dialog showing it."""
+        company = self.companies_by_id.get(company_id)
+        if collection != self.get_current_collection() or company is None:
+            return
+        fresh = get_schema(collection).encode_record(document)
+        if (fresh.get(UPDATE_TIME_FIELD) or "") < (company.get(UPDATE_TIME_FIELD) or ""):
+            return  # Fetched before a write of ours landed
+        # Changes still waiting in the queue stay on top of the server version
+        for op, _, pending_id, data in self.write_queue.pending_mutations(collection):
+            if pending_id == company_id and op == "update":
+                fresh.update(data)
+        changes = {field: value for field, value in fresh.items() if company.get(field) != value}
+        if not changes:
+            return
+        self.apply_local_mutation("update", collection, company_id, changes)
+        if self.details_view is not None and self.details_view.company_id == company_id:
+            self.details_view.refresh_company(dict(company))
 
     def add_company(self):
         try:
@@ -283,18 +825,23 @@ class MainWindow(QMainWindow):
                 "ProgramName": "",
                 # Add other fields with default values as needed
             }
-            if collection == "Company_Install":
-                details_view = CompanyDetailsViewInstall(self.firestore_service, new_id, self, new_company_data)
-            else:
-                details_view = CompanyDetailsViewDemolition(self.firestore_service, new_id, self, new_company_data)
-            details_view.companyUpdated.connect(self.load_companies)
-            details_view.show()
+            self.details_view = self.details_pool.acquire(collection, new_id, new_company_data, is_new=True)
+            self.details_view.exec()
         except Exception as e:
             logging.error(f"Error adding company: {e}")
             QMessageBox.critical(self, "Error", f"Failed to add company: {str(e)}")
+        finally:
+            self.details_view = None
 
     def export_to_csv(self):
-        ExcelExporter.export_to_excel(self, self.company_table)
+        # Export in the order the table currently shows
+        companies = []
+        for row in range(self.company_table.rowCount()):
+            item = self.company_table.item(row, 1)  # Assuming ID is in column 1
+            if item and item.text() in self.companies_by_id:
+                companies.append(self.get_display_record(self.companies_by_id[item.text()]))
+        from src.excel_exporter import ExcelExporter
+        ExcelExporter.export_to_excel(self, companies, self.get_current_collection())
 
     def bulk_edit(self):
         selected_rows = set()
@@ -305,99 +852,275 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "No Selection", "Please select rows to edit.")
             return
 
+        from src.edit_field_dialog import EditFieldDialog
         collection = self.get_current_collection()
         dialog = EditFieldDialog(collection, self)
-        if dialog.exec():
-            field, value = dialog.get_field_and_value()
-            self.apply_bulk_edit(field, value, selected_rows)
+        try:
+            if dialog.exec():
+                self.apply_bulk_edit(dialog.get_db_patch(), selected_rows)
+        finally:
+            dialog.deleteLater()
 
-    def apply_bulk_edit(self, field, value, selected_rows):
+    def apply_bulk_edit(self, patch, selected_rows):
         collection = self.get_current_collection()
-        field_mapping = self.get_field_mapping(collection)
-        db_field = field_mapping.get(field, field)
-
-        success_count = 0
-        fail_count = 0
-        not_found_ids = []
 
+        # Diff the patch against the loaded records so unchanged documents are not written at all
+        patches = {}
+        company_ids = set()
         for row in selected_rows:
             company_id = self.company_table.item(row, 1).text()  # Assuming ID is in column 1
+            company = self.companies_by_id.get(company_id, {})
+            changes = {field: value for field, value in patch.items() if company.get(field) != value}
+            company_ids.add(company_id)
+            if changes:
+                patches[company_id] = changes
+        unchanged_count = len(company_ids) - len(patches)
+        logging.debug(f"Bulk edit patch: {patch}, {len(patches)} companies changed, {unchanged_count} unchanged")
+
+        if patches:
+            # Queued durably and shown right away through apply_local_mutation
+            base_update_times = {company_id: self.companies_by_id.get(company_id, {}).get(UPDATE_TIME_FIELD)
+                                 for company_id in patches}
+            self.write_queue.enqueue_many("update", collection, patches, base_update_times)
+
+        message = f"Updated {len(patches)} companies."
+        if unchanged_count > 0:
+            message += f"\n{unchanged_count} companies already had these values and were skipped."
+        QMessageBox.information(self, "Bulk Edit Result", message)
+
+    def bulk_edit_by_filter(self):
+        from src.bulk_filter_dialog import BulkFilterDialog
+        from src.edit_field_dialog import EditFieldDialog
+        collection = self.get_current_collection()
+        festivals = [self.festival_combo.itemText(i) for i in range(1, self.festival_combo.count())]
+        filter_dialog = BulkFilterDialog(collection, self.firestore_service, festivals,
+                                         self.festival_combo.currentText(), self)
+        edit_dialog = EditFieldDialog(collection, self)
+        try:
+            if not filter_dialog.exec():
+                return
+
+            filters = filter_dialog.get_filters()
+            total = filter_dialog.matching_count
+            if total is None:
+                total = filter_dialog.update_preview()
+            if total == 0:
+                QMessageBox.information(self, "Bulk Edit", "No companies match the selected filter.")
+                return
+
+            if not edit_dialog.exec():
+                return
+            patch = edit_dialog.get_patch()
+            schema = get_schema(collection)
+            changes = ", ".join(f"{header} = {schema.display_value(schema.field_by_header.get(header), value)}"
+                                for header, value in patch.items())
+
+            count_text = str(total) if total is not None else "all matching"
+            reply = QMessageBox.question(
+                self, "Bulk Edit by Filter",
+                f"Set {changes} on {count_text} companies ({filter_dialog.get_filter_description()})?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+            self.apply_bulk_edit_by_filter(collection, filters, edit_dialog.get_db_patch(), total)
+        finally:
+            filter_dialog.deleteLater()
+            edit_dialog.deleteLater()
+
+    def apply_bulk_edit_by_filter(self, collection, filters, patch, total=None):
+        progress = QProgressDialog("Updating companies...", "Cancel", 0, total or 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_progress(done, failed):
+            progress.setValue(min(done + failed, progress.maximum()) if total else 0)
+            progress.setLabelText(f"Updated {done} companies, {failed} failed...")
+            QApplication.processEvents()
+            return not progress.wasCanceled()
 
-            # Convert "Van"/"Nincs" to boolean for database update
-            if value in ["Van", "Nincs"]:
-                db_value = True if value == "Van" else False
-            else:
-                db_value = value
+        try:
+            doc_refs = self.firestore_service.iter_company_refs(collection, filters)
+            success_count, fail_count = self.firestore_service.apply_patch_to_refs(doc_refs, patch, on_progress,
+                                                                                   collection)
+        except Exception as e:
+            logging.error(f"Error applying bulk edit by filter: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to apply bulk edit: {str(e)}")
+            return
+        finally:
+            progress.close()
+            progress.deleteLater()
 
-            data = {db_field: db_value}
-            logging.debug(f"Attempting to update company: ID={company_id}, Field={db_field}, Value={db_value}")
-            try:
-                success = self.firestore_service.update_company(collection, company_id, data)
-                if success:
-                    # Update the table
-                    col = self.get_headers_for_collection(collection).index(field)
-                    display_value = "Van" if db_value is True else "Nincs" if db_value is False else str(db_value)
-                    self.company_table.item(row, col).setText(display_value)
-                    success_count += 1
-                    logging.info(f"Successfully updated company: ID={company_id}")
-                else:
-                    fail_count += 1
-                    not_found_ids.append(company_id)
-                    logging.warning(f"Failed to update company: ID={company_id}")
-            except Exception as e:
-                logging.error(f"Error updating company {company_id}: {str(e)}")
-                fail_count += 1
-                not_found_ids.append(company_id)
+        if fail_count > 0:
+            QMessageBox.warning(self, "Bulk Edit Result",
+                                f"Updated {success_count} companies, failed to update {fail_count}.")
+        else:
+            QMessageBox.information(self, "Bulk Edit Result", f"Successfully updated {success_count} companies.")
+
+        self.load_companies()
 
-        # Show result message
-        if success_count > 0:
-            QMessageBox.information(self, "Bulk Edit Result",
-                                    f"Successfully updated {success_count} companies.")
+    def bulk_delete(self):
+        company_ids = []
+        for index in self.company_table.selectionModel().selectedRows():
+            item = self.company_table.item(index.row(), 1)  # Assuming ID is in column 1
+            if item:
+                company_ids.append(item.text())
 
-        if fail_count > 0:
-            error_msg = f"Failed to update {fail_count} companies.\n"
-            if not_found_ids:
-                error_msg += f"The following IDs were not found or couldn't be updated:\n{', '.join(not_found_ids)}"
-            QMessageBox.warning(self, "Bulk Edit Result", error_msg)
+        if not company_ids:
+            QMessageBox.warning(self, "No Selection", "Please select rows to delete.")
+            return
 
-        self.load_companies()  # Reload to ensure all data is up to date
+        reply = QMessageBox.question(
+            self, "Bulk Delete",
+            f"Delete {len(company_ids)} companies with their comments? A copy is saved locally for undo.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
 
-    def get_display_value(self, value):
-        if isinstance(value, bool):
-            return "Van" if value else "Nincs"
-        return str(value)
+        collection = self.get_current_collection()
+        self.apply_bulk_delete(collection,
+                               lambda: self.firestore_service.iter_company_snapshots_by_id(collection, company_ids),
+                               len(company_ids))
 
-    def get_field_mapping(self, collection):
-        common_fields = {
-            "Id": "ID",
-            "CompanyName": "Name",
-            "ProgramName": "Program",
-            "LastModified": "Last Modified"
-        }
-
-        if collection == "Company_Install":
-            specific_fields = {
-                "1": "Felderítés",
-                "2": "Telepítés",
-                "3": "Elosztó",
-                "4": "Áram",
-                "5": "Hálózat",
-                "6": "PTG",
-                "7": "Szoftver",
-                "8": "Param",
-                "9": "Helyszín",
-            }
-        elif collection == "Company_Demolition":
-            specific_fields = {
-                "1": "Bontás",
-                "2": "Felszerelés",
-                "3": "Bázis Leszerelés",
-            }
+    def bulk_delete_by_filter(self):
+        from src.bulk_filter_dialog import BulkFilterDialog
+        collection = self.get_current_collection()
+        festivals = [self.festival_combo.itemText(i) for i in range(1, self.festival_combo.count())]
+        filter_dialog = BulkFilterDialog(collection, self.firestore_service, festivals,
+                                         self.festival_combo.currentText(), self, title="Delete by Filter")
+        try:
+            if not filter_dialog.exec():
+                return
+
+            filters = filter_dialog.get_filters()
+            total = filter_dialog.matching_count
+            if total is None:
+                total = filter_dialog.update_preview()
+            if total == 0:
+                QMessageBox.information(self, "Bulk Delete", "No companies match the selected filter.")
+                return
+
+            count_text = str(total) if total is not None else "all matching"
+            reply = QMessageBox.question(
+                self, "Delete by Filter",
+                f"Delete {count_text} companies ({filter_dialog.get_filter_description()}) with their comments? "
+                f"A copy is saved locally for undo.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+            self.apply_bulk_delete(collection,
+                                   lambda: self.firestore_service.iter_company_snapshots(collection, filters), total)
+        finally:
+            filter_dialog.deleteLater()
+
+    def apply_bulk_delete(self, collection, snapshots, total=None):
+        """Delete the companies snapshots() yields, saving them for undo first, and drop them from the list."""
+        from src.delete_snapshot import DeleteSnapshot
+        progress = QProgressDialog("Deleting companies...", "Cancel", 0, total or 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_progress(done, failed):
+            progress.setValue(min(done + failed, progress.maximum()) if total else 0)
+            progress.setLabelText(f"Deleted {done} companies, {failed} failed...")
+            QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        delete_snapshot = DeleteSnapshot.create(collection, self.delete_snapshot_dir)
+        try:
+            deleted_ids, failed_ids = self.firestore_service.delete_companies(snapshots(), delete_snapshot,
+                                                                              on_progress)
+        except Exception as e:
+            logging.error(f"Error applying bulk delete: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to delete companies: {str(e)}\n"
+                                                f"Deleted documents were saved to {delete_snapshot.path}")
+            return
+        finally:
+            progress.close()
+            progress.deleteLater()
+            if delete_snapshot.count:
+                self.last_delete_snapshot = delete_snapshot
+                self.undo_delete_button.setEnabled(True)
+
+        if deleted_ids and collection == self.get_current_collection():
+            deleted = set(deleted_ids)
+            for company_id in deleted:
+                self.prefetcher.invalidate(collection, company_id)
+            # One rebuild instead of a reload or a row removal per company
+            self.show_companies([company for company in self.companies if company.get("Id") not in deleted],
+                                collection)
+
+        message = f"Deleted {len(deleted_ids)} companies."
+        if failed_ids:
+            message += f"\n{len(failed_ids)} could not be deleted."
+        message += f"\nA copy was saved to {delete_snapshot.path}; use Undo Delete to restore it."
+        if failed_ids:
+            QMessageBox.warning(self, "Bulk Delete Result", message)
         else:
-            logging.warning(f"Unknown collection: {collection}")
-            specific_fields = {}
+            QMessageBox.information(self, "Bulk Delete Result", message)
 
-        return {**common_fields, **specific_fields}
+    def undo_bulk_delete(self):
+        delete_snapshot = self.last_delete_snapshot
+        if delete_snapshot is None:
+            return
+        reply = QMessageBox.question(
+            self, "Undo Delete", f"Restore the {delete_snapshot.count} documents of the last bulk delete?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        progress = QProgressDialog("Restoring companies...", None, 0, delete_snapshot.count, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_progress(done):
+            progress.setValue(min(done, progress.maximum()))
+            QApplication.processEvents()
+
+        try:
+            restored = self.firestore_service.restore_documents(delete_snapshot.read(), on_progress)
+        except Exception as e:
+            logging.error(f"Error undoing bulk delete: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to restore companies: {str(e)}")
+            return
+        finally:
+            progress.close()
+            progress.deleteLater()
+
+        self.last_delete_snapshot = None
+        self.undo_delete_button.setEnabled(False)
+        QMessageBox.information(self, "Undo Delete", f"Restored {restored} documents.")
+        self.load_companies()
+
+    def open_dashboard(self):
+        from src.status_dashboard import StatusDashboard
+        festivals = [self.festival_combo.itemText(i) for i in range(1, self.festival_combo.count())]
+        dashboard = StatusDashboard(self.firestore_service, self.get_current_collection(), festivals,
+                                    self.festival_combo.currentText(), self)
+        try:
+            dashboard.exec()
+        finally:
+            dashboard.deleteLater()
+
+    def closeEvent(self, event):
+        # Unsent mutations stay in the local queue and are flushed on the next start
+        self.write_queue.flush()
+        self.prefetcher.close()
+        self.details_pool.clear()
+        if self.startup is not None:
+            self.startup.close()
+        # A session that never got live data keeps the older snapshot and its age
+        if self.session_snapshot is not None and self.live_data_shown and \
+                not self.server_search_checkbox.isChecked():
+            festivals = [self.festival_combo.itemText(i) for i in range(1, self.festival_combo.count())]
+            self.session_snapshot.save(self.get_current_collection(), self.festival_combo.currentText(), festivals,
+                                       self.companies)
+        super().closeEvent(event)
+
+    def get_field_mapping(self, collection):
+        """Return {db field: table header}."""
+        return dict(get_schema(collection).header_by_field)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -405,6 +1128,7 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     try:
+        from src.firestore_service import FirestoreService
         firestore_service = FirestoreService()
         window = MainWindow(firestore_service)
         window.show()
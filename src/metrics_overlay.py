@@ -0,0 +1,80 @@
+import logging
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QToolButton, QMenu, QFileDialog, QMessageBox
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+class MetricsOverlay(QWidget):
+    """Status-bar summary of the Firestore operations of this session, with export and reset."""
+
+    REFRESH_MS = 1000
+    TOOLTIP_ROWS = 12
+
+    def __init__(self, metrics, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel()
+        layout.addWidget(self.label)
+
+        self.menu_button = QToolButton()
+        self.menu_button.setText("Metrics")
+        self.menu_button.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        menu = QMenu(self.menu_button)
+        menu.addAction("Export as JSON...", lambda: self.export("JSON (*.json)"))
+        menu.addAction("Export as Prometheus text...", lambda: self.export("Prometheus text (*.prom)"))
+        menu.addSeparator()
+        menu.addAction("Reset", self.reset)
+        self.menu_button.setMenu(menu)
+        layout.addWidget(self.menu_button)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(self.REFRESH_MS)
+        self.refresh()
+
+    def refresh(self):
+        totals = self.metrics.totals()
+        text = (f"Firestore: {totals['reads']} reads, {totals['writes']} writes, "
+                f"{format_bytes(totals['bytes_read'] + totals['bytes_written'])}, p95 {totals['p95_ms']:.0f} ms")
+        if totals['errors']:
+            text += f", {totals['errors']} error(s)"
+        self.label.setText(text)
+        self.label.setToolTip(self.breakdown())
+
+    def breakdown(self):
+        # The operations that cost the most, with the view that made them
+        rows = sorted(self.metrics.snapshot().items(),
+                      key=lambda item: (item[1]['reads'] + item[1]['writes'], item[1]['latency_ms']['sum']),
+                      reverse=True)
+        lines = [f"{operation} from {view}: {stats['calls']} call(s), {stats['reads']} reads, "
+                 f"{stats['writes']} writes, p95 {stats['latency_ms']['p95']:.0f} ms"
+                 for (operation, view), stats in rows[:self.TOOLTIP_ROWS]]
+        return "\n".join(lines) or "No Firestore operations yet"
+
+    def export(self, file_filter):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Firestore metrics", "", file_filter)
+        if not path:
+            return
+        if file_filter.startswith("Prometheus") and not path.endswith((".prom", ".txt")):
+            path += ".prom"
+        try:
+            self.metrics.save(path)
+            logging.info(f"Firestore metrics exported to {path}")
+        except Exception as e:
+            logging.error(f"Error exporting Firestore metrics: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to export metrics: {str(e)}")
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
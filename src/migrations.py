@@ -0,0 +1,49 @@
+import argparse
+import logging
+import sys
+
+from src.firestore_service import FirestoreService
+
+COLLECTIONS = ["Company_Install", "Company_Demolition"]
+
+
+def migrate_comments(firestore_service, collections=None):
+    """One-off move of the legacy 'comments' arrays into the comments subcollection."""
+    for collection in collections or COLLECTIONS:
+        companies, comments = firestore_service.migrate_comments_to_subcollection(
+            collection,
+            lambda done, moved: logging.info(f"{collection}: {done} companies, {moved} comments migrated"))
+        print(f"{collection}: moved {comments} comments out of {companies} companies")
+
+
+def backfill_search_field(firestore_service, collections=None):
+    """Write the normalized company name used by server-side search to existing documents."""
+    for collection in collections or COLLECTIONS:
+        scanned, updated, failed = firestore_service.backfill_search_field(
+            collection,
+            lambda done, failed: logging.info(f"{collection}: {done} companies updated, {failed} failed"))
+        print(f"{collection}: updated {updated} of {scanned} companies, {failed} failed")
+
+
+MIGRATIONS = {
+    "comments": migrate_comments,
+    "search-field": backfill_search_field,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one-off Firestore data migrations")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--credentials", help="Path to the Firebase service account JSON file")
+    parser.add_argument("--collection", action="append", choices=COLLECTIONS,
+                        help="Limit the migration to a collection (can be repeated)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    firestore_service = FirestoreService(args.credentials)
+    MIGRATIONS[args.migration](firestore_service, args.collection)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
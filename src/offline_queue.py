@@ -0,0 +1,386 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.firestore_service import WriteConflictError
+
+
+def default_queue_path():
+    return os.path.join(os.path.expanduser("~"), ".pythonrunnerapp", "write_queue.sqlite3")
+
+
+class OfflineWriteQueue(QObject):
+    """Durable write-ahead queue for every mutation made from the UI.
+
+    Mutations are stored in a local SQLite file before anything is sent, are
+    announced through mutationQueued so views can apply them optimistically,
+    and are flushed to Firestore in their original order in batches of up to
+    MAX_BATCH_SIZE. When Firestore cannot be reached the flush is retried with
+    jittered exponential backoff, and pending mutations survive a restart.
+
+    Updates and deletes carry the update time of the record they were based
+    on as a precondition; a rejected precondition is reported as a conflict
+    instead of overwriting someone else's change. Updates to the same
+    document submitted before the next flush are merged into one write.
+    """
+
+    MAX_BATCH_SIZE = 500
+    MIN_BACKOFF_MS = 1000
+    MAX_BACKOFF_MS = 5 * 60 * 1000
+
+    mutationQueued = pyqtSignal(str, str, str, dict)  # op, collection, company_id, data
+    mutationCommitted = pyqtSignal(str, str, str, dict, str)  # op, collection, company_id, data, update_time
+    conflictDetected = pyqtSignal(str, str, str, dict, str)  # op, collection, company_id, data, error
+    writeSucceeded = pyqtSignal(str, str, dict)  # collection, company_id, changes (update ops)
+    writeFailed = pyqtSignal(str, str, dict, str)  # collection, company_id, changes, error (update ops)
+    pendingCountChanged = pyqtSignal(int)
+    flushFailed = pyqtSignal(str)
+    flushFinished = pyqtSignal(bool)  # False when the flush stopped on an error and needs a retry
+
+    def __init__(self, firestore_service, path=None, parent=None, delay_ms=400):
+        super().__init__(parent)
+        self.firestore_service = firestore_service
+        self.path = path or default_queue_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db_lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mutations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                company_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                base_update_time TEXT,
+                in_flight INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )""")
+        # Merging on enqueue and moving preconditions on commit look up a document's mutations
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS mutations_by_document ON mutations (collection, company_id, seq)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conflicts (
+                seq INTEGER PRIMARY KEY,
+                op TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                company_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                error TEXT,
+                detected_at REAL NOT NULL
+            )""")
+        # Anything marked in flight by a previous session never got confirmed
+        self._conn.execute("UPDATE mutations SET in_flight = 0")
+        self._conn.commit()
+
+        self.known_update_times = {}
+        self.retry_attempt = 0
+        self._flushing = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.start_flush)
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.start_flush)
+        # Emitted from the flush thread, handled on the thread that owns the timers
+        self.flushFinished.connect(self.on_flush_finished)
+
+        if self.pending_count():
+            logging.info(f"Write queue has {self.pending_count()} pending mutations from a previous session")
+            self.timer.start()
+
+    # Encoding
+
+    def encode_data(self, data):
+        server_timestamp = self.firestore_service.server_timestamp()
+
+        def encode(value):
+            if value is server_timestamp:
+                return {"$serverTimestamp": True}
+            if isinstance(value, datetime):
+                return {"$datetime": value.isoformat()}
+            if isinstance(value, dict):
+                return {key: encode(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [encode(item) for item in value]
+            return value
+
+        return json.dumps(encode(data), ensure_ascii=False)
+
+    def decode_data(self, text):
+        def decode(value):
+            if isinstance(value, dict):
+                if value.get("$serverTimestamp") is True and len(value) == 1:
+                    # Looked up only here: pending mutations are decoded at startup, before the SDK is loaded
+                    return self.firestore_service.server_timestamp()
+                if "$datetime" in value and len(value) == 1:
+                    return datetime.fromisoformat(value["$datetime"])
+                return {key: decode(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [decode(item) for item in value]
+            return value
+
+        return decode(json.loads(text))
+
+    # Enqueueing
+
+    def enqueue(self, op, collection, company_id, data=None, base_update_time=None):
+        data = data or {}
+        key = (collection, company_id)
+        # Our own committed writes are newer than whatever the caller loaded earlier
+        known = self.known_update_times.get(key)
+        if known and (base_update_time is None or known > base_update_time):
+            base_update_time = known
+        if op in ("create", "comment"):
+            base_update_time = None
+
+        with self._db_lock:
+            merged = False
+            if op == "update":
+                # Merge into the document's last queued update if it has not been sent yet
+                row = self._conn.execute(
+                    "SELECT seq, op, data, in_flight FROM mutations WHERE collection = ? AND company_id = ? "
+                    "ORDER BY seq DESC LIMIT 1", key).fetchone()
+                if row and row[1] == "update" and not row[3]:
+                    existing = self.decode_data(row[2])
+                    existing.update(data)
+                    self._conn.execute("UPDATE mutations SET data = ? WHERE seq = ?",
+                                       (self.encode_data(existing), row[0]))
+                    merged = True
+            if not merged:
+                self._conn.execute(
+                    "INSERT INTO mutations (op, collection, company_id, data, base_update_time, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (op, collection, company_id, self.encode_data(data), base_update_time, time.time()))
+            self._conn.commit()
+
+        logging.debug(f"Queued {op} for {collection}/{company_id}: {data}")
+        self.mutationQueued.emit(op, collection, company_id, data)
+        self.pendingCountChanged.emit(self.pending_count())
+        self.timer.start()
+
+    def enqueue_many(self, op, collection, items, base_update_times=None):
+        """Queue one mutation per {company_id: data} item in a single local transaction."""
+        base_update_times = base_update_times or {}
+        with self._db_lock:
+            now = time.time()
+            rows = []
+            for company_id, data in items.items():
+                base_update_time = base_update_times.get(company_id)
+                known = self.known_update_times.get((collection, company_id))
+                if known and (base_update_time is None or known > base_update_time):
+                    base_update_time = known
+                rows.append((op, collection, company_id, self.encode_data(data), base_update_time, now))
+            self._conn.executemany(
+                "INSERT INTO mutations (op, collection, company_id, data, base_update_time, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+        for company_id, data in items.items():
+            self.mutationQueued.emit(op, collection, company_id, data)
+        self.pendingCountChanged.emit(self.pending_count())
+        self.timer.start()
+
+    def submit(self, collection, company_id, changes, base_update_time=None):
+        if changes:
+            self.enqueue("update", collection, company_id, changes, base_update_time)
+
+    def add_company(self, collection, data):
+        self.enqueue("create", collection, data["Id"], data)
+        return data["Id"]
+
+    def delete_company(self, collection, company_id, base_update_time=None):
+        self.enqueue("delete", collection, company_id, {}, base_update_time)
+
+    def add_comment(self, collection, company_id, comment_data):
+        # The comment ID is fixed when queued so a retried flush cannot add it twice
+        comment = dict(comment_data)
+        comment.setdefault("Id", self.firestore_service.generate_id())
+        # Written while offline, so record when it was made rather than when it reached the server
+        comment.setdefault("CreatedAt", datetime.now(timezone.utc))
+        self.enqueue("comment", collection, company_id, comment)
+        return comment["Id"]
+
+    # Inspection
+
+    def pending_count(self):
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM mutations").fetchone()[0]
+
+    def has_pending(self, collection=None, company_id=None):
+        with self._db_lock:
+            if collection is None:
+                row = self._conn.execute("SELECT 1 FROM mutations LIMIT 1").fetchone()
+            else:
+                row = self._conn.execute("SELECT 1 FROM mutations WHERE collection = ? AND company_id = ? LIMIT 1",
+                                         (collection, company_id)).fetchone()
+        return row is not None
+
+    def pending_mutations(self, collection=None):
+        with self._db_lock:
+            if collection is None:
+                rows = self._conn.execute(
+                    "SELECT op, collection, company_id, data FROM mutations ORDER BY seq").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT op, collection, company_id, data FROM mutations WHERE collection = ? ORDER BY seq",
+                    (collection,)).fetchall()
+        return [(op, coll, company_id, self.decode_data(data)) for op, coll, company_id, data in rows]
+
+    def conflicts(self):
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT op, collection, company_id, data, error FROM conflicts ORDER BY seq").fetchall()
+        return [(op, coll, company_id, self.decode_data(data), error) for op, coll, company_id, data, error in rows]
+
+    # Flushing
+
+    def flush(self, collection=None, company_id=None):
+        """Start sending pending mutations now.
+
+        The queue is always flushed in order, so asking for one document
+        flushes everything queued before it as well.
+        """
+        self.timer.stop()
+        self.start_flush()
+
+    def start_flush(self):
+        if self._flushing or not self.has_pending():
+            return
+        self._flushing = True
+        threading.Thread(target=self._flush_worker, name="write-queue-flush", daemon=True).start()
+
+    def on_flush_finished(self, ok):
+        if not ok:
+            self.schedule_retry()
+        elif self.has_pending():
+            # Mutations queued while the last batch was being committed
+            self.timer.start()
+
+    def schedule_retry(self):
+        delay = min(self.MAX_BACKOFF_MS, self.MIN_BACKOFF_MS * (2 ** self.retry_attempt))
+        delay = int(delay * random.uniform(0.5, 1.0))
+        self.retry_attempt += 1
+        logging.info(f"Retrying write queue flush in {delay} ms (attempt {self.retry_attempt})")
+        self.retry_timer.start(delay)
+
+    def _take_batch(self):
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT seq, op, collection, company_id, data, base_update_time FROM mutations "
+                "ORDER BY seq LIMIT ?", (self.MAX_BATCH_SIZE,)).fetchall()
+            self._conn.executemany("UPDATE mutations SET in_flight = 1 WHERE seq = ?", [(row[0],) for row in rows])
+            self._conn.commit()
+        batch = []
+        seen = set()
+        for seq, op, collection, company_id, data, queued_base_update_time in rows:
+            key = (collection, company_id)
+            # The batch is atomic and ordered, only the first write to a document needs the precondition
+            base_update_time = None if key in seen else queued_base_update_time
+            seen.add(key)
+            batch.append({"seq": seq, "op": op, "collection": collection, "company_id": company_id,
+                          "data": self.decode_data(data), "base_update_time": base_update_time,
+                          "queued_base_update_time": queued_base_update_time})
+        return batch
+
+    def _alone(self, mutation):
+        """The mutation with its own precondition back, for committing it outside its batch."""
+        base_update_time = mutation["queued_base_update_time"]
+        known = self.known_update_times.get((mutation["collection"], mutation["company_id"]))
+        # Moved past our own writes committed before it, but not past a conflicting one
+        if base_update_time and known and known > base_update_time:
+            base_update_time = known
+        return dict(mutation, base_update_time=base_update_time)
+
+    def _release(self, mutations):
+        with self._db_lock:
+            self._conn.executemany("UPDATE mutations SET in_flight = 0 WHERE seq = ?",
+                                   [(mutation["seq"],) for mutation in mutations])
+            self._conn.commit()
+
+    def _mark_committed(self, mutations, update_times):
+        with self._db_lock:
+            self._conn.executemany("DELETE FROM mutations WHERE seq = ?", [(mutation["seq"],) for mutation in mutations])
+            latest = {}
+            for mutation, update_time in zip(mutations, update_times):
+                if update_time:
+                    latest[(mutation["collection"], mutation["company_id"])] = update_time
+            self.known_update_times.update(latest)
+            # Later writes to the same documents were based on the versions we just replaced
+            self._conn.executemany(
+                "UPDATE mutations SET base_update_time = ? "
+                "WHERE collection = ? AND company_id = ? AND base_update_time IS NOT NULL",
+                [(update_time, *key) for key, update_time in latest.items()])
+            self._conn.commit()
+        for mutation, update_time in zip(mutations, update_times):
+            self.mutationCommitted.emit(mutation["op"], mutation["collection"], mutation["company_id"],
+                                        mutation["data"], update_time or "")
+            if mutation["op"] == "update":
+                self.writeSucceeded.emit(mutation["collection"], mutation["company_id"], mutation["data"])
+
+    def _mark_conflict(self, mutation, error):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM mutations WHERE seq = ?", (mutation["seq"],))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conflicts (seq, op, collection, company_id, data, error, detected_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (mutation["seq"], mutation["op"], mutation["collection"], mutation["company_id"],
+                 self.encode_data(mutation["data"]), error, time.time()))
+            self._conn.commit()
+        logging.warning(f"Conflict on {mutation['op']} of {mutation['collection']}/{mutation['company_id']}: {error}")
+        self.conflictDetected.emit(mutation["op"], mutation["collection"], mutation["company_id"],
+                                   mutation["data"], error)
+        if mutation["op"] == "update":
+            self.writeFailed.emit(mutation["collection"], mutation["company_id"], mutation["data"],
+                                  f"The company was changed by someone else: {error}")
+
+    def _flush_worker(self):
+        ok = True
+        try:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                try:
+                    update_times = self.firestore_service.commit_mutations(batch)
+                    self._mark_committed(batch, update_times)
+                except WriteConflictError:
+                    # Find the offending mutations one by one, keeping the original order
+                    for index, mutation in enumerate(batch):
+                        try:
+                            self._mark_committed([mutation],
+                                                 self.firestore_service.commit_mutations([self._alone(mutation)]))
+                        except WriteConflictError as e:
+                            self._mark_conflict(mutation, str(e))
+                        except Exception:
+                            self._release(batch[index:])
+                            raise
+                self.retry_attempt = 0
+                self.pendingCountChanged.emit(self.pending_count())
+        except Exception as e:
+            logging.error(f"Error flushing write queue, will retry: {e}")
+            with self._db_lock:
+                self._conn.execute("UPDATE mutations SET in_flight = 0")
+                self._conn.commit()
+            self.flushFailed.emit(str(e))
+            ok = False
+        finally:
+            self._flushing = False
+            self.flushFinished.emit(ok)
+
+    def close(self):
+        self.timer.stop()
+        self.retry_timer.stop()
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,112 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QLabel, QTableWidget,
+                             QTableWidgetItem, QAbstractItemView)
+
+
+class PivotView(QDialog):
+    """Cross tabulations and checklist completion over the loaded companies.
+
+    All numbers come from a CompanyFrame, which keeps them up to date as
+    records change, so refreshing the view is cheap.
+    """
+
+    COUNTS_MODE = "Counts"
+    COMPLETION_MODE = "Checklist completion"
+
+    def __init__(self, company_frame, field_mapping, flag_fields, parent=None):
+        super().__init__(parent)
+        self.company_frame = company_frame
+        self.field_mapping = field_mapping  # db field -> display name
+        self.flag_fields = flag_fields
+        self.setWindowTitle("Pivot")
+        self.resize(800, 500)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems([self.COUNTS_MODE, self.COMPLETION_MODE])
+        controls.addWidget(self.mode_combo)
+
+        controls.addWidget(QLabel("Rows:"))
+        self.row_combo = QComboBox()
+        controls.addWidget(self.row_combo)
+
+        self.column_label = QLabel("Columns:")
+        controls.addWidget(self.column_label)
+        self.column_combo = QComboBox()
+        controls.addWidget(self.column_combo)
+
+        for field in self.company_frame.fields:
+            self.row_combo.addItem(self.field_mapping.get(field, field), field)
+            self.column_combo.addItem(self.field_mapping.get(field, field), field)
+        self.row_combo.setCurrentIndex(max(self.row_combo.findData("ProgramName"), 0))
+        self.column_combo.setCurrentIndex(max(self.column_combo.findData("2"), 0))
+
+        self.export_button = QPushButton("Export")
+        self.export_button.clicked.connect(self.export_to_excel)
+        controls.addWidget(self.export_button)
+        layout.addLayout(controls)
+
+        self.pivot_table = QTableWidget()
+        self.pivot_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.pivot_table)
+
+        self.mode_combo.currentTextChanged.connect(self.refresh)
+        self.row_combo.currentIndexChanged.connect(self.refresh)
+        self.column_combo.currentIndexChanged.connect(self.refresh)
+
+    def set_company_frame(self, company_frame):
+        self.company_frame = company_frame
+        self.refresh()
+
+    def compute(self):
+        """Return (row_labels, col_labels, values, percent) for the current selection."""
+        row_field = self.row_combo.currentData()
+        if self.mode_combo.currentText() == self.COMPLETION_MODE:
+            rows, flags, values = self.company_frame.completion(self.flag_fields, by=row_field)
+            return rows, [self.field_mapping.get(flag, flag) for flag in flags], values, True
+        rows, cols, values = self.company_frame.pivot(row_field, self.column_combo.currentData())
+        return rows, cols, values, False
+
+    def display_value(self, value):
+        if isinstance(value, bool):
+            return "Van" if value else "Nincs"
+        return str(value)
+
+    def refresh(self):
+        completion = self.mode_combo.currentText() == self.COMPLETION_MODE
+        self.column_label.setVisible(not completion)
+        self.column_combo.setVisible(not completion)
+
+        rows, cols, values, percent = self.compute()
+        show_totals = not percent
+        self.pivot_table.setRowCount(len(rows) + (1 if show_totals else 0))
+        self.pivot_table.setColumnCount(len(cols) + (1 if show_totals else 0))
+        self.pivot_table.setHorizontalHeaderLabels([self.display_value(col) for col in cols] +
+                                                   (["Total"] if show_totals else []))
+        self.pivot_table.setVerticalHeaderLabels([self.display_value(row) for row in rows] +
+                                                 (["Total"] if show_totals else []))
+
+        for r in range(len(rows)):
+            for c in range(len(cols)):
+                text = f"{values[r, c]:.0%}" if percent else str(int(values[r, c]))
+                self.pivot_table.setItem(r, c, QTableWidgetItem(text))
+        if show_totals:
+            row_totals = values.sum(axis=1)
+            col_totals = values.sum(axis=0)
+            for r, total in enumerate(row_totals):
+                self.pivot_table.setItem(r, len(cols), QTableWidgetItem(str(int(total))))
+            for c, total in enumerate(col_totals):
+                self.pivot_table.setItem(len(rows), c, QTableWidgetItem(str(int(total))))
+            self.pivot_table.setItem(len(rows), len(cols), QTableWidgetItem(str(int(values.sum()))))
+        self.pivot_table.resizeColumnsToContents()
+
+    def export_to_excel(self):
+        from src.excel_exporter import ExcelExporter
+        rows, cols, values, percent = self.compute()
+        ExcelExporter.export_pivot_to_excel(self, self.mode_combo.currentText(), self.row_combo.currentText(),
+                                            [self.display_value(row) for row in rows],
+                                            [self.display_value(col) for col in cols], values, percent)
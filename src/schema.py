@@ -0,0 +1,192 @@
+import logging
+import unicodedata
+
+BOOLEAN = "bool"
+OPTION = "option"
+TEXT = "text"
+NUMBER = "number"
+TIMESTAMP = "timestamp"
+
+FLAG_TRUE = "Van"
+FLAG_FALSE = "Nincs"
+
+# Stored copy of CompanyName in search form, for prefix range queries on the server
+SEARCH_FIELD = "CompanyNameSearch"
+
+# Everything a boolean field may hold in Firestore or in a form, and its stored value
+_FLAG_VALUES = {True: True, False: False, FLAG_TRUE: True, FLAG_FALSE: False}
+
+
+class Field:
+    def __init__(self, name, header, kind=TEXT, options=(), editable=True, derived=False, facet=None):
+        self.name = name  # Firestore field, or key of a computed value for derived fields
+        self.header = header  # Table header and label everywhere in the UI
+        self.kind = kind
+        self.options = list(options)
+        self.editable = editable and not derived
+        self.derived = derived  # Computed by src.derived_columns, never stored
+        # Filtered by a drop-down of its values rather than free text
+        self.facet = kind in (OPTION, BOOLEAN) if facet is None else facet
+
+    def __repr__(self):
+        return f"Field({self.name!r}, {self.header!r}, {self.kind!r})"
+
+
+def normalize_search_text(text):
+    """Lowercase, accent-free form of text with single spaces, e.g. "Árvíztűrő  Kft" -> "arvizturo kft"."""
+    decomposed = unicodedata.normalize("NFKD", "" if text is None else str(text))
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+
+
+def _decode_text(value):
+    return "" if value is None else str(value)
+
+
+def _decode_flag(value):
+    return FLAG_TRUE if _FLAG_VALUES.get(value) is True else FLAG_FALSE
+
+
+def _encode_flag(value):
+    return _FLAG_VALUES.get(value, value)
+
+
+def _identity(value):
+    return value
+
+
+class CollectionSchema:
+    """Fields of one collection, compiled once into lookup tables.
+
+    Table headers, Firestore field names and value conversions all come from
+    here, so a cell is one dict lookup and one decoder call instead of a
+    mapping rebuilt and searched per cell.
+    """
+
+    SELECT_HEADER = "Select"
+
+    def __init__(self, name, fields, status_field):
+        self.name = name
+        self.fields = list(fields)
+        self.status_field = status_field
+
+        self.by_name = {field.name: field for field in self.fields}
+        self.by_header = {field.header: field for field in self.fields}
+        self.header_by_field = {field.name: field.header for field in self.fields}
+        self.field_by_header = {field.header: field.name for field in self.fields}
+        self.headers = [self.SELECT_HEADER] + [field.header for field in self.fields]
+        self.column_fields = [None] + [field.name for field in self.fields]
+
+        self.boolean_fields = [field.name for field in self.fields if field.kind == BOOLEAN]
+        self.option_fields = {field.name: field.options for field in self.fields if field.kind == OPTION}
+        self.editable_fields = [field.name for field in self.fields if field.editable]
+        self.stored_fields = [field.name for field in self.fields if not field.derived]
+        self.derived_fields = [field.name for field in self.fields if field.derived]
+        self.facet_headers = [field.header for field in self.fields if field.facet]
+        self.numeric_columns = {column for column, field in enumerate(self.column_fields)
+                                if field is not None and self.by_name[field].kind == NUMBER}
+        # Table column -> field of the status and flag cells that can be changed in place
+        self.inline_columns = {column: field for column, field in enumerate(self.column_fields)
+                               if field is not None and self.by_name[field].editable
+                               and self.by_name[field].kind in (OPTION, BOOLEAN)}
+
+        self.decoders = {field.name: _decode_flag if field.kind == BOOLEAN else _decode_text
+                         for field in self.fields}
+        self.encoders = {field.name: _encode_flag if field.kind == BOOLEAN else _identity
+                         for field in self.fields}
+        self._row_decoders = [(None, None)] + [(field.name, self.decoders[field.name]) for field in self.fields]
+
+    # Decoding: stored value -> display text
+
+    def display_value(self, field, value):
+        return self.decoders.get(field, _decode_text)(value)
+
+    def display_row(self, record):
+        """Display text of every table column, the Select column included."""
+        get = record.get
+        return ["" if field is None else decode(get(field)) for field, decode in self._row_decoders]
+
+    def display_record(self, record):
+        """Copy of record with boolean fields shown as Van/Nincs, as the detail dialogs expect."""
+        result = dict(record)
+        for field in self.boolean_fields:
+            if field in result:
+                result[field] = _decode_flag(result[field])
+        return result
+
+    def choices(self, field):
+        """Display values a status or flag field can be set to."""
+        if field in self.boolean_fields:
+            return [FLAG_TRUE, FLAG_FALSE]
+        return list(self.option_fields.get(field, ()))
+
+    def is_set(self, record, field):
+        return _FLAG_VALUES.get(record.get(field)) is True
+
+    # Encoding: form or display value -> stored value
+
+    def encode_value(self, field, value):
+        return self.encoders.get(field, _identity)(value)
+
+    def encode_record(self, data):
+        encoders = self.encoders
+        return {field: encoders.get(field, _identity)(value) for field, value in data.items()}
+
+    def stored_values(self, field, value):
+        """Every value Firestore may hold for value: older documents keep flags as "Van"/"Nincs"."""
+        value = self.encode_value(field, value)
+        if field in self.boolean_fields and isinstance(value, bool):
+            return [value, FLAG_TRUE if value else FLAG_FALSE]
+        return [value]
+
+    def parse_display_value(self, field, text):
+        """Turn text typed or picked in the UI back into the stored value."""
+        if field in self.boolean_fields:
+            return _FLAG_VALUES.get(text, text)
+        return text
+
+
+_COMMON_HEAD = [
+    Field("Id", "ID", editable=False),
+    Field("CompanyName", "Name"),
+    Field("ProgramName", "Program", facet=True),
+]
+_COMMON_TAIL = [
+    Field("LastModified", "Last Modified", TIMESTAMP, editable=False),
+]
+
+SCHEMAS = {
+    "Company_Install": CollectionSchema("Company_Install", _COMMON_HEAD + [
+        Field("1", "Felderítés", OPTION, ["TELEPÍTHETŐ", "KIRAKHATÓ", "NEM KIRAKHATÓ"]),
+        Field("2", "Telepítés", OPTION,
+              ["KIADVA", "KIHELYEZESRE_VAR", "KIRAKVA", "HELYSZINEN_TESZTELVE", "STATUSZ_NELKUL"]),
+        Field("3", "Elosztó", BOOLEAN),
+        Field("4", "Áram", BOOLEAN),
+        Field("5", "Hálózat", BOOLEAN),
+        Field("6", "PTG", BOOLEAN),
+        Field("7", "Szoftver", BOOLEAN),
+        Field("8", "Param", BOOLEAN),
+        Field("9", "Helyszín", BOOLEAN),
+        Field("_readiness", "Readiness", NUMBER, derived=True),
+        Field("_state", "State", OPTION, ["ready", "blocked", "done"], derived=True),
+        Field("_blockedReason", "Blocked Reason", derived=True, facet=True),
+    ] + _COMMON_TAIL, status_field="2"),
+    "Company_Demolition": CollectionSchema("Company_Demolition", _COMMON_HEAD + [
+        Field("1", "Bontás", OPTION, ["BONTHATO", "MEG_NYITVA", "NEM_HOZZAFERHETO"]),
+        Field("2", "Felszerelés", OPTION, ["CSOMAGOLVA", "SZALLITASRA_VAR", "ELSZALLITVA", "NINCS_STATUSZ"]),
+        Field("3", "Bázis Leszerelés", BOOLEAN),
+    ] + _COMMON_TAIL, status_field="2"),
+}
+
+# Display names across all collections, for widgets that pick an editor by header
+BOOLEAN_HEADERS = [schema.header_by_field[field] for schema in SCHEMAS.values() for field in schema.boolean_fields]
+OPTION_HEADERS = {schema.header_by_field[field]: options
+                  for schema in SCHEMAS.values() for field, options in schema.option_fields.items()
+                  if not schema.by_name[field].derived}
+
+
+def get_schema(collection):
+    schema = SCHEMAS.get(collection)
+    if schema is None:
+        logging.warning(f"Unknown collection: {collection}")
+        schema = CollectionSchema(collection, _COMMON_HEAD + _COMMON_TAIL, status_field=None)
+    return schema
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+
+def default_snapshot_path():
+    return os.path.join(os.path.expanduser("~"), ".pythonrunnerapp", "session_snapshot.json")
+
+
+class SessionSnapshot:
+    """The company list of the last session, kept on local disk.
+
+    At startup the window paints it right away and replaces it once the
+    live data has arrived (stale-while-revalidate), so the list is usable
+    before Firestore has even been connected. It is written when the
+    window closes.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path or default_snapshot_path()
+
+    def load(self):
+        """Return {"collection", "festival", "festivals", "companies", "saved_at"}, or None."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f, object_hook=self._decode)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable session snapshot {self.path}: {e}")
+            return None
+        if data.get("version") != self.VERSION:
+            return None
+        return data
+
+    def save(self, collection, festival, festivals, companies):
+        data = {
+            "version": self.VERSION,
+            "saved_at": time.time(),
+            "collection": collection,
+            "festival": festival,
+            "festivals": list(festivals),
+            "companies": companies,
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Written next to the old one and swapped in, so a crash never leaves half a file
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=self._encode)
+            os.replace(temp_path, self.path)
+            logging.info(f"Saved session snapshot of {len(companies)} companies")
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not save session snapshot: {e}")
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        # Anything else Firestore hands back (references, geo points) is kept as text
+        return str(value)
+
+    @staticmethod
+    def _decode(value):
+        if len(value) == 1 and "$datetime" in value:
+            return datetime.fromisoformat(value["$datetime"])
+        return value
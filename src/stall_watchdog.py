@@ -0,0 +1,229 @@
+import functools
+import inspect
+import io
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from PyQt6.QtCore import QTimer
+
+# Set to a threshold in milliseconds to turn the watchdog on, e.g. RUNNERAPP_STALL_MS=200
+STALL_ENV = "RUNNERAPP_STALL_MS"
+# Comma-separated slots to run under cProfile, e.g. RUNNERAPP_PROFILE_SLOTS=load_companies,apply_filters
+PROFILE_ENV = "RUNNERAPP_PROFILE_SLOTS"
+
+# MainWindow handlers whose time is attributed in the report
+WATCHED_SLOTS = (
+    "load_companies", "show_companies", "on_companies_loaded", "on_festivals_loaded", "apply_filters",
+    "filter_companies", "on_header_clicked", "on_collection_changed", "update_filter_inputs",
+    "refresh_facet_counts", "open_company_details", "navigate_company_details", "on_document_loaded",
+    "add_company", "on_cell_value_chosen", "apply_local_mutation", "export_to_csv", "bulk_edit",
+    "bulk_edit_by_filter", "bulk_delete", "bulk_delete_by_filter", "undo_bulk_delete", "open_dashboard",
+    "open_pivot_view",
+)
+
+
+def default_report_dir():
+    return os.path.join(os.path.expanduser("~"), ".pythonrunnerapp")
+
+
+class SlotStats:
+    def __init__(self):
+        self.calls = 0
+        self.blocked = 0.0
+        self.max_blocked = 0.0
+        self.stalls = 0
+
+
+class StallWatchdog:
+    """Opt-in detector of UI-thread stalls, with time per slot and optional cProfile captures.
+
+    A timer on the UI thread beats every HEARTBEAT_MS; a watcher thread
+    notices when the beats stop for longer than the threshold and samples
+    the UI thread's stack until they resume. Each stall is written to a
+    rotating report with the slots that were running and the stacks seen
+    most often. Watched slots are timed on every call; time spent in a
+    nested event loop (a modal dialog's exec()) is not counted as blocked.
+    """
+
+    HEARTBEAT_MS = 50
+    SUMMARY_INTERVAL = 300  # seconds between slot summaries in the report
+    REPORT_MAX_BYTES = 1024 * 1024
+    REPORT_BACKUPS = 3
+    STACK_LIMIT = 30
+    PROFILE_ROWS = 25
+
+    def __init__(self, threshold_ms=200, report_dir=None, profile_slots=()):
+        self.threshold = threshold_ms / 1000
+        self.report_dir = report_dir or default_report_dir()
+        self.profile_slots = set(profile_slots)
+        self.slot_stats = {}
+        self.active_slots = []  # [name, started, beats at start] of the slots running on the UI thread
+        self.last_beat = time.monotonic()
+        self.beats = 0
+        self.stall_count = 0
+        self.stalled_seconds = 0.0
+        self.profile_count = 0
+        self._profiling = False
+        self._main_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._watcher = None
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        self.report_path = os.path.join(self.report_dir, "stall_report.log")
+        self.report = logging.getLogger("stall_watchdog")
+        self.report.setLevel(logging.INFO)
+        self.report.propagate = False
+        if not self.report.handlers:
+            handler = logging.handlers.RotatingFileHandler(self.report_path, maxBytes=self.REPORT_MAX_BYTES,
+                                                           backupCount=self.REPORT_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            self.report.addHandler(handler)
+
+    @classmethod
+    def from_environment(cls):
+        """Return a watchdog configured from the environment, or None when it is not enabled."""
+        threshold = os.environ.get(STALL_ENV)
+        if not threshold:
+            return None
+        try:
+            threshold_ms = float(threshold)
+        except ValueError:
+            logging.error(f"Ignoring {STALL_ENV}={threshold!r}: not a number of milliseconds")
+            return None
+        profile_slots = [name.strip() for name in os.environ.get(PROFILE_ENV, "").split(",") if name.strip()]
+        return cls(threshold_ms, profile_slots=profile_slots)
+
+    def instrument(self, cls, slot_names=WATCHED_SLOTS):
+        """Time the named methods of cls; call before its instances connect their signals."""
+        for name in slot_names:
+            function = getattr(cls, name, None)
+            if function is None or hasattr(function, "__watched__"):
+                continue
+            setattr(cls, name, self.watched_slot(name, function))
+
+    def watched_slot(self, name, function):
+        parameters = list(inspect.signature(function).parameters.values())
+        takes_varargs = any(p.kind == p.VAR_POSITIONAL for p in parameters)
+        max_args = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+        @functools.wraps(function)
+        def slot(*args, **kwargs):
+            # PyQt passes every signal argument to a *args callable, the wrapped slot may take fewer
+            if not takes_varargs:
+                args = args[:max_args]
+            if threading.get_ident() != self._main_thread_id:
+                return function(*args, **kwargs)
+            entry = [name, time.perf_counter(), self.beats]
+            self.active_slots.append(entry)
+            try:
+                if name in self.profile_slots and not self._profiling:
+                    return self.profile_call(name, function, args, kwargs)
+                return function(*args, **kwargs)
+            finally:
+                self.active_slots.remove(entry)
+                self.record_slot(name, time.perf_counter() - entry[1], self.beats - entry[2])
+
+        slot.__watched__ = True
+        return slot
+
+    def record_slot(self, name, elapsed, nested_beats):
+        # Every heartbeat during the call means the event loop was running, not blocked
+        blocked = max(elapsed - nested_beats * self.HEARTBEAT_MS / 1000, 0.0)
+        stats = self.slot_stats.get(name)
+        if stats is None:
+            stats = self.slot_stats[name] = SlotStats()
+        stats.calls += 1
+        stats.blocked += blocked
+        stats.max_blocked = max(stats.max_blocked, blocked)
+        if blocked > self.threshold:
+            stats.stalls += 1
+
+    def profile_call(self, name, function, args, kwargs):
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        self._profiling = True
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self._profiling = False
+            self.profile_count += 1
+            path = os.path.join(self.report_dir,
+                                f"profile-{name}-{time.strftime('%Y%m%d-%H%M%S')}-{self.profile_count}.prof")
+            profiler.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(self.PROFILE_ROWS)
+            self.report.info(f"Profile of {name} (saved to {path}):\n{text.getvalue()}")
+
+    def start(self):
+        self._heartbeat = QTimer()
+        self._heartbeat.timeout.connect(self.beat)
+        self._heartbeat.start(self.HEARTBEAT_MS)
+        self._watcher = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+        self._watcher.start()
+        self.report.info(f"Stall watchdog started, threshold {self.threshold * 1000:.0f} ms")
+        logging.info(f"Stall watchdog reporting stalls over {self.threshold * 1000:.0f} ms to {self.report_path}")
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+        self.beats += 1
+
+    def watch(self):
+        interval = self.HEARTBEAT_MS / 1000
+        next_summary = time.monotonic() + self.SUMMARY_INTERVAL
+        while not self._stop.wait(interval):
+            stalled_since = self.last_beat
+            if time.monotonic() - stalled_since > self.threshold + interval:
+                self.capture_stall(stalled_since)
+            if time.monotonic() >= next_summary:
+                self.write_summary()
+                next_summary = time.monotonic() + self.SUMMARY_INTERVAL
+
+    def capture_stall(self, stalled_since):
+        """Sample the UI thread's stack until the heartbeat resumes, then report the stall."""
+        slots = " > ".join(entry[0] for entry in list(self.active_slots)) or "(no watched slot)"
+        stacks = Counter()
+        first_stack = None
+        while self.last_beat == stalled_since and not self._stop.is_set():
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is not None:
+                stack = "".join(traceback.format_stack(frame, limit=self.STACK_LIMIT))
+                stacks[stack] += 1
+                first_stack = first_stack or stack
+            del frame
+            time.sleep(self.HEARTBEAT_MS / 1000)
+        duration = (time.monotonic() if self._stop.is_set() else self.last_beat) - stalled_since
+        self.stall_count += 1
+        self.stalled_seconds += duration
+        logging.warning(f"UI thread stalled for {duration * 1000:.0f} ms in {slots}")
+        lines = [f"Stall #{self.stall_count}: {duration * 1000:.0f} ms, slots: {slots}, "
+                 f"{sum(stacks.values())} stack sample(s)"]
+        for stack, count in stacks.most_common(3):
+            lines.append(f"--- {count} sample(s){' (first)' if stack == first_stack else ''}:\n{stack}")
+        self.report.info("\n".join(lines))
+
+    def summary(self):
+        rows = sorted(list(self.slot_stats.items()), key=lambda item: item[1].blocked, reverse=True)
+        lines = [f"{'slot':<28} {'calls':>6} {'blocked ms':>11} {'max ms':>8} {'stalls':>6}"]
+        for name, stats in rows:
+            lines.append(f"{name:<28} {stats.calls:>6} {stats.blocked * 1000:>11.0f} "
+                         f"{stats.max_blocked * 1000:>8.0f} {stats.stalls:>6}")
+        return "\n".join(lines)
+
+    def write_summary(self):
+        self.report.info(f"Slot summary, {self.stall_count} stall(s) so far:\n{self.summary()}")
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+        self.write_summary()
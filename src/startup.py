@@ -0,0 +1,81 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class StartupTimer:
+    """Milliseconds from process start to each startup milestone."""
+
+    def __init__(self, started_at=None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.timings = {}
+
+    def mark(self, name):
+        if name in self.timings:
+            return self.timings[name]
+        elapsed = (time.perf_counter() - self.started_at) * 1000
+        self.timings[name] = elapsed
+        logging.info(f"Startup: {name} after {elapsed:.0f} ms")
+        return elapsed
+
+    def report(self):
+        """One JSON line with every milestone, for comparing startups in the log."""
+        summary = json.dumps({name: round(elapsed) for name, elapsed in self.timings.items()})
+        logging.info(f"Startup timings (ms): {summary}")
+        return summary
+
+
+class StartupPipeline(QObject):
+    """Connects to Firestore and fetches what the first screen needs, all in the background.
+
+    The connection (credentials, app and client) is started first; the
+    festivals and the current collection are requested at the same time
+    and start as soon as the client exists. The first of them opens the
+    gRPC channel, so no separate warm-up request is spent. Results are
+    delivered through signals on the owner's thread.
+    """
+
+    connected = pyqtSignal()
+    festivalsLoaded = pyqtSignal(list)
+    companiesLoaded = pyqtSignal(str, str, list)  # collection, festival, companies
+    failed = pyqtSignal(str, str)  # step, error
+
+    MAX_WORKERS = 3
+
+    def __init__(self, firestore_service, parent=None):
+        super().__init__(parent)
+        self.firestore_service = firestore_service
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="startup")
+
+    def start(self, collection, festival):
+        self._executor.submit(self._run, "connect", self._connect)
+        self._executor.submit(self._run, "festivals", self._load_festivals)
+        self.load_companies(collection, festival)
+
+    def load_companies(self, collection, festival):
+        self._executor.submit(self._run, "companies", self._load_companies, collection, festival)
+
+    def _connect(self):
+        self.firestore_service.connect()
+        self.connected.emit()
+
+    def _load_festivals(self):
+        self.festivalsLoaded.emit(self.firestore_service.get_festivals())
+
+    def _load_companies(self, collection, festival):
+        festival_filter = None if festival == "All Festivals" else festival
+        self.companiesLoaded.emit(collection, festival, self.firestore_service.fetch_companies(collection,
+                                                                                              festival_filter))
+
+    def _run(self, step, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            logging.error(f"Startup step {step} failed: {e}")
+            self.failed.emit(step, str(e))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
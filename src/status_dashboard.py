@@ -0,0 +1,102 @@
+import logging
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QLabel, QTableWidget,
+                             QTableWidgetItem, QAbstractItemView)
+
+from src.schema import SCHEMAS
+
+# Status field and checklist flags summarised for each collection: (db field, display name)
+DASHBOARD_FIELDS = {
+    name: {
+        "status": (schema.status_field, schema.header_by_field[schema.status_field]),
+        "checks": [(field, schema.header_by_field[field]) for field in schema.boolean_fields]
+    }
+    for name, schema in SCHEMAS.items()
+}
+
+
+class StatusDashboard(QDialog):
+    """Status and checklist counts per festival, computed with server-side count() queries.
+
+    Nothing is downloaded: every cell is one aggregation query, the queries
+    run concurrently and are cached for FirestoreService.COUNT_CACHE_TTL.
+    """
+
+    def __init__(self, firestore_service, collection, festivals, current_festival=None, parent=None):
+        super().__init__(parent)
+        self.firestore_service = firestore_service
+        self.collection = collection
+        self.festivals = festivals
+        self.setWindowTitle(f"Status Dashboard - {collection}")
+        self.resize(520, 560)
+        self.setup_ui()
+        if current_festival:
+            self.festival_combo.setCurrentText(current_festival)
+        self.festival_combo.currentTextChanged.connect(lambda _: self.load_counts())
+        self.load_counts()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        self.festival_combo = QComboBox()
+        self.festival_combo.addItems(["All Festivals"] + self.festivals)
+        top_layout.addWidget(self.festival_combo)
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(lambda: self.load_counts(force=True))
+        top_layout.addWidget(self.refresh_button)
+        layout.addLayout(top_layout)
+
+        self.total_label = QLabel()
+        layout.addWidget(self.total_label)
+
+        self.counts_table = QTableWidget(0, 3)
+        self.counts_table.setHorizontalHeaderLabels(["Metric", "Count", "Share"])
+        self.counts_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.counts_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.counts_table)
+
+    def build_queries(self, festival):
+        base_filters = {} if festival == "All Festivals" else {"ProgramName": festival}
+        fields = DASHBOARD_FIELDS[self.collection]
+        status_field, status_name = fields["status"]
+
+        queries = {"total": base_filters}
+        for status in SCHEMAS[self.collection].option_fields[status_field]:
+            queries[f"{status_name}: {status}"] = {**base_filters, status_field: status}
+        for field, name in fields["checks"]:
+            queries[f"{name}: Van"] = {**base_filters, field: True}
+        return queries
+
+    def load_counts(self, force=False):
+        festival = self.festival_combo.currentText()
+        queries = self.build_queries(festival)
+        max_age = 0 if force else self.firestore_service.COUNT_CACHE_TTL
+        try:
+            counts = self.firestore_service.count_companies_many(self.collection, queries, max_age)
+        except Exception as e:
+            logging.error(f"Error loading dashboard counts: {e}")
+            counts = {}
+
+        total = counts.get("total")
+        self.total_label.setText(f"Companies: {total if total is not None else 'unknown'}")
+
+        rows = []
+        fields = DASHBOARD_FIELDS[self.collection]
+        status_field, status_name = fields["status"]
+        for status in SCHEMAS[self.collection].option_fields[status_field]:
+            rows.append((f"{status_name}: {status}", counts.get(f"{status_name}: {status}")))
+        for _, name in fields["checks"]:
+            with_flag = counts.get(f"{name}: Van")
+            rows.append((f"{name}: Van", with_flag))
+            # Documents without the field at all also count as missing
+            missing = total - with_flag if total is not None and with_flag is not None else None
+            rows.append((f"{name}: Nincs", missing))
+
+        self.counts_table.setRowCount(len(rows))
+        for row, (label, count) in enumerate(rows):
+            self.counts_table.setItem(row, 0, QTableWidgetItem(label))
+            self.counts_table.setItem(row, 1, QTableWidgetItem("?" if count is None else str(count)))
+            share = f"{count / total:.0%}" if count is not None and total else ""
+            self.counts_table.setItem(row, 2, QTableWidgetItem(share))
+        self.counts_table.resizeColumnsToContents()
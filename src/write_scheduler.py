@@ -0,0 +1,144 @@
+import logging
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Hands out write tokens at a rate that follows Firestore's 500/50/5 ramp-up rule.
+
+    Traffic starts at base_rate writes per second and may grow by 50% every
+    5 minutes of sustained use. After ramp_period seconds without a write
+    the ramp starts over from base_rate. The bucket holds at most one
+    second's worth of tokens, so bursts stay within the current rate.
+    """
+
+    def __init__(self, base_rate=500, growth=1.5, ramp_period=300, max_rate=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.base_rate = base_rate
+        self.growth = growth
+        self.ramp_period = ramp_period
+        self.max_rate = max_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._ramp_started = None
+        self._last_used = None
+        self._tokens = float(base_rate)
+        self._updated = clock()
+        self.waited = 0.0  # seconds callers spent waiting for tokens
+
+    def rate(self, now=None):
+        now = self._clock() if now is None else now
+        if self._ramp_started is None:
+            return self.base_rate
+        steps = int((now - self._ramp_started) // self.ramp_period)
+        rate = self.base_rate * self.growth ** steps
+        return min(rate, self.max_rate) if self.max_rate else rate
+
+    def acquire(self, count=1):
+        """Block until count tokens are available and take them.
+
+        A request bigger than the bucket takes it whole and leaves it in
+        debt, so a 500-write batch is never refused at a lower rate.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._last_used is None or now - self._last_used > self.ramp_period:
+                self._ramp_started = now
+            self._last_used = now
+            rate = self.rate(now)
+            self._tokens = min(rate, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= count
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            self._sleep(wait)
+
+
+class WriteScheduler:
+    """Runs every Firestore write under a rate limit, a per-document cap and retries.
+
+    run(function, paths, writes) waits for writes tokens, waits until no
+    more than per_document writes to any of paths are in flight, then calls
+    function(). Errors in retryable_errors() (contention, quota, an
+    unavailable backend, a deadline) are retried up to max_attempts times
+    with jittered exponential backoff.
+
+    A write whose outcome is unknown after such an error may have been
+    applied, so only idempotent writes are retried: plain updates, sets
+    with fixed document IDs and deletes. Creates are retried with
+    already_done set to the "already exists" error, which on a later
+    attempt means an earlier one landed. Writes with preconditions pass
+    idempotent=False and get a single attempt.
+    """
+
+    MAX_ATTEMPTS = 5
+    BASE_DELAY = 0.1  # seconds
+    MAX_DELAY = 30.0
+
+    def __init__(self, retryable_errors, bucket=None, per_document=1, max_attempts=MAX_ATTEMPTS,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, sleep=time.sleep):
+        self._retryable_errors = retryable_errors
+        self._retryable = None
+        self.bucket = bucket or TokenBucket(sleep=sleep)
+        self.per_document = per_document
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._in_flight = {}  # document path -> writes in flight
+        self._documents = threading.Condition()
+        self.retries = 0
+        self.failures = 0
+
+    def retryable(self):
+        # Resolved on the first write: the backend imports the SDK to answer
+        if self._retryable is None:
+            self._retryable = tuple(self._retryable_errors())
+        return self._retryable
+
+    def run(self, function, paths=(), writes=1, idempotent=True, already_done=()):
+        """Call function() for a write of writes documents at paths and return its result."""
+        paths = sorted(set(paths))
+        retryable = self.retryable()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.bucket.acquire(writes)
+            self._claim(paths)
+            try:
+                return function()
+            except already_done:
+                if attempt == 1:
+                    raise
+                logging.info(f"Write to {paths[:3]} was applied by an earlier attempt")
+                return None
+            except retryable as e:
+                if not idempotent or attempt >= self.max_attempts:
+                    self.failures += 1
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+                delay *= random.uniform(0.5, 1.0)
+                self.retries += 1
+                logging.warning(f"Write to {paths[:3]} failed ({e}), retry {attempt} in {delay * 1000:.0f} ms")
+            finally:
+                self._release(paths)
+            self._sleep(delay)
+
+    def _claim(self, paths):
+        with self._documents:
+            # All paths at once, so two batches sharing documents cannot hold each other up
+            while any(self._in_flight.get(path, 0) >= self.per_document for path in paths):
+                self._documents.wait()
+            for path in paths:
+                self._in_flight[path] = self._in_flight.get(path, 0) + 1
+
+    def _release(self, paths):
+        with self._documents:
+            for path in paths:
+                count = self._in_flight.pop(path) - 1
+                if count:
+                    self._in_flight[path] = count
+            self._documents.notify_all()
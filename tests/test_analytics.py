@@ -0,0 +1,20 @@
+import unittest
+
+from src.analytics import CompanyFrame
+
+COLLECTION = "Company_Install"
+
+
+class CompanyFrameTest(unittest.TestCase):
+    def test_only_boolean_fields_become_flags(self):
+        frame = CompanyFrame(COLLECTION, ["ProgramName", "3"], [
+            {"Id": "1", "ProgramName": "Van", "3": "Van"},
+            {"Id": "2", "ProgramName": "Nincs", "3": False},
+        ])
+
+        self.assertEqual(frame.categories["ProgramName"], ["Van", "Nincs"])
+        self.assertEqual(frame.categories["3"], [True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+from src.company_details_view_demolition import CompanyDetailsViewDemolition
+from src.company_details_view_install import CompanyDetailsViewInstall
+
+
+class RecordingQueue(QObject):
+    writeSucceeded = pyqtSignal(str, str, dict)
+    writeFailed = pyqtSignal(str, str, dict, str)
+
+    def __init__(self):
+        super().__init__()
+        self.created = []
+
+    def add_company(self, collection, data):
+        self.created.append((collection, dict(data)))
+        return data["Id"]
+
+    def flush(self, collection=None, company_id=None):
+        pass
+
+
+class Service:
+    def get_festivals(self, *args, **kwargs):
+        return ["Sziget", "VOLT"]
+
+    def generate_id(self):
+        return "new-id"
+
+
+class NewCompanyTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def save_new(self, view_class):
+        queue = RecordingQueue()
+        dialog = view_class(Service(), None, write_queue=queue)
+        self.assertTrue(dialog.is_new)
+        self.assertTrue(dialog.save_button.isEnabled())
+        dialog.name_edit.setText("Acme")
+        with mock.patch("src.company_details_view_base.QMessageBox"):
+            dialog.save_company()
+        self.assertFalse(dialog.is_new)
+        self.assertEqual(len(queue.created), 1)
+        return queue.created[0]
+
+    def test_install_view_queues_datetime_stamps(self):
+        collection, data = self.save_new(CompanyDetailsViewInstall)
+
+        self.assertEqual(collection, "Company_Install")
+        self.assertEqual(data["Id"], "new-id")
+        self.assertEqual(data["CompanyName"], "Acme")
+        self.assertEqual(data["1"], "TELEPÍTHETŐ")
+        self.assertIsInstance(data["LastModified"], datetime)
+        self.assertIsInstance(data["CreatedAt"], datetime)
+
+    def test_demolition_view_queues_datetime_stamps(self):
+        collection, data = self.save_new(CompanyDetailsViewDemolition)
+
+        self.assertEqual(collection, "Company_Demolition")
+        self.assertIsInstance(data["LastModified"], datetime)
+        self.assertIsInstance(data["CreatedAt"], datetime)
+
+
+if __name__ == "__main__":
+    unittest.main()
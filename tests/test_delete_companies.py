@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import unittest
+
+from src.delete_snapshot import DeleteSnapshot
+from src.fake_firestore import FakeFirestoreBackend
+from src.firestore_service import FirestoreService
+from src.write_scheduler import WriteScheduler
+
+COLLECTION = "Company_Install"
+COMPANY_IDS = [str(i) for i in range(12)]
+
+
+class DeleteCompaniesTest(unittest.TestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp(prefix="delete_snapshots_")
+        self.addCleanup(shutil.rmtree, self.snapshot_dir, ignore_errors=True)
+
+    def make_service(self, backend, **scheduler_options):
+        scheduler = WriteScheduler(backend.retryable_errors, sleep=lambda delay: None, **scheduler_options)
+        service = FirestoreService(backend=backend, write_scheduler=scheduler)
+        for company_id in COMPANY_IDS:
+            service.db.collection(COLLECTION).document(company_id).set(
+                {"Id": company_id, "CompanyName": f"Company {company_id}"})
+            service.add_comment(COLLECTION, company_id, {"Text": f"Note on {company_id}"}, f"c{company_id}")
+        return service
+
+    def delete(self, service):
+        delete_snapshot = DeleteSnapshot.create(COLLECTION, self.snapshot_dir)
+        snapshots = service.iter_company_snapshots_by_id(COLLECTION, COMPANY_IDS)
+        deleted_ids, failed_ids = service.delete_companies(snapshots, delete_snapshot)
+        return delete_snapshot, deleted_ids, failed_ids
+
+    def exists(self, service, company_id):
+        return service.get_company(COLLECTION, company_id) is not None
+
+    def comment_ids(self, service, company_id):
+        comments = service.comments_ref(COLLECTION, company_id).stream()
+        return [comment.id for comment in comments]
+
+    def test_deleted_companies_come_back_with_their_comments(self):
+        service = self.make_service(FakeFirestoreBackend(seed=0))
+
+        delete_snapshot, deleted_ids, failed_ids = self.delete(service)
+
+        self.assertEqual(sorted(deleted_ids), sorted(COMPANY_IDS))
+        self.assertEqual(failed_ids, [])
+        self.assertEqual(delete_snapshot.count, len(COMPANY_IDS) * 2)
+        for company_id in COMPANY_IDS:
+            self.assertFalse(self.exists(service, company_id))
+            self.assertEqual(self.comment_ids(service, company_id), [])
+
+        restored = service.restore_documents(delete_snapshot.read())
+
+        self.assertEqual(restored, len(COMPANY_IDS) * 2)
+        for company_id in COMPANY_IDS:
+            company = service.get_company(COLLECTION, company_id)
+            self.assertEqual(company["CompanyName"], f"Company {company_id}")
+            self.assertEqual(self.comment_ids(service, company_id), [f"c{company_id}"])
+
+    def test_companies_of_a_failed_batch_are_reported_and_kept(self):
+        backend = FakeFirestoreBackend(seed=3, failing_rpcs={"commit"})
+        service = self.make_service(backend, max_attempts=1)
+        # One company and its comment per batch, sent one at a time so the seeded failures repeat
+        service.MAX_BATCH_SIZE = 2
+        service.BULK_WRITE_WORKERS = 1
+        backend.failure_rate = 0.5
+
+        delete_snapshot, deleted_ids, failed_ids = self.delete(service)
+
+        self.assertTrue(deleted_ids)
+        self.assertTrue(failed_ids)
+        self.assertEqual(sorted(deleted_ids + failed_ids), sorted(COMPANY_IDS))
+        for company_id in failed_ids:
+            self.assertTrue(self.exists(service, company_id))
+            self.assertEqual(self.comment_ids(service, company_id), [f"c{company_id}"])
+        for company_id in deleted_ids:
+            self.assertFalse(self.exists(service, company_id))
+            self.assertEqual(self.comment_ids(service, company_id), [])
+        # Failed companies are still in the snapshot, restoring them again changes nothing
+        backend.failure_rate = 0.0
+        service.restore_documents(delete_snapshot.read())
+        for company_id in COMPANY_IDS:
+            self.assertTrue(self.exists(service, company_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
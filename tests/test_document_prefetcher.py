@@ -0,0 +1,33 @@
+import threading
+import unittest
+
+from src.document_prefetcher import DocumentPrefetcher
+
+COLLECTION = "Company_Install"
+
+
+class SlowService:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def get_company(self, collection, company_id):
+        self.release.wait(5)
+        return {"Id": company_id}
+
+
+class DocumentPrefetcherTest(unittest.TestCase):
+    def test_idle_after_close_with_queued_fetches(self):
+        service = SlowService()
+        prefetcher = DocumentPrefetcher(service)
+        # More fetches than workers, so some are still waiting in the executor's queue
+        prefetcher.prefetch(COLLECTION, [str(number) for number in range(DocumentPrefetcher.MAX_WORKERS + 3)])
+        prefetcher.close()
+        service.release.set()
+
+        self.assertTrue(prefetcher.is_idle())
+        self.assertFalse(prefetcher.fetch(COLLECTION, "late"))
+        self.assertTrue(prefetcher.is_idle())
+
+
+if __name__ == "__main__":
+    unittest.main()
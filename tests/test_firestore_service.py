@@ -0,0 +1,43 @@
+import unittest
+
+from src.fake_firestore import FakeFirestoreBackend
+from src.firestore_service import FirestoreService
+
+COLLECTION = "Company_Install"
+
+
+class CompanyQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.service = FirestoreService(backend=FakeFirestoreBackend(seed=0))
+        companies = self.service.db.collection(COLLECTION)
+        companies.document("1").set({"CompanyName": "Bool Kft.", "ProgramName": "VOLT", "3": True})
+        companies.document("2").set({"CompanyName": "Legacy Kft.", "ProgramName": "VOLT", "3": "Van"})
+        companies.document("3").set({"CompanyName": "Nincs Kft.", "ProgramName": "VOLT", "3": "Nincs"})
+        companies.document("4").set({"CompanyName": "Van", "ProgramName": "VOLT", "3": False})
+
+    def test_flag_filters_match_legacy_strings(self):
+        self.assertEqual(self.service.count_companies(COLLECTION, {"3": True}), 2)
+        self.assertEqual(self.service.count_companies(COLLECTION, {"3": "Nincs"}), 2)
+
+    def test_text_filters_stay_exact(self):
+        self.assertEqual(self.service.count_companies(COLLECTION, {"CompanyName": "Van"}), 1)
+
+
+class FestivalCacheTest(unittest.TestCase):
+    def test_stale_list_is_returned_and_refreshed_in_background(self):
+        service = FirestoreService(backend=FakeFirestoreBackend(seed=0))
+        programs = service.db.collection("Programs")
+        programs.document("1").set({"ProgramName": "VOLT"})
+        self.assertEqual(service.get_festivals(), ["VOLT"])
+
+        programs.document("2").set({"ProgramName": "Sziget"})
+        fetched_at, festivals = service._festival_cache
+        service._festival_cache = (fetched_at - service.FESTIVAL_CACHE_TTL - 1, festivals)
+        self.assertEqual(service.get_festivals(), ["VOLT"])
+
+        service._festival_refresh.join(5)
+        self.assertEqual(sorted(service.get_festivals()), ["Sziget", "VOLT"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+
+from src.id_allocator import IdAllocator, NodeSpaceExhaustedError
+
+
+class IdAllocatorTest(unittest.TestCase):
+    def test_concurrent_first_ids_lease_one_node(self):
+        leases = []
+
+        def lease():
+            leases.append(len(leases))
+            # Slow enough for the other threads to ask for their first ID meanwhile
+            time.sleep(0.05)
+            return leases[-1]
+
+        allocator = IdAllocator(node_lease=lease)
+        ids = []
+        threads = [threading.Thread(target=lambda: ids.extend(allocator.next_ids(100))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(leases, [0])
+        self.assertEqual(len(set(ids)), 800)
+
+    def test_failing_lease_is_retried_then_raised(self):
+        attempts = []
+        delays = []
+
+        def lease():
+            attempts.append(len(attempts))
+            raise ConnectionError("Firestore unavailable")
+
+        allocator = IdAllocator(node_lease=lease, sleep=delays.append)
+        with self.assertRaises(ConnectionError):
+            allocator.next_id()
+        self.assertEqual(len(attempts), IdAllocator.LEASE_ATTEMPTS)
+        self.assertEqual(delays, sorted(delays))
+
+    def test_lease_succeeding_on_retry_is_used(self):
+        results = iter([ConnectionError("Firestore unavailable"), 42])
+
+        def lease():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        allocator = IdAllocator(node_lease=lease, sleep=lambda delay: None)
+        self.assertEqual(allocator.node_id, 42)
+
+    def test_lease_past_last_node_raises(self):
+        allocator = IdAllocator(node_lease=lambda: 10 ** IdAllocator.NODE_DIGITS)
+        with self.assertRaises(NodeSpaceExhaustedError):
+            allocator.next_id()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import unittest
+
+from PyQt6.QtCore import QCoreApplication
+
+from src.fake_firestore import FakeFirestoreBackend
+from src.firestore_service import UPDATE_TIME_FIELD, FirestoreService
+from src.offline_queue import OfflineWriteQueue
+
+COLLECTION = "Company_Install"
+STATUS = "2"
+
+
+def setUpModule():
+    global app
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+
+class OfflineWriteQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeFirestoreBackend(seed=0)
+        self.service = FirestoreService(backend=self.backend)
+        self.service.db.collection(COLLECTION).document("c1").set({"CompanyName": "Teszt Kft.", STATUS: "KIADVA"})
+        self.queue = OfflineWriteQueue(self.service, path=":memory:")
+        self.addCleanup(self.queue.close)
+
+    def company(self):
+        return self.service.get_company(COLLECTION, "c1")
+
+    def flush(self):
+        # The worker itself, on this thread, so the test does not depend on the event loop
+        self.queue._flushing = True
+        self.queue._flush_worker()
+
+    def test_update_after_comment_commits(self):
+        base = self.company()[UPDATE_TIME_FIELD]
+        self.queue.add_comment(COLLECTION, "c1", {"Text": "Megérkeztünk"})
+        self.flush()
+        self.queue.submit(COLLECTION, "c1", {STATUS: "KIHELYEZESRE_VAR"}, base)
+        self.flush()
+
+        self.assertEqual(self.queue.conflicts(), [])
+        self.assertEqual(self.queue.pending_count(), 0)
+        self.assertEqual(self.company()[STATUS], "KIHELYEZESRE_VAR")
+
+    def test_later_write_to_conflicted_company_is_not_applied(self):
+        base = self.company()[UPDATE_TIME_FIELD]
+        # Someone else changes the company after we loaded it
+        self.service.db.collection(COLLECTION).document("c1").update({STATUS: "KIRAKVA"})
+        self.queue.submit(COLLECTION, "c1", {STATUS: "KIHELYEZESRE_VAR"}, base)
+        self.queue.add_comment(COLLECTION, "c1", {"Text": "Megérkeztünk"})
+        self.queue.submit(COLLECTION, "c1", {STATUS: "HELYSZINEN_TESZTELVE"}, base)
+        self.flush()
+
+        self.assertEqual([op for op, *_ in self.queue.conflicts()], ["update", "update"])
+        self.assertEqual(self.queue.pending_count(), 0)
+        self.assertEqual(self.company()[STATUS], "KIRAKVA")
+
+    def test_conflict_elsewhere_keeps_later_writes_to_current_company(self):
+        self.service.db.collection(COLLECTION).document("c2").set({"CompanyName": "Másik Kft.", STATUS: "KIADVA"})
+        base = self.company()[UPDATE_TIME_FIELD]
+        other_base = self.service.get_company(COLLECTION, "c2")[UPDATE_TIME_FIELD]
+        self.service.db.collection(COLLECTION).document("c2").update({STATUS: "KIRAKVA"})
+        self.queue.submit(COLLECTION, "c1", {STATUS: "KIHELYEZESRE_VAR"}, base)
+        self.queue.add_comment(COLLECTION, "c1", {"Text": "Megérkeztünk"})
+        self.queue.submit(COLLECTION, "c1", {STATUS: "HELYSZINEN_TESZTELVE"}, base)
+        self.queue.submit(COLLECTION, "c2", {STATUS: "KIHELYEZESRE_VAR"}, other_base)
+        self.flush()
+
+        self.assertEqual([company_id for _, _, company_id, *_ in self.queue.conflicts()], ["c2"])
+        self.assertEqual(self.company()[STATUS], "HELYSZINEN_TESZTELVE")
+
+
+if __name__ == "__main__":
+    unittest.main()
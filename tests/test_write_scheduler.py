@@ -0,0 +1,166 @@
+import threading
+import time
+import unittest
+
+from src.fake_firestore import AlreadyExists, FakeFirestoreBackend, ServiceUnavailable
+from src.write_scheduler import TokenBucket, WriteScheduler
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class WriteSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeFirestoreBackend(failing_rpcs={"commit"})
+        self.client = self.backend.connect()
+        self.doc_ref = self.client.collection("Company_Install").document("1")
+        self.backend.store.put("Company_Install", "1", {"CompanyName": "Acme"})
+        self.delays = []
+
+    def scheduler(self, sleep=None, **kwargs):
+        return WriteScheduler(self.backend.retryable_errors, sleep=sleep or self.delays.append, **kwargs)
+
+    def test_idempotent_write_is_retried_until_it_succeeds(self):
+        self.backend.failure_rate = 1.0
+
+        def sleep(delay):
+            self.delays.append(delay)
+            if len(self.delays) == 2:
+                self.backend.failure_rate = 0.0
+
+        scheduler = self.scheduler(sleep)
+        scheduler.run(lambda: self.doc_ref.update({"CompanyName": "Acme Kft"}), [self.doc_ref.path])
+
+        self.assertEqual(self.backend.stats["commit"], 3)
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(self.doc_ref.get().to_dict()["CompanyName"], "Acme Kft")
+        self.assertLessEqual(self.delays[0], self.delays[1])
+
+    def test_idempotent_write_gives_up_after_max_attempts(self):
+        self.backend.failure_rate = 1.0
+        scheduler = self.scheduler(max_attempts=3)
+
+        with self.assertRaises(ServiceUnavailable):
+            scheduler.run(lambda: self.doc_ref.update({"CompanyName": "Acme Kft"}), [self.doc_ref.path])
+        self.assertEqual(self.backend.stats["commit"], 3)
+        self.assertEqual(scheduler.failures, 1)
+
+    def test_non_idempotent_write_is_sent_once(self):
+        self.backend.failure_rate = 1.0
+        scheduler = self.scheduler()
+
+        with self.assertRaises(ServiceUnavailable):
+            scheduler.run(lambda: self.doc_ref.update({"CompanyName": "Acme Kft"}), [self.doc_ref.path],
+                          idempotent=False)
+        self.assertEqual(self.backend.stats["commit"], 1)
+        self.assertEqual(self.delays, [])
+
+    def test_create_applied_by_lost_attempt_is_not_sent_again(self):
+        new_ref = self.client.collection("Company_Install").document("2")
+        attempts = []
+
+        def create():
+            attempts.append(len(attempts))
+            new_ref.create({"CompanyName": "Beta"})
+            if len(attempts) == 1:
+                # The commit landed but its response never arrived
+                raise ServiceUnavailable("connection reset")
+
+        scheduler = self.scheduler()
+        result = scheduler.run(create, [new_ref.path], already_done=self.backend.already_exists_error())
+
+        self.assertIsNone(result)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.backend.stats["commit"], 2)
+        self.assertEqual(self.backend.stats["writes"], 1)
+
+    def test_already_exists_on_first_attempt_is_raised(self):
+        scheduler = self.scheduler()
+
+        with self.assertRaises(AlreadyExists):
+            scheduler.run(lambda: self.doc_ref.create({"CompanyName": "Acme"}), [self.doc_ref.path],
+                          already_done=self.backend.already_exists_error())
+
+    def test_writes_to_one_document_never_overlap(self):
+        self.backend.latency = 0.005
+        scheduler = self.scheduler(time.sleep)
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def write(path):
+            def function():
+                with lock:
+                    in_flight.append(path)
+                    peak.append(in_flight.count(path))
+                self.doc_ref.update({"CompanyName": "Acme"})
+                with lock:
+                    in_flight.remove(path)
+            scheduler.run(function, [path])
+
+        threads = [threading.Thread(target=write, args=(path,)) for path in ["a", "b"] * 6]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(peak), 12)
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(scheduler._in_flight, {})
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def bucket(self, **kwargs):
+        return TokenBucket(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_burst_beyond_the_rate_waits(self):
+        bucket = self.bucket(base_rate=500)
+
+        bucket.acquire(500)
+        self.assertEqual(self.clock.now, 0.0)
+        bucket.acquire(250)
+        self.assertAlmostEqual(self.clock.now, 0.5)
+
+    def test_sustained_writes_keep_to_the_rate(self):
+        bucket = self.bucket(base_rate=500)
+
+        for _ in range(10):
+            bucket.acquire(500)
+        # The first second's worth comes from the full bucket
+        self.assertAlmostEqual(self.clock.now, 9.0)
+        self.assertAlmostEqual(bucket.waited, 9.0)
+
+    def test_rate_ramps_up_and_starts_over_after_idle(self):
+        bucket = self.bucket(base_rate=500, ramp_period=300)
+
+        while self.clock.now < 300:
+            bucket.acquire(500)
+        self.assertEqual(bucket.rate(), 750)
+
+        self.clock.now += 301
+        bucket.acquire(1)
+        self.assertEqual(bucket.rate(), 500)
+
+    def test_max_rate_caps_the_ramp(self):
+        bucket = self.bucket(base_rate=500, ramp_period=300, max_rate=600)
+
+        while self.clock.now < 600:
+            bucket.acquire(500)
+        self.assertEqual(bucket.rate(), 600)
+
+
+if __name__ == "__main__":
+    unittest.main()